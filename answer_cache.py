@@ -0,0 +1,418 @@
+# answer_cache.py
+"""
+Semantic answer cache in front of the compiled workflow.
+
+Answers graded "good" are stored with the embedding of their question in a
+local SQLite database. A new question whose embedding is close enough to a
+cached one gets that answer back without routing, retrieval, generation or
+grading. Entries expire after a TTL, the least recently used ones are
+evicted beyond a size cap, and everything is invalidated when the ingestion
+manifest (the indexed corpus) changes.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessageChunk
+
+from chunking import MANIFEST_PATH, embedding_id, get_embeddings
+from memory import remember_turn
+from tracing import record_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "./index/answer_cache.sqlite3")
+# Cosine similarity needed between questions to reuse an answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+
+# manifest path -> ((mtime_ns, size, embedding id), version)
+_versions = {}
+
+
+def corpus_version(manifest_path=MANIFEST_PATH):
+    """
+    Fingerprint of the indexed corpus and the embedding backend serving it.
+
+    Cached answers are keyed on question embeddings, so switching backends
+    invalidates them just like re-ingesting does. The manifest is only
+    re-read and hashed when its mtime or size changes (ingest.py replaces it
+    atomically).
+    """
+    try:
+        stat = os.stat(manifest_path)
+    except FileNotFoundError:
+        return "none"
+    key = (stat.st_mtime_ns, stat.st_size, embedding_id())
+    cached = _versions.get(manifest_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256(key[2].encode("utf-8"))
+    with open(manifest_path, "rb") as f:
+        digest.update(f.read())
+    version = digest.hexdigest()[:16]
+    _versions[manifest_path] = (key, version)
+    return version
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    SQLite-backed question-embedding -> answer cache.
+
+    Args:
+        path (str): SQLite database file
+        embeddings: LangChain embeddings used for the questions
+        threshold (float): Minimum cosine similarity for a hit
+        ttl (float): Seconds an entry stays valid
+        max_entries (int): LRU size cap
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, embeddings=None, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings or get_embeddings()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                corpus_version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._version = None
+        self._ids = []
+        self._index = {}
+        # Preallocated rows; _matrix is the filled part of it (None when empty)
+        self._buffer = None
+        self._matrix = None
+        self._refresh()
+
+    def _refresh(self):
+        """Drop stale entries and reload the in-memory embedding matrix."""
+        version = corpus_version()
+        now = time.time()
+        self._conn.execute("DELETE FROM answers WHERE corpus_version != ? OR created_at < ?",
+                           (version, now - self.ttl))
+        self._conn.commit()
+        rows = self._conn.execute("SELECT id, embedding FROM answers").fetchall()
+        self._version = version
+        self._ids = [row[0] for row in rows]
+        self._index = {row_id: i for i, row_id in enumerate(self._ids)}
+        self._buffer = (
+            np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        )
+        self._matrix = self._buffer
+
+    def _append(self, row_id, vector):
+        """Add a row to the in-memory matrix, growing the buffer geometrically."""
+        n = len(self._ids)
+        if self._buffer is None or n == len(self._buffer):
+            grown = np.empty((max(16, 2 * n), vector.shape[0]), dtype=np.float32)
+            if n:
+                grown[:n] = self._matrix
+            self._buffer = grown
+        self._buffer[n] = vector
+        self._ids.append(row_id)
+        self._index[row_id] = n
+        self._matrix = self._buffer[:n + 1]
+
+    def _drop(self, row_ids):
+        """Remove rows from the in-memory matrix (the last row fills each gap)."""
+        for row_id in row_ids:
+            i = self._index.pop(row_id, None)
+            if i is None:
+                continue
+            last = len(self._ids) - 1
+            if i != last:
+                self._buffer[i] = self._buffer[last]
+                self._ids[i] = self._ids[last]
+                self._index[self._ids[i]] = i
+            self._ids.pop()
+        self._matrix = self._buffer[:len(self._ids)] if self._ids else None
+
+    def lookup(self, question):
+        """
+        Return the cached answer for a similar question, or None.
+        """
+        vector = _normalize(self.embeddings.embed_query(question))
+        with self._lock:
+            if corpus_version() != self._version:
+                logger.info("---ANSWER CACHE: CORPUS CHANGED, INVALIDATING---")
+                self._refresh()
+            if self._matrix is None:
+                self.misses += 1
+                record_cache("answer", hit=False)
+                return None
+            scores = self._matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                record_cache("answer", hit=False)
+                return None
+            row = self._conn.execute("SELECT answer, created_at FROM answers WHERE id = ?",
+                                     (self._ids[best],)).fetchone()
+            now = time.time()
+            if row is None or row[1] < now - self.ttl:
+                self._refresh()
+                self.misses += 1
+                record_cache("answer", hit=False)
+                return None
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, self._ids[best]))
+            self._conn.commit()
+            self.hits += 1
+            record_cache("answer", hit=True)
+            logger.info("---ANSWER CACHE HIT (similarity=%.3f)---", scores[best])
+            return row[0]
+
+    def store(self, question, answer):
+        """
+        Cache an answer, evicting least recently used entries beyond the cap.
+        """
+        vector = _normalize(self.embeddings.embed_query(question))
+        now = time.time()
+        with self._lock:
+            if corpus_version() != self._version:
+                self._refresh()
+            row_id = self._conn.execute(
+                "INSERT INTO answers (question, embedding, answer, corpus_version, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (question, vector.tobytes(), answer, self._version, now, now),
+            ).lastrowid
+            evicted = [row[0] for row in self._conn.execute(
+                "SELECT id FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?", (self.max_entries,)
+            )]
+            self._conn.executemany("DELETE FROM answers WHERE id = ?", [(evicted_id,) for evicted_id in evicted])
+            self._conn.commit()
+            # Update the in-memory matrix instead of reloading it from SQLite
+            self._append(row_id, vector)
+            self._drop(evicted)
+
+    def clear(self):
+        """Remove every cached answer."""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._refresh()
+
+
+def _answer_text(generation):
+    if hasattr(generation, "content"):
+        return generation.content
+    return str(generation)
+
+
+def _cacheable(result):
+    # Deferred grades are only provisional, don't cache them until confirmed
+    return result.get("grade") == "good" and not result.get("grade_pending")
+
+
+def _mark_deferred(result):
+    """Flag a provisionally good answer so confirm_and_store() caches it once confirmed."""
+    if result.get("grade") == "good" and result.get("grade_pending"):
+        result["cache_on_confirm"] = True
+
+
+def confirm_and_store(workflow, result, structured_grader=None):
+    """
+    Confirm a deferred grade and cache the answer if it holds up.
+
+    Args:
+        workflow: The compiled workflow, a CachedWorkflow or a plain graph
+        result (dict): Final state with a pending grade
+        structured_grader: Grading chain (defaults to the registry's)
+
+    Returns:
+        dict: grade update from confirm_grade()
+    """
+    from grader import confirm_grade
+
+    grade = confirm_grade(result, structured_grader)
+    if grade["grade"] == "good" and result.get("cache_on_confirm") and isinstance(workflow, CachedWorkflow):
+        workflow.cache.store(result["question"], _answer_text(result["generation"]))
+    return grade
+
+
+class CachedWorkflow:
+    """
+    Wraps a compiled graph and serves repeated questions from the cache.
+
+    For graphs with conversation memory, follow-up turns bypass the cache
+    (their answer depends on the conversation) and cache hits are recorded
+    in the thread's memory. Anything other than the invoke/stream methods is
+    delegated to the wrapped graph.
+    """
+
+    def __init__(self, graph, cache):
+        self.graph = graph
+        self.cache = cache
+
+    def _thread_values(self, config):
+        """Checkpointed state of the config's thread, or None without memory."""
+        if self.graph.checkpointer is None or not (config or {}).get("configurable", {}).get("thread_id"):
+            return None
+        return self.graph.get_state(config).values
+
+    async def _athread_values(self, config):
+        if self.graph.checkpointer is None or not (config or {}).get("configurable", {}).get("thread_id"):
+            return None
+        return (await self.graph.aget_state(config)).values
+
+    def _remember_hit(self, config, values, state, answer):
+        if values is not None:
+            self.graph.update_state(config, remember_turn({**values, **state, "grade": "good"}, answer),
+                                    as_node="remember")
+
+    async def _aremember_hit(self, config, values, state, answer):
+        if values is not None:
+            await self.graph.aupdate_state(config, remember_turn({**values, **state, "grade": "good"}, answer),
+                                           as_node="remember")
+
+    def _cached_result(self, state, answer):
+        return {"question": state["question"], "generation": answer, "documents": [],
+                "grade": "good", "cached": True}
+
+    def _replay(self, state, answer, stream_mode):
+        """Yield a cached answer in the shape graph.stream() would."""
+        multi = isinstance(stream_mode, (list, tuple))
+        modes = list(stream_mode) if multi else [stream_mode]
+        result = self._cached_result(state, answer)
+        for mode in modes:
+            if mode == "messages":
+                payload = (AIMessageChunk(content=answer), {"langgraph_node": "generate", "cached": True})
+            elif mode == "values":
+                payload = result
+            else:
+                continue
+            yield (mode, payload) if multi else payload
+
+    def invoke(self, state, config=None, **kwargs):
+        question = state["question"]
+        values = self._thread_values(config)
+        if values and values.get("history"):
+            return self.graph.invoke(state, config=config, **kwargs)
+
+        answer = self.cache.lookup(question)
+        if answer is not None:
+            self._remember_hit(config, values, state, answer)
+            return self._cached_result(state, answer)
+
+        result = self.graph.invoke(state, config=config, **kwargs)
+        if _cacheable(result):
+            self.cache.store(question, _answer_text(result["generation"]))
+        _mark_deferred(result)
+        return result
+
+    def stream(self, state, config=None, stream_mode="values", **kwargs):
+        """
+        Stream the workflow, or replay a cached answer in the same stream format.
+
+        Supports the "values" and "messages" stream modes (alone or as a list).
+        """
+        question = state["question"]
+        multi = isinstance(stream_mode, (list, tuple))
+
+        values = self._thread_values(config)
+        if values and values.get("history"):
+            yield from self.graph.stream(state, config=config, stream_mode=stream_mode, **kwargs)
+            return
+
+        answer = self.cache.lookup(question)
+        if answer is not None:
+            self._remember_hit(config, values, state, answer)
+            yield from self._replay(state, answer, stream_mode)
+            return
+
+        final = None
+        for item in self.graph.stream(state, config=config, stream_mode=stream_mode, **kwargs):
+            if multi and item[0] == "values":
+                final = item[1]
+            elif not multi and stream_mode == "values":
+                final = item
+            yield item
+        if final is not None:
+            if _cacheable(final):
+                self.cache.store(question, _answer_text(final["generation"]))
+            # The caller holds this same dict as its final state
+            _mark_deferred(final)
+
+    async def ainvoke(self, state, config=None, **kwargs):
+        question = state["question"]
+        values = await self._athread_values(config)
+        if values and values.get("history"):
+            return await self.graph.ainvoke(state, config=config, **kwargs)
+
+        # Cache lookups embed the question on CPU; keep them off the event loop
+        answer = await asyncio.to_thread(self.cache.lookup, question)
+        if answer is not None:
+            await self._aremember_hit(config, values, state, answer)
+            return self._cached_result(state, answer)
+
+        result = await self.graph.ainvoke(state, config=config, **kwargs)
+        if _cacheable(result):
+            await asyncio.to_thread(self.cache.store, question, _answer_text(result["generation"]))
+        _mark_deferred(result)
+        return result
+
+    async def astream(self, state, config=None, stream_mode="values", **kwargs):
+        """
+        Async version of stream().
+        """
+        question = state["question"]
+        multi = isinstance(stream_mode, (list, tuple))
+
+        values = await self._athread_values(config)
+        if values and values.get("history"):
+            async for item in self.graph.astream(state, config=config, stream_mode=stream_mode, **kwargs):
+                yield item
+            return
+
+        answer = await asyncio.to_thread(self.cache.lookup, question)
+        if answer is not None:
+            await self._aremember_hit(config, values, state, answer)
+            for item in self._replay(state, answer, stream_mode):
+                yield item
+            return
+
+        final = None
+        async for item in self.graph.astream(state, config=config, stream_mode=stream_mode, **kwargs):
+            if multi and item[0] == "values":
+                final = item[1]
+            elif not multi and stream_mode == "values":
+                final = item
+            yield item
+        if final is not None:
+            if _cacheable(final):
+                await asyncio.to_thread(self.cache.store, question, _answer_text(final["generation"]))
+            _mark_deferred(final)
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
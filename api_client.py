@@ -0,0 +1,56 @@
+# api_client.py
+"""
+Minimal client for the server.py HTTP API.
+"""
+import json
+
+import httpx
+
+# Shared connection pool for all requests from this process
+_client = None
+
+
+def _get_client():
+    global _client
+
+    if _client is None:
+        # Timeouts are passed per request, the pool is shared
+        _client = httpx.Client()
+    return _client
+
+
+def stream_answer(base_url, question, thread_id=None, timeout=120.0):
+    """
+    Stream an answer from POST /answer/stream.
+
+    Args:
+        base_url (str): API root, e.g. http://localhost:8000
+        question (str): Customer question
+        thread_id (str): Conversation thread for memory
+        timeout (float): Request timeout in seconds
+
+    Yields:
+        tuple: (event, data) for "token", "done", "retract" and "error" events
+    """
+    payload = {"question": question, "thread_id": thread_id}
+    url = f"{base_url.rstrip('/')}/answer/stream"
+    with _get_client().stream("POST", url, json=payload, timeout=timeout) as response:
+        if response.status_code == 503:
+            yield "error", {"detail": "The support service is busy, please try again in a moment."}
+            return
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event:
+                yield event, json.loads(line[len("data: "):])
+                event = None
+
+
+def answer(base_url, question, thread_id=None, timeout=120.0):
+    """POST /answer and return the JSON result."""
+    response = _get_client().post(f"{base_url.rstrip('/')}/answer",
+                                  json={"question": question, "thread_id": thread_id}, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
@@ -1,7 +1,11 @@
 # app.py
+import os
 import streamlit as st
-from compile import build_workflow
 import time
+import uuid
+
+# When set, the UI is a thin client of the server.py API instead of running the graph
+CHATBOT_API_URL = os.getenv("CHATBOT_API_URL", "")
 
 # Set page config
 st.set_page_config(
@@ -13,9 +17,53 @@ st.set_page_config(
 # Initialize the workflow
 @st.cache_resource
 def load_workflow():
-    return build_workflow()
+    from compile import build_workflow
+    from memory import MEMORY_ENABLED
+
+    return build_workflow(memory=MEMORY_ENABLED)
+
+
+def local_events(question, thread_id):
+    """Run the workflow in-process, yielding the same events as the API stream."""
+    from answer_cache import confirm_and_store
+    from human import human_escalation
+    from memory import retract_last_turn, thread_config
+
+    state = {"question": question, "generation": "", "documents": []}
+    config = thread_config(thread_id)
+    result = None
+    for mode, payload in app.stream(state, config=config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "generate" and chunk.content:
+                yield "token", {"text": chunk.content}
+        else:
+            result = payload
+
+    # Grading may have replaced the streamed answer
+    if hasattr(result['generation'], 'content'):
+        yield "done", {"answer": result['generation'].content}
+    else:
+        yield "done", {"answer": str(result['generation'])}
 
-app = load_workflow()
+    # Deferred grading: the answer is already shown, confirm it with the
+    # LLM grader now and retract it if it turns out to be poor
+    if result.get("grade_pending"):
+        if confirm_and_store(app, result)["grade"] != "good":
+            escalation = human_escalation(result)["generation"]
+            # The provisional answer is already in the thread's memory
+            retract_last_turn(app, config, escalation)
+            yield "retract", {"answer": escalation}
+
+
+if CHATBOT_API_URL:
+    from api_client import stream_answer
+
+    def answer_events(question, thread_id):
+        return stream_answer(CHATBOT_API_URL, question, thread_id)
+else:
+    app = load_workflow()
+    answer_events = local_events
 
 # Custom CSS for styling
 st.markdown("""
@@ -98,6 +146,10 @@ with st.sidebar:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Conversation memory is checkpointed per thread
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = str(uuid.uuid4())
+
 # Display chat messages
 st.markdown("### 💬 Chat")
 chat_container = st.container()
@@ -121,34 +173,41 @@ if user_input:
         st.markdown(f'<div class="user-message">👤 {user_input}</div>', unsafe_allow_html=True)
     
     # Create a placeholder for bot response
+    with chat_container:
+        response_placeholder = st.empty()
+
     with st.spinner("🤖 Thinking..."):
         try:
-            # Run the workflow
-            state = {"question": user_input, "generation": "", "documents": []}
-            result = app.invoke(state)
-            
-            # Extract the bot response
-            if hasattr(result['generation'], 'content'):
-                bot_response = result['generation'].content
-            else:
-                bot_response = str(result['generation'])
-            
-            # Add bot response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": bot_response})
-            
-            # Display bot response
-            with chat_container:
-                st.markdown(f'<div class="bot-message">🤖 {bot_response}</div>', unsafe_allow_html=True)
+            # Run the workflow (locally or via the API), rendering answer tokens as they stream
+            streamed = ""
+            for event, data in answer_events(user_input, st.session_state.thread_id):
+                if event == "token":
+                    streamed += data["text"]
+                    response_placeholder.markdown(f'<div class="bot-message">🤖 {streamed}▌</div>', unsafe_allow_html=True)
+                elif event == "done":
+                    bot_response = data["answer"]
+                    
+                    # Add bot response to chat history
+                    st.session_state.messages.append({"role": "assistant", "content": bot_response})
+                    
+                    # Display bot response
+                    response_placeholder.markdown(f'<div class="bot-message">🤖 {bot_response}</div>', unsafe_allow_html=True)
+                elif event == "retract":
+                    bot_response = data["answer"]
+                    st.session_state.messages[-1]["content"] = bot_response
+                    response_placeholder.markdown(f'<div class="bot-message">🤖 {bot_response}</div>', unsafe_allow_html=True)
+                elif event == "error":
+                    raise RuntimeError(data["detail"])
                 
         except Exception as e:
             error_msg = f"Sorry, I encountered an error: {str(e)}"
             st.session_state.messages.append({"role": "assistant", "content": error_msg})
-            with chat_container:
-                st.markdown(f'<div class="bot-message">🤖 {error_msg}</div>', unsafe_allow_html=True)
+            response_placeholder.markdown(f'<div class="bot-message">🤖 {error_msg}</div>', unsafe_allow_html=True)
 
 # Clear chat button
 if st.button("🗑️ Clear Chat"):
     st.session_state.messages = []
+    st.session_state.thread_id = str(uuid.uuid4())
     st.rerun()
 
 # Footer
@@ -0,0 +1,123 @@
+# articles.py
+"""
+Per-article loader for the scraped support articles.
+
+Reads either the ``URL:`` / ``CONTENT:`` / ``====`` text format written by
+scrap_test.py or a JSONL file with one ``{"url", "title", "id", "content"}``
+object per line, and yields one Document per article so chunks never cross
+article boundaries and always carry their source URL.
+"""
+import json
+import os
+import re
+from urllib.parse import unquote
+
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+SEPARATOR = "=" * 80
+ARTICLE_URL_RE = re.compile(r"/articles/(\d+)-*([^/?#]*)")
+
+
+def parse_article_url(url):
+    """
+    Extract the article id and a readable title from a Help Center URL.
+
+    Args:
+        url (str): Article URL, e.g. .../articles/22177793658268--Borderlands-4-...
+
+    Returns:
+        tuple: (article id or None, title or "")
+    """
+    match = ARTICLE_URL_RE.search(url)
+    if not match:
+        return None, ""
+    slug = unquote(match.group(2))
+    title = re.sub(r"[-_]+", " ", slug).strip()
+    return match.group(1), title
+
+
+def make_article_document(url, content, title=None, article_id=None, **extra):
+    """Build the Document for one article with url/title/id metadata."""
+    parsed_id, parsed_title = parse_article_url(url)
+    metadata = {
+        "source": url,
+        "url": url,
+        "title": title or parsed_title,
+        "id": str(article_id or parsed_id or url),
+    }
+    metadata.update(extra)
+    return Document(page_content=content.strip(), metadata=metadata)
+
+
+class ScrapedArticlesLoader(BaseLoader):
+    """
+    Stream articles from a scraped text dump or JSONL file.
+
+    Args:
+        file_path (str): Path to a ``.txt`` dump or a ``.jsonl`` file
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def lazy_load(self):
+        if self.file_path.endswith(".jsonl"):
+            yield from self._load_jsonl()
+        else:
+            yield from self._load_text()
+
+    def _load_jsonl(self):
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                url = record.pop("url")
+                content = record.pop("content", "")
+                yield make_article_document(
+                    url,
+                    content,
+                    title=record.pop("title", None),
+                    article_id=record.pop("id", None),
+                    **record,
+                )
+
+    def _load_text(self):
+        url = None
+        lines = []
+        in_content = False
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                stripped = line.rstrip("\n")
+                if url is None and stripped.startswith("URL: "):
+                    url = stripped[len("URL: "):].strip()
+                elif url is not None and not in_content and stripped == "CONTENT:":
+                    in_content = True
+                elif stripped == SEPARATOR:
+                    if url is not None:
+                        yield make_article_document(url, "\n".join(lines))
+                    url, lines, in_content = None, [], False
+                elif in_content:
+                    lines.append(stripped)
+        # Trailing article without a closing separator
+        if url is not None and lines:
+            yield make_article_document(url, "\n".join(lines))
+
+
+def load_articles(data_dir):
+    """
+    Load every article from the ``.txt`` and ``.jsonl`` files in a directory.
+
+    Args:
+        data_dir (str): Directory to scan (recursively)
+
+    Returns:
+        list: One Document per article
+    """
+    docs = []
+    for root, _, files in os.walk(data_dir):
+        for name in sorted(files):
+            if name.endswith((".txt", ".jsonl")):
+                docs.extend(ScrapedArticlesLoader(os.path.join(root, name)).lazy_load())
+    return docs
@@ -0,0 +1,274 @@
+# benchmark.py
+"""
+Offline latency/throughput benchmark of the support workflow.
+
+Builds the real graph with ``compile.build_workflow()`` on top of the local
+fakes in fakes.py (no Groq, DuckDuckGo, Astra or model downloads), replays a
+question corpus at a given concurrency and reports p50/p95/p99 latency per
+node (from the tracing listener) and end to end, throughput and memory.
+Results are written as JSON so runs can be compared over time.
+
+Usage:
+    python benchmark.py --concurrency 8 --repeat 3
+    python benchmark.py --mode sync --llm-latency 0.5 --output benchmarks/slow-llm.json
+    python benchmark.py --baseline benchmarks/previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from tracing import add_listener, remove_listener
+
+DEFAULT_QUESTIONS = "./fixtures/benchmark_questions.jsonl"
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(durations):
+    """
+    Latency summary (seconds) of a list of durations.
+    """
+    if not durations:
+        return {"count": 0}
+    values = np.asarray(durations, dtype=np.float64)
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 6) for p in PERCENTILES}
+    summary.update(count=len(durations), mean=round(float(values.mean()), 6), max=round(float(values.max()), 6))
+    return summary
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if platform.system() == "Darwin" else peak / 2**10
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class NodeRecorder:
+    """Tracing listener collecting per-node durations."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self.durations[event["node"]].append(event["duration_s"])
+            if "error" in event:
+                self.errors[event["node"]] += 1
+
+    def report(self):
+        return {node: {**summarize(values), "errors": self.errors.get(node, 0)}
+                for node, values in sorted(self.durations.items())}
+
+
+def _state(record):
+    return {"question": record["question"], "generation": "", "documents": []}
+
+
+def run_sync(workflow, records, concurrency):
+    """Replay records on a thread pool; return [(seconds, error)]."""
+    def run_one(record):
+        start = time.perf_counter()
+        try:
+            workflow.invoke(_state(record))
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(run_one, records))
+
+
+async def run_async(workflow, records, concurrency):
+    """Replay records on the event loop; return [(seconds, error)]."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(record):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await workflow.ainvoke(_state(record))
+                return time.perf_counter() - start, None
+            except Exception as e:
+                return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    return await asyncio.gather(*(run_one(record) for record in records))
+
+
+def run_benchmark(questions, concurrency=4, repeat=1, mode="async", llm_latency=0.3, token_latency=0.01,
+                  output_tokens=60, search_latency=0.2, speculative=False, answer_cache=False, microbatch=False,
+                  warmup=2):
+    """
+    Run the benchmark and return the results dict.
+
+    Args:
+        questions (list): [{"id", "question"}] records
+        concurrency (int): Questions in flight at once
+        repeat (int): Times the corpus is replayed
+        mode (str): "async" (ainvoke on one loop) or "sync" (invoke on threads)
+        llm_latency (float): Simulated first-token / router / grader latency
+        token_latency (float): Simulated per-token generation latency
+        output_tokens (int): Tokens per generated answer
+        search_latency (float): Simulated web search latency
+        speculative (bool): Build the graph with speculative retrieval
+        answer_cache (bool): Wrap the graph in the semantic answer cache
+        microbatch (bool): Coalesce concurrent vector searches
+        warmup (int): Questions run (and discarded) before measuring
+    """
+    from answer_cache import CachedWorkflow, SemanticAnswerCache
+    from compile import build_workflow
+    from fakes import install_fakes
+
+    rss_start = rss_mb()
+    setup_start = time.perf_counter()
+    registry = install_fakes(llm_latency=llm_latency, token_latency=token_latency,
+                             output_tokens=output_tokens, search_latency=search_latency, microbatch=microbatch)
+    workflow = build_workflow(registry=registry, answer_cache=False, use_async=(mode == "async"),
+                              speculative=speculative)
+    if answer_cache:
+        # Keep fake-embedding entries out of the real cache file
+        cache_path = os.path.join(tempfile.mkdtemp(prefix="bench-cache-"), "answers.sqlite3")
+        workflow = CachedWorkflow(workflow, SemanticAnswerCache(path=cache_path))
+    setup_s = time.perf_counter() - setup_start
+
+    def replay(records):
+        if mode == "async":
+            return asyncio.run(run_async(workflow, records, concurrency))
+        return run_sync(workflow, records, concurrency)
+
+    if warmup:
+        replay(questions[:warmup])
+
+    records = questions * repeat
+    recorder = NodeRecorder()
+    add_listener(recorder)
+    try:
+        start = time.perf_counter()
+        outcomes = replay(records)
+        wall_s = time.perf_counter() - start
+    finally:
+        remove_listener(recorder)
+
+    errors = [error for _, error in outcomes if error]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "config": {
+            "questions": len(questions), "repeat": repeat, "concurrency": concurrency, "mode": mode,
+            "llm_latency": llm_latency, "token_latency": token_latency, "output_tokens": output_tokens,
+            "search_latency": search_latency, "speculative": speculative, "answer_cache": answer_cache,
+            "microbatch": microbatch,
+        },
+        "setup_s": round(setup_s, 3),
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(records) / wall_s, 3) if wall_s else None,
+        "end_to_end": summarize([seconds for seconds, error in outcomes if not error]),
+        "nodes": recorder.report(),
+        "errors": {"count": len(errors), "examples": errors[:5]},
+        "memory": {
+            "rss_start_mb": round(rss_start, 1) if rss_start else None,
+            "rss_end_mb": round(rss_mb(), 1) if rss_mb() else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+    }
+
+
+def print_report(results, baseline=None):
+    """Print a results table, with deltas against a baseline run if given."""
+    def delta(section, key, name=None):
+        if not baseline:
+            return ""
+        base = baseline.get(section, {})
+        base = base.get(name, {}) if name else base
+        if key not in base:
+            return ""
+        current = (results[section][name] if name else results[section])[key]
+        return f" ({(current - base[key]) * 1000:+.1f}ms)"
+
+    config = results["config"]
+    print(f"\n{config['questions'] * config['repeat']} questions, concurrency {config['concurrency']} "
+          f"({config['mode']}), wall {results['wall_s']}s, {results['throughput_qps']} q/s")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = [("end_to_end", results["end_to_end"], None)]
+    rows += [(node, stats, node) for node, stats in results["nodes"].items()]
+    for name, stats, node in rows:
+        if not stats.get("count"):
+            continue
+        section = "nodes" if node else "end_to_end"
+        print(f"{name:<16}{stats['count']:>7}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+              f"{stats['p99'] * 1000:>10.1f}{delta(section, 'p95', node)}")
+    memory = results["memory"]
+    print(f"memory: peak RSS {memory['peak_rss_mb']} MB, end RSS {memory['rss_end_mb']} MB")
+    if results["errors"]["count"]:
+        print(f"errors: {results['errors']['count']} (e.g. {results['errors']['examples'][0]})")
+
+
+def main():
+    from batch import read_questions
+
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark with local fakes.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSONL question corpus")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times")
+    parser.add_argument("--mode", choices=("async", "sync"), default="async")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--output-tokens", type=int, default=60)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--speculative", action="store_true", help="Enable speculative retrieval")
+    parser.add_argument("--answer-cache", action="store_true", help="Enable the semantic answer cache")
+    parser.add_argument("--microbatch", action="store_true", help="Coalesce concurrent vector searches")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare p95s against")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        read_questions(args.questions), concurrency=args.concurrency, repeat=args.repeat, mode=args.mode,
+        llm_latency=args.llm_latency, token_latency=args.token_latency, output_tokens=args.output_tokens,
+        search_latency=args.search_latency, speculative=args.speculative, answer_cache=args.answer_cache,
+        microbatch=args.microbatch, warmup=args.warmup,
+    )
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join("benchmarks", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# bm25.py
+"""
+In-process BM25 keyword index and hybrid (BM25 + vector) retrieval.
+
+The BM25 inverted index is built from the same chunk set as the vector store
+during ingestion and persisted as JSON next to the manifest. At query time
+``HybridRetriever`` runs both retrievers and merges their rankings with
+reciprocal rank fusion (RRF), which helps with exact tokens such as game
+titles, platform names and error codes that dense MiniLM vectors miss.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def doc_key(doc):
+    """Stable identity of a chunk for fusing results from different retrievers."""
+    return doc.metadata.get("chunk_id") or getattr(doc, "id", None) or doc.page_content
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks.
+
+    Args:
+        docs (list): [{"id", "text", "metadata"}] records
+        postings (dict): term -> [[doc index, term frequency], ...]
+        doc_lengths (list): Token count per document
+    """
+
+    def __init__(self, docs, postings, doc_lengths):
+        self.docs = docs
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        n = len(docs)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in postings.items()
+        }
+
+    @classmethod
+    def build(cls, documents):
+        """
+        Build an index from LangChain Documents.
+        """
+        docs, doc_lengths = [], []
+        postings = defaultdict(list)
+        for i, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            for term, tf in Counter(tokens).items():
+                postings[term].append([i, tf])
+            doc_lengths.append(len(tokens))
+            docs.append({"id": doc_key(doc), "text": doc.page_content, "metadata": doc.metadata})
+        return cls(docs, dict(postings), doc_lengths)
+
+    def search(self, query, k=10):
+        """
+        Return the top-k (Document, score) pairs for a query.
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[i] / (self.avg_length or 1))
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            (Document(page_content=self.docs[i]["text"], metadata=self.docs[i]["metadata"]), score)
+            for i, score in top
+        ]
+
+    def save(self, path):
+        """Atomically write the index as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"docs": self.docs, "postings": self.postings, "doc_lengths": self.doc_lengths}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["docs"], data["postings"], data["doc_lengths"])
+
+    def __len__(self):
+        return len(self.docs)
+
+
+def reciprocal_rank_fusion(rankings, weights=None, rrf_k=60):
+    """
+    Fuse ranked document lists with weighted reciprocal rank fusion.
+
+    Args:
+        rankings (list): Ranked lists of Documents, best first
+        weights (list): Weight per ranking (defaults to 1.0 each)
+        rrf_k (int): RRF smoothing constant
+
+    Returns:
+        list: Documents ordered by fused score
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = defaultdict(float)
+    first_seen = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, 1):
+            key = doc_key(doc)
+            scores[key] += weight / (rrf_k + rank)
+            first_seen.setdefault(key, doc)
+    return [first_seen[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieve with the vector store and BM25, fused with RRF.
+
+    Attributes:
+        vector_store: LangChain vector store (or MicroBatchSearch) for dense retrieval
+        bm25: BM25Index built from the same chunks
+        k (int): Number of fused documents to return
+        vector_k (int): Candidates fetched from the vector store
+        bm25_k (int): Candidates fetched from BM25
+        vector_weight (float): RRF weight of the dense ranking
+        bm25_weight (float): RRF weight of the BM25 ranking
+        rrf_k (int): RRF smoothing constant
+    """
+
+    vector_store: object
+    bm25: object
+    k: int = 5
+    vector_k: int = 10
+    bm25_k: int = 10
+    vector_weight: float = 1.0
+    bm25_weight: float = 1.0
+    rrf_k: int = 60
+
+    def _fuse(self, dense, sparse, k):
+        fused = reciprocal_rank_fusion(
+            [dense, sparse], weights=[self.vector_weight, self.bm25_weight], rrf_k=self.rrf_k
+        )
+        return fused[:k]
+
+    def fuse(self, query, dense, k=None):
+        """
+        Fuse an already-computed dense ranking for query with BM25.
+
+        For callers that run the vector search themselves (batch.py searches
+        every question in one matrix product); pass at least vector_k dense
+        results to get the same ranking as invoke().
+
+        Returns:
+            list: Top k fused documents
+        """
+        k = k or self.k
+        sparse = [doc for doc, _ in self.bm25.search(query, k=max(self.bm25_k, k))]
+        return self._fuse(dense, sparse, k)
+
+    def _get_relevant_documents(self, query, *, run_manager=None, **kwargs):
+        k = kwargs.get("k", self.k)
+        dense = self.vector_store.similarity_search(query, k=max(self.vector_k, k))
+        return self.fuse(query, dense, k)
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None, **kwargs):
+        k = kwargs.get("k", self.k)
+        # BM25 scoring is pure Python: keep it off the event loop, overlapped with the dense search
+        dense, hits = await asyncio.gather(
+            self.vector_store.asimilarity_search(query, k=max(self.vector_k, k)),
+            asyncio.to_thread(self.bm25.search, query, k=max(self.bm25_k, k)),
+        )
+        return self._fuse(dense, [doc for doc, _ in hits], k)
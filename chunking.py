@@ -1,85 +1,271 @@
-import cassio
 from dotenv import load_dotenv
+import logging
 import os
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, DirectoryLoader
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.indexes.vectorstore import VectorStoreIndexWrapper
-from langchain_community.vectorstores import Cassandra
 
-# Global variable to store the initialized retriever
+# Heavy modules (langchain text splitters, sentence-transformers/torch,
+# cassio) are imported inside the functions that need them, so importing the
+# graph stays cheap and cold starts only pay for what they use.
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "./data/"
+TABLE_NAME = "test11"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# "torch" (sentence-transformers) or "onnx" (exported model, see onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# tiktoken encoding used to measure chunk sizes (and prompt context budgets)
+TOKEN_ENCODING = "gpt2"
+# "structured" (boilerplate-stripped, split by section, see sections.py) or
+# "recursive" (fixed-size token windows over the raw article text)
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structured").lower()
+# "astra" (Cassandra on Astra DB) or "local" (memory-mapped index in INDEX_DIR)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "astra").lower()
+# Prebuilt warm-start artifact (see warmup.py): saved models plus index files
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+# Where the ingestion manifest (and any local index files) live
+INDEX_DIR = os.getenv("INDEX_DIR") or (os.path.join(SNAPSHOT_DIR, "index") if SNAPSHOT_DIR else "./index")
+MANIFEST_PATH = os.path.join(INDEX_DIR, f"{TABLE_NAME}.{VECTOR_STORE_BACKEND}.manifest.json")
+BM25_PATH = os.path.join(INDEX_DIR, f"{TABLE_NAME}.{VECTOR_STORE_BACKEND}.bm25.json")
+
+# Hybrid BM25 + vector retrieval (reciprocal rank fusion)
+HYBRID_ENABLED = os.getenv("HYBRID_ENABLED", "true").lower() in ("1", "true", "yes")
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
+HYBRID_VECTOR_K = int(os.getenv("HYBRID_VECTOR_K", "10"))
+HYBRID_BM25_K = int(os.getenv("HYBRID_BM25_K", "10"))
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_BM25_WEIGHT = float(os.getenv("HYBRID_BM25_WEIGHT", "1.0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# When reranking, the retriever over-fetches this many candidates (see rerank.py)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
+
+def snapshot_path(name):
+    """Path of an artifact inside SNAPSHOT_DIR, or None if there is no such artifact."""
+    if not SNAPSHOT_DIR:
+        return None
+    path = os.path.join(SNAPSHOT_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+# Global variables to store the initialized components
 retriever = None
+embeddings = None
+vector_store = None
 
-def initialize_and_populate_vectorstore():
+
+def load_documents():
     """
-    Initialize Astra DB connection and populate vector store with gaming support documentation.
-    Returns the retriever (initializes only once).
+    Load the support articles from the local data directory.
+
+    Returns:
+        list: LangChain documents, one per article (source/url/title/id metadata)
     """
-    global retriever
-    
-    # If already initialized, return the retriever
-    if retriever is not None:
-        print("---USING EXISTING VECTOR STORE---")
-        return retriever
-    
-    print("---INITIALIZING VECTOR STORE (FIRST TIME)---")
-    # Load environment variables
-    load_dotenv()
-    
+    from articles import load_articles
+
+    logger.info("Loading documents from local repository...")
+    docs_list = load_articles(DATA_DIR)
+    logger.info("Loaded %d articles.", len(docs_list))
+    return docs_list
+
+
+def split_documents(docs_list, strategy=None):
+    """
+    Split documents into the chunks that get embedded.
+
+    Args:
+        docs_list (list): Documents returned by load_documents()
+        strategy (str): "structured" or "recursive" (defaults to CHUNKING_STRATEGY)
+
+    Returns:
+        list: Document chunks
+    """
+    strategy = strategy or CHUNKING_STRATEGY
+    logger.info("Splitting documents (%s)...", strategy)
+    if strategy == "structured":
+        from sections import split_structured
+
+        return split_structured(docs_list)
+    if strategy != "recursive":
+        raise ValueError(f"Unknown CHUNKING_STRATEGY: {strategy!r} (expected 'structured' or 'recursive')")
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from sections import count_tokens
+
+    # Lengths in TOKEN_ENCODING tokens, through the shared encoding instance
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,  # Increased from 400
+        chunk_overlap=100,  # Increased overlap
+        length_function=count_tokens,
+    )
+    return text_splitter.split_documents(docs_list)
+
+
+def embedding_id():
+    """
+    Model the vectors come from, e.g. "all-MiniLM-L6-v2@onnx-int8".
+
+    Recorded in the ingestion manifest; a change forces a re-embed. The fp32
+    ONNX export reproduces the torch vectors (see onnx_embeddings.py), so it
+    shares the plain model name; only the int8 model is tagged.
+    """
+    if EMBEDDING_BACKEND == "onnx":
+        from onnx_embeddings import ONNX_QUANTIZED, cache_suffix
+
+        if ONNX_QUANTIZED:
+            return EMBEDDING_MODEL + cache_suffix(True)
+    return EMBEDDING_MODEL
+
+
+def get_embeddings():
+    """
+    Return the embedding service (loaded once per process).
+
+    Batch size, worker processes and caches are configured in embeddings.py.
+    """
+    global embeddings
+
+    if embeddings is None:
+        logger.info("Initializing %s embeddings...", EMBEDDING_BACKEND)
+        if EMBEDDING_BACKEND == "onnx":
+            from onnx_embeddings import ONNX_MODEL_DIR, OnnxEmbeddingService
+
+            embeddings = OnnxEmbeddingService(model_name=EMBEDDING_MODEL,
+                                              model_dir=snapshot_path("onnx") or ONNX_MODEL_DIR)
+        elif EMBEDDING_BACKEND == "torch":
+            from embeddings import EmbeddingService
+
+            embeddings = EmbeddingService(model_name=EMBEDDING_MODEL, model_path=snapshot_path("model"))
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND!r} (expected 'torch' or 'onnx')")
+    return embeddings
+
+
+def get_vector_store():
+    """
+    Connect to the configured vector store without writing anything to it.
+
+    Returns:
+        VectorStore: The vector store (connected once per process)
+    """
+    global vector_store
+
+    if vector_store is not None:
+        return vector_store
+
+    if VECTOR_STORE_BACKEND == "local":
+        vector_store = _init_local_store()
+    elif VECTOR_STORE_BACKEND == "astra":
+        vector_store = _init_astra_store()
+    else:
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND!r} (expected 'astra' or 'local')")
+    return vector_store
+
+
+def _init_local_store():
+    from local_index import LocalVectorStore
+
+    logger.info("Opening local vector index in %s...", INDEX_DIR)
+    return LocalVectorStore(embedding=get_embeddings(), index_dir=INDEX_DIR, name=TABLE_NAME)
+
+
+def _init_astra_store():
+    import cassio
+    from langchain_community.vectorstores import Cassandra
+
     # Get values from environment variables
     ASTRA_DB_APPLICATION_TOKEN = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
     ASTRA_DB_ID = os.getenv("ASTRA_DB_ID")
-    
+
     # Verify the values are loaded
     if not ASTRA_DB_APPLICATION_TOKEN or not ASTRA_DB_ID:
         raise ValueError("Missing required environment variables: ASTRA_DB_APPLICATION_TOKEN and ASTRA_DB_ID")
-    
-    print(f"Token loaded: {bool(ASTRA_DB_APPLICATION_TOKEN)}")
-    print(f"DB ID loaded: {bool(ASTRA_DB_ID)}")
-    
+
+    logger.debug("Token loaded: %s", bool(ASTRA_DB_APPLICATION_TOKEN))
+    logger.debug("DB ID loaded: %s", bool(ASTRA_DB_ID))
+
     # Initialize Cassandra connection
     cassio.init(token=ASTRA_DB_APPLICATION_TOKEN, database_id=ASTRA_DB_ID)
-    
-    # URLs to scrape
-    print("Loading documents from local repository...")
-    
-    # Method 1: If you have text files in a directory
-    loader = DirectoryLoader(
-        path="./data/",
-        glob="**/*.txt",  # or "**/*.html" 
-        loader_cls=TextLoader,
-        show_progress=True
-    )
-    docs_list = loader.load()
-    
-    # Split documents - INCREASED CHUNK SIZE
-    print("Splitting documents...")
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=1000,  # Increased from 400
-        chunk_overlap=100  # Increased overlap
-    )
-    doc_splits = text_splitter.split_documents(docs_list)
-    
-    # Initialize embeddings
-    print("Initializing embeddings...")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    
+
     # Initialize Astra vector store
-    print("Initializing Astra vector store...")
-    astra_vector_store = Cassandra(
-        embedding=embeddings,
-        table_name="test11",
+    logger.info("Initializing Astra vector store...")
+    return Cassandra(
+        embedding=get_embeddings(),
+        table_name=TABLE_NAME,
         session=None,
         keyspace=None
     )
-    
-    # Add documents to vector store
-    print("Adding documents to vector store...")
-    astra_vector_store.add_documents(doc_splits)
-    print(f"Inserted {len(doc_splits)} document chunks.")
-    
-    # Create retriever with better search
-    retriever = astra_vector_store.as_retriever(search_kwargs={"k": 5})
-    
-    print("Vector store initialization complete!")
-    return retriever
\ No newline at end of file
+
+
+def initialize_and_populate_vectorstore():
+    """
+    Attach to the already-populated vector store and return a retriever.
+
+    Documents are written by the ingestion pipeline (``python ingest.py``),
+    so the serving path does no document embedding at startup. A store that
+    has never been ingested (no manifest yet), or was embedded with another
+    model, raises RuntimeError instead: run ``python ingest.py`` first.
+    Returns the retriever (initializes only once).
+    """
+    global retriever
+
+    # If already initialized, return the retriever
+    if retriever is not None:
+        logger.debug("---USING EXISTING VECTOR STORE---")
+        return retriever
+
+    k = RERANK_CANDIDATES if RERANK_ENABLED else RETRIEVAL_K
+
+    logger.info("---ATTACHING TO VECTOR STORE---")
+    # Ingestion never runs here: every serving worker would start it at once
+    # against the same manifest and table
+    if not os.path.exists(MANIFEST_PATH):
+        logger.error("No ingestion manifest at %s", MANIFEST_PATH)
+        raise RuntimeError(f"The vector store has not been ingested ({MANIFEST_PATH} is missing); "
+                           "run `python ingest.py` first")
+
+    from ingest import embedding_changed, load_manifest
+
+    if embedding_changed(load_manifest()):
+        logger.error("Index was embedded with another model than %s", embedding_id())
+        raise RuntimeError(f"The index was embedded with another model than {embedding_id()}; "
+                           "run `python ingest.py` to re-embed it")
+
+    store = get_vector_store()
+    search = store
+
+    from microbatch import MICROBATCH_ENABLED
+
+    if MICROBATCH_ENABLED:
+        from microbatch import MicroBatchSearch
+
+        # Concurrent queries share one batched encode + top-k
+        search = MicroBatchSearch(store, get_embeddings())
+
+    if HYBRID_ENABLED and os.path.exists(BM25_PATH):
+        from bm25 import BM25Index, HybridRetriever
+
+        logger.info("Loading BM25 index for hybrid retrieval...")
+        retriever = HybridRetriever(
+            vector_store=search,
+            bm25=BM25Index.load(BM25_PATH),
+            k=k,
+            vector_k=max(HYBRID_VECTOR_K, k),
+            bm25_k=max(HYBRID_BM25_K, k),
+            vector_weight=HYBRID_VECTOR_WEIGHT,
+            bm25_weight=HYBRID_BM25_WEIGHT,
+            rrf_k=HYBRID_RRF_K,
+        )
+    elif MICROBATCH_ENABLED:
+        from microbatch import BatchingRetriever
+
+        retriever = BatchingRetriever(search=search, k=k)
+    else:
+        # Create retriever with better search
+        retriever = store.as_retriever(search_kwargs={"k": k})
+
+    logger.info("Vector store initialization complete!")
+    return retriever
@@ -1,29 +1,108 @@
+from functools import partial
+
 from langgraph.graph import END, StateGraph, START
-from state import retrieve,web_search,generate
+from state import retrieve,web_search,generate,aretrieve,aweb_search,agenerate
 from graph import GraphState
-from edges import route_question
-from grader import grade_answer
+from edges import route_question, aroute_question
+from grader import grade_answer, agrade_answer
 from human import human_escalation
+from llm import get_registry
+from answer_cache import ANSWER_CACHE_ENABLED, CachedWorkflow, SemanticAnswerCache
+from tracing import configure_logging, traced
+from chunking import RERANK_ENABLED
+from rerank import rerank, arerank
+from memory import acontextualize, contextualize, get_checkpointer, remember, skip_route_if_reused
+from speculative import (SPECULATIVE_ENABLED, SPECULATIVE_WEB_SEARCH, make_async_speculative_router,
+                         make_speculative_router, next_after_dispatch)
+
 
+def build_workflow(registry=None, answer_cache=None, use_async=False, speculative=None, memory=False,
+                   checkpointer=None):
+    """
+    Build and compile the support workflow graph.
 
-def build_workflow():
+    Args:
+        registry: Chain registry to inject into the nodes. Defaults to the
+            process-wide registry, so LLM clients and chains are built once.
+        answer_cache (bool): Wrap the graph in the semantic answer cache.
+            Defaults to ANSWER_CACHE_ENABLED.
+        use_async (bool): Use the non-blocking node implementations; run the
+            result with ainvoke()/astream() on an event loop.
+        speculative (bool): Start retrieval (and optionally web search) while
+            the router runs. Defaults to SPECULATIVE_ENABLED.
+        memory (bool): Keep conversation memory per thread_id; the result must
+            then be run with a {"configurable": {"thread_id": ...}} config.
+        checkpointer: LangGraph checkpointer for memory. Defaults to the
+            SQLite checkpointer (pass an async saver for use_async graphs).
+    """
+    configure_logging()
+    registry = registry or get_registry()
     workflow = StateGraph(GraphState)
 
-    # Nodes
-    workflow.add_node("retrieve", retrieve)
-    workflow.add_node("web_search", web_search)
-    workflow.add_node("generate", generate)
-    workflow.add_node("grade", grade_answer)
-    workflow.add_node("human", human_escalation)
+    if use_async:
+        nodes = (aretrieve, arerank, aweb_search, agenerate, agrade_answer, aroute_question)
+    else:
+        nodes = (retrieve, rerank, web_search, generate, grade_answer, route_question)
+    retrieve_node, rerank_node, web_search_node, generate_node, grade_node, route_node = nodes
 
-    # Start → route
-    workflow.add_conditional_edges(
-        START,
-        route_question,
-        {"vectorstore": "retrieve","web_search": "web_search"},
-    )
+    # Nodes (each wrapped with latency/token tracing)
+    traced_retrieve = traced("retrieve", retrieve_node)
+    traced_web_search = traced("web_search", web_search_node)
+    traced_route = traced("route", partial(route_node, question_router=registry.router))
+    workflow.add_node("retrieve", traced_retrieve)
+    if RERANK_ENABLED:
+        workflow.add_node("rerank", traced("rerank", rerank_node))
+    workflow.add_node("web_search", traced_web_search)
+    workflow.add_node("generate", traced("generate", partial(generate_node, rag_chain=registry.generator)))
+    workflow.add_node("grade", traced("grade", partial(grade_node, structured_grader=registry.grader)))
+    workflow.add_node("human", traced("human", human_escalation))
+
+    if speculative is None:
+        speculative = SPECULATIVE_ENABLED
+    after_retrieve = "rerank" if RERANK_ENABLED else "generate"
 
-    workflow.add_edge("retrieve", "generate")
+    # Start → contextualize (memory) → route, or straight to rerank/generate
+    # when the previous turn's documents are reused
+    entry = START
+    if memory:
+        workflow.add_node("contextualize", traced("contextualize", acontextualize if use_async else contextualize))
+        workflow.add_node("remember", traced("remember", remember))
+        workflow.add_edge(START, "contextualize")
+        entry = "contextualize"
+
+    if speculative:
+        # Start → dispatch (route + speculative retrieval in parallel) → selected branch
+        branches = {"retrieve": traced_retrieve}
+        if SPECULATIVE_WEB_SEARCH:
+            branches["web_search"] = traced_web_search
+        make_router = make_async_speculative_router if use_async else make_speculative_router
+        workflow.add_node("dispatch", traced("dispatch", make_router(traced_route, branches)))
+        if memory:
+            workflow.add_conditional_edges(
+                entry,
+                lambda state: "reuse" if state.get("reused") else "dispatch",
+                {"reuse": after_retrieve, "dispatch": "dispatch"},
+            )
+        else:
+            workflow.add_edge(START, "dispatch")
+        workflow.add_conditional_edges(
+            "dispatch",
+            partial(next_after_dispatch, after_retrieve=after_retrieve),
+            {after_retrieve: after_retrieve, "web_search": "web_search", "generate": "generate"},
+        )
+    else:
+        # Start → route
+        workflow.add_conditional_edges(
+            entry,
+            skip_route_if_reused(traced_route) if memory else traced_route,
+            {"vectorstore": "retrieve","web_search": "web_search", "reuse": after_retrieve},
+        )
+
+    if RERANK_ENABLED:
+        workflow.add_edge("retrieve", "rerank")
+        workflow.add_edge("rerank", "generate")
+    else:
+        workflow.add_edge("retrieve", "generate")
     workflow.add_edge("web_search", "generate")
 
     # Answer → grade
@@ -33,10 +112,22 @@ def build_workflow():
     workflow.add_conditional_edges(
     "grade",
     lambda state: "END" if state.get("grade") == "good" else "human",
-    {"END": END, "human": "human"},
+    {"END": "remember" if memory else END, "human": "human"},
 )
 
     # Human → END
-    workflow.add_edge("human", END)
+    if memory:
+        workflow.add_edge("human", "remember")
+        workflow.add_edge("remember", END)
+    else:
+        workflow.add_edge("human", END)
+
+    if memory and checkpointer is None:
+        checkpointer = get_checkpointer(use_async)
+    graph = workflow.compile(checkpointer=checkpointer if memory else None)
 
-    return workflow.compile()
+    if answer_cache is None:
+        answer_cache = ANSWER_CACHE_ENABLED
+    if answer_cache:
+        return CachedWorkflow(graph, SemanticAnswerCache())
+    return graph
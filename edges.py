@@ -1,26 +1,72 @@
+import logging
 from pprint import pprint
 
-from router import initialize_question_router
+from prerouter import PREROUTER_ENABLED, preroute, record_route
 
+logger = logging.getLogger(__name__)
 
-def route_question(state):
+
+def _preroute(question):
+    """Cheap local rules first; returns None when the LLM router is needed."""
+    if PREROUTER_ENABLED:
+        datasource, confidence = preroute(question)
+        if datasource is not None:
+            record_route(f"prerouter:{datasource}")
+            logger.info("---PRE-ROUTED TO %s (confidence=%.2f)---", datasource, confidence)
+            return datasource
+
+    record_route("llm")
+    return None
+
+
+def _resolve_router(question_router):
+    if question_router is None:
+        from llm import get_registry
+        question_router = get_registry().router
+    return question_router
+
+
+def _next_node(source):
+    if source.datasource == "web_search":
+        logger.info("---ROUTE QUESTION TO Wiki SEARCH---")
+        return "web_search"
+    elif source.datasource == "vectorstore":
+        logger.info("---ROUTE QUESTION TO RAG---")
+        return "vectorstore"
+
+
+def route_question(state, question_router=None):
     """
     Route question to wiki search or RAG.
 
     Args:
         state (dict): The current graph state
+        question_router: Router chain built once by the chain registry
 
     Returns:
         str: Next node to call
     """
 
-    print("---ROUTE QUESTION---")
+    logger.info("---ROUTE QUESTION---")
     question = state["question"]
-    question_router=initialize_question_router()
-    source = question_router.invoke({"question": question})
-    if source.datasource == "web_search":
-        print("---ROUTE QUESTION TO Wiki SEARCH---")
-        return "web_search"
-    elif source.datasource == "vectorstore":
-        print("---ROUTE QUESTION TO RAG---")
-        return "vectorstore"
\ No newline at end of file
+    datasource = _preroute(question)
+    if datasource is not None:
+        return datasource
+
+    source = _resolve_router(question_router).invoke({"question": question})
+    return _next_node(source)
+
+
+async def aroute_question(state, question_router=None):
+    """
+    Async version of route_question().
+    """
+
+    logger.info("---ROUTE QUESTION---")
+    question = state["question"]
+    datasource = _preroute(question)
+    if datasource is not None:
+        return datasource
+
+    source = await _resolve_router(question_router).ainvoke({"question": question})
+    return _next_node(source)
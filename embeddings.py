@@ -0,0 +1,237 @@
+# embeddings.py
+"""
+Embedding service for ingestion and serving.
+
+Wraps the sentence-transformers model behind the LangChain ``Embeddings``
+interface and adds:
+
+- explicit batch sizing (``EMBEDDING_BATCH_SIZE``),
+- a CPU multi-process pool for bulk ingestion (``EMBEDDING_PROCESSES``),
+- an on-disk SQLite cache keyed by (model, text hash) so unchanged chunks
+  are never re-embedded across runs,
+- an in-memory LRU for query embeddings on the serving path.
+
+Vectors are produced exactly as ``HuggingFaceEmbeddings`` produced them
+(newlines replaced by spaces, no normalisation), so existing indexes stay
+compatible.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Worker processes for bulk encoding (0/1 = encode in this process)
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", "0"))
+# Only start the pool when there are at least this many texts to encode
+EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", "256"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./index/embedding_cache.sqlite3")
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "1024"))
+
+logger = logging.getLogger(__name__)
+
+# Every disk cache, so a forked child drops the parent's lock and connection
+_disk_caches = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for cache in list(_disk_caches):
+        cache._lock = threading.Lock()
+        cache._conn = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def embed_queries(embeddings, texts):
+    """
+    Embed queries with any LangChain embeddings, batched when supported.
+
+    Queries never go through embed_documents: on EmbeddingService that would
+    write every question into the persistent chunk cache.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class EmbeddingDiskCache:
+    """
+    SQLite store of text embeddings keyed by (model, text hash).
+
+    The connection is opened lazily in each process that uses the cache, so
+    a cache created before a fork (gunicorn preload) is never shared.
+
+    Args:
+        path (str): SQLite database file
+        model_name (str): Model the vectors belong to
+    """
+
+    def __init__(self, path, model_name):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        _disk_caches.add(self)
+
+    def _connection(self):
+        """This process's connection (call with the lock held)."""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """Return {text: vector} for the texts that are cached."""
+        keys = {self.key(text): text for text in texts}
+        found = {}
+        items = list(keys.items())
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(items), 500):
+                batch = items[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection().execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    [key for key, _ in batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, vectors):
+        """Store {text: vector}."""
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(self.key(text), np.asarray(vector, dtype=np.float32).tobytes()) for text, vector in vectors.items()],
+            )
+            conn.commit()
+
+
+class EmbeddingService(Embeddings):
+    """
+    Batched, cached sentence-transformers embeddings.
+
+    Args:
+        model_name (str): sentence-transformers model name or path
+        batch_size (int): Encode batch size
+        processes (int): CPU worker processes for bulk encoding
+        cache_path (str): On-disk cache file (None disables it)
+        query_cache_size (int): In-memory LRU size for query embeddings
+        model_path (str): Load the weights from this saved copy of model_name
+            (e.g. a warm-start snapshot) instead of the Hugging Face cache
+    """
+
+    # Namespace of the disk cache keys; backends with different numerics override it
+    cache_suffix = ""
+
+    def __init__(self, model_name, batch_size=EMBEDDING_BATCH_SIZE, processes=EMBEDDING_PROCESSES,
+                 cache_path=EMBEDDING_CACHE_PATH, query_cache_size=EMBEDDING_QUERY_CACHE_SIZE, model_path=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes
+        self.model = self._load_model(model_path or model_name)
+        self.disk_cache = EmbeddingDiskCache(cache_path, model_name + self.cache_suffix) if cache_path else None
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        self._pool = None
+
+    def _load_model(self, path):
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(path, device="cpu")
+
+    def _encode(self, texts):
+        """Encode texts, using the multi-process pool for large inputs."""
+        texts = [text.replace("\n", " ") for text in texts]
+        if self.processes > 1 and len(texts) >= EMBEDDING_POOL_MIN_TEXTS:
+            if self._pool is None:
+                logger.info("Starting %d embedding worker processes...", self.processes)
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            vectors = self.model.encode(texts, pool=self._pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_documents(self, texts, store=True):
+        """
+        Embed documents through the disk cache.
+
+        Args:
+            texts (list): Texts to embed
+            store (bool): Write newly encoded texts to the disk cache; pass
+                False for one-off texts (web snippets, grading contexts) that
+                would only bloat it (cached vectors are still reused)
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        cached = self.disk_cache.get_many(texts) if self.disk_cache else {}
+        missing = list(dict.fromkeys(text for text in texts if text not in cached))
+        if missing:
+            logger.info("Embedding %d texts (%d cached)", len(missing), len(texts) - len(missing))
+            computed = dict(zip(missing, self._encode(missing)))
+            if self.disk_cache and store:
+                self.disk_cache.put_many(computed)
+            cached.update(computed)
+        return [cached[text].tolist() for text in texts]
+
+    def embed_query(self, text):
+        with self._query_lock:
+            if text in self._query_cache:
+                self._query_cache.move_to_end(text)
+                return list(self._query_cache[text])
+        vector = self._encode([text])[0].tolist()
+        with self._query_lock:
+            self._query_cache[text] = vector
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return list(vector)
+
+    def embed_queries(self, texts):
+        """
+        Embed several queries with one encode call, sharing the query LRU.
+        """
+        texts = list(texts)
+        found = {}
+        with self._query_lock:
+            for text in texts:
+                if text in self._query_cache:
+                    self._query_cache.move_to_end(text)
+                    found[text] = self._query_cache[text]
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            computed = {text: vector.tolist() for text, vector in zip(missing, self._encode(missing))}
+            with self._query_lock:
+                for text, vector in computed.items():
+                    self._query_cache[text] = vector
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+            found.update(computed)
+        return [list(found[text]) for text in texts]
+
+    def close(self):
+        """Stop the multi-process pool if one was started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
@@ -0,0 +1,264 @@
+# fakes.py
+"""
+Deterministic local stand-ins for the network and model dependencies.
+
+Used by benchmark.py to run the real graph from ``compile.build_workflow()``
+on a machine with no network and no downloaded models:
+
+- ``FakeChatModel``: streams a fixed number of tokens with configurable
+  first-token and per-token latency and reports usage_metadata,
+- ``FakeRegistry``: router/generator/grader chains with the same interfaces
+  as ``llm.ChainRegistry`` (routing uses the prerouter's keyword scores),
+- ``HashEmbeddings``: hashed bag-of-words vectors instead of MiniLM,
+- ``FakeCrossEncoder``: token-overlap scores instead of the rerank model,
+- ``WordEncoding``: one token per word or punctuation mark instead of
+  tiktoken, whose BPE files would otherwise be downloaded on first use,
+- a ``LocalVectorStore`` + BM25 index built from the article corpus,
+- the stub web search provider from websearch.py.
+
+``install_fakes()`` wires all of them into the module-level singletons the
+nodes use.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text):
+    return WORD_RE.findall(text.lower())
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that echoes context words with simulated latency.
+
+    Attributes:
+        latency (float): Seconds before the first token
+        token_latency (float): Seconds per output token
+        output_tokens (int): Tokens per answer
+    """
+
+    latency: float = 0.3
+    token_latency: float = 0.01
+    output_tokens: int = 60
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _tokens(self, messages):
+        """Answer tokens taken from the prompt's context, so local grading sees an on-topic answer."""
+        prompt = messages[-1].content if messages else ""
+        context = prompt.split("CONTEXT:", 1)[-1]
+        words = _words(context) or ["ok"]
+        return [words[i % len(words)] + " " for i in range(self.output_tokens)]
+
+    def _usage(self, messages):
+        prompt_tokens = sum(len(_words(str(message.content))) for message in messages)
+        return {"input_tokens": prompt_tokens, "output_tokens": self.output_tokens,
+                "total_tokens": prompt_tokens + self.output_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency + self.token_latency * self.output_tokens)
+        message = AIMessage(content="".join(self._tokens(messages)), usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            usage = self._usage(messages) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.token_latency)
+            usage = self._usage(messages) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def _timed_runnable(latency, fn):
+    """Runnable that waits latency seconds, then returns fn(input)."""
+    def call(inputs):
+        time.sleep(latency)
+        return fn(inputs)
+
+    async def acall(inputs):
+        await asyncio.sleep(latency)
+        return fn(inputs)
+
+    return RunnableLambda(call, afunc=acall)
+
+
+def _fake_route(inputs):
+    from prerouter import score_question
+    from router import RouteQuery
+
+    scores = score_question(inputs["question"])
+    datasource = "web_search" if scores.get("web_search", 0) > scores.get("vectorstore", 0) else "vectorstore"
+    return RouteQuery(datasource=datasource)
+
+
+def _fake_grade(inputs):
+    from grader import GradeAnswer
+
+    return GradeAnswer(grade="good", reason="fake grader")
+
+
+class FakeRegistry:
+    """
+    Drop-in for llm.ChainRegistry backed by fakes.
+
+    Args:
+        router_latency (float): Seconds per routing call
+        grader_latency (float): Seconds per LLM grading call
+        chat_model (FakeChatModel): Model used by the generation chain
+    """
+
+    def __init__(self, router_latency=0.3, grader_latency=0.3, chat_model=None):
+        from state import build_rag_chain
+
+        self.router = _timed_runnable(router_latency, _fake_route)
+        self.generator = build_rag_chain(chat_model or FakeChatModel())
+        self.grader = _timed_runnable(grader_latency, _fake_grade)
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic hashed bag-of-words embeddings.
+
+    Args:
+        dim (int): Vector size
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _words(text):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeCrossEncoder:
+    """Scores (question, passage) pairs by word overlap."""
+
+    def predict(self, pairs, batch_size=32):
+        scores = []
+        for question, passage in pairs:
+            query = set(_words(question))
+            scores.append(len(query & set(_words(passage))) / (len(query) or 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+class WordEncoding:
+    """tiktoken stand-in counting words and punctuation marks as tokens."""
+
+    TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+    def encode(self, text):
+        return self.TOKEN_RE.findall(text)
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def build_local_index(embeddings, index_dir=None, documents=None):
+    """
+    Build a LocalVectorStore and BM25 index over the article chunks.
+
+    Returns:
+        tuple: (LocalVectorStore, BM25Index, chunks)
+    """
+    from bm25 import BM25Index
+    from chunking import load_documents, split_documents
+    from ingest import chunk_id
+    from local_index import LocalVectorStore
+
+    index_dir = index_dir or tempfile.mkdtemp(prefix="bench-index-")
+    chunks = split_documents(documents if documents is not None else load_documents())
+    for chunk in chunks:
+        chunk.metadata["chunk_id"] = chunk_id(chunk)
+    store = LocalVectorStore(embedding=embeddings, index_dir=index_dir, name="bench")
+    store.add_texts([c.page_content for c in chunks], [c.metadata for c in chunks],
+                    ids=[c.metadata["chunk_id"] for c in chunks])
+    return store, BM25Index.build(chunks), chunks
+
+
+def install_fakes(llm_latency=0.3, token_latency=0.01, output_tokens=60, router_latency=None,
+                  grader_latency=None, search_latency=0.2, index_dir=None, microbatch=False):
+    """
+    Replace the model, search and vector-store singletons with local fakes.
+
+    Args:
+        llm_latency (float): First-token latency of the generation model
+        token_latency (float): Per-token latency of the generation model
+        output_tokens (int): Tokens per generated answer
+        router_latency (float): Router call latency (defaults to llm_latency)
+        grader_latency (float): LLM grader latency (defaults to llm_latency)
+        search_latency (float): Stub web search latency
+        index_dir (str): Where to build the local index (temp dir by default)
+        microbatch (bool): Send vector searches through a MicroBatchSearch
+
+    Returns:
+        FakeRegistry: Pass to compile.build_workflow(registry=...)
+    """
+    import chunking
+    import rerank
+    from bm25 import HybridRetriever
+    from websearch import WEB_SEARCH_STUB_PATH, StubSearchProvider, WebSearchClient, set_web_search
+
+    # Chunking, context packing and memory budgets all count through this instance
+    rerank._encoding = WordEncoding()
+    embeddings = HashEmbeddings()
+    store, bm25, _ = build_local_index(embeddings, index_dir)
+    k = chunking.RERANK_CANDIDATES if chunking.RERANK_ENABLED else chunking.RETRIEVAL_K
+    chunking.embeddings = embeddings
+    chunking.vector_store = store
+    if microbatch:
+        from microbatch import MicroBatchSearch
+
+        store = MicroBatchSearch(store, embeddings)
+    chunking.retriever = HybridRetriever(vector_store=store, bm25=bm25, k=k,
+                                         vector_k=max(chunking.HYBRID_VECTOR_K, k),
+                                         bm25_k=max(chunking.HYBRID_BM25_K, k))
+    rerank._cross_encoder = FakeCrossEncoder()
+
+    # No cache: every web-routed question pays the simulated search latency
+    set_web_search(WebSearchClient(StubSearchProvider.from_file(WEB_SEARCH_STUB_PATH, latency=search_latency)))
+
+    return FakeRegistry(
+        router_latency=llm_latency if router_latency is None else router_latency,
+        grader_latency=llm_latency if grader_latency is None else grader_latency,
+        chat_model=FakeChatModel(latency=llm_latency, token_latency=token_latency, output_tokens=output_tokens),
+    )
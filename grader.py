@@ -1,47 +1,30 @@
 # grader.py
-from langchain_groq import ChatGroq
-from langchain_core.pydantic_v1 import BaseModel, Field
-from dotenv import load_dotenv
+import asyncio
+import logging
 import os
-import re
-
-class GradeAnswer(BaseModel):
-    grade: str = Field(description="The grade of the answer, either 'good' or 'poor'")
-    reason: str = Field(description="Brief reason for the grade")
 
-def grade_answer(state):
-    """
-    Evaluate the quality of the generated answer.
-    """
-    load_dotenv()
-
-    print("---GRADE ANSWER---")
-    answer = state.get("generation", "")
-    question = state["question"]
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
 
-    # Extract just the content if it's a message object
-    if hasattr(answer, 'content'):
-        answer_text = answer.content
-    else:
-        answer_text = str(answer)
+from chunking import get_embeddings
+from embeddings import EmbeddingService
+from tracing import METRICS
 
-    print(f"DEBUG - Answer to grade: {answer_text}")
+load_dotenv()
 
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        raise ValueError("GROQ_API_KEY not found.")
+logger = logging.getLogger(__name__)
 
-    # Use a reliable model
-    llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0.1)
-    
-    # Create structured output grader
-    structured_grader = llm.with_structured_output(GradeAnswer)
+class GradeAnswer(BaseModel):
+    grade: str = Field(description="The grade of the answer, either 'good' or 'poor'")
+    reason: str = Field(description="Brief reason for the grade")
 
-    grading_prompt = f"""
+GRADING_PROMPT = ChatPromptTemplate.from_messages([("human", """
     Evaluate this customer support answer:
 
     QUESTION: {question}
-    ANSWER: {answer_text}
+    ANSWER: {answer}
 
     GRADE CRITERIA:
     - "good": Answer is helpful, accurate, and addresses the question
@@ -63,26 +46,198 @@ def grade_answer(state):
     - Answers that don't address the question
 
     Provide your grade and a brief reason.
+    """)])
+
+
+def build_answer_grader(llm):
     """
-    
+    Build the structured-output grading chain.
+
+    Args:
+        llm: Chat model used for grading
+
+    Returns:
+        The prompt | structured llm chain producing GradeAnswer
+    """
+    return GRADING_PROMPT | llm.with_structured_output(GradeAnswer)
+
+
+REFUSAL_PHRASES = ["i don't know", "unfortunately", "sorry", "cannot help"]
+
+# "llm": always call the LLM grader
+# "tiered": local check first, LLM only when it is inconclusive
+# "deferred": local check first; inconclusive answers are provisionally
+#             "good" and the caller confirms them with confirm_grade() later
+GRADER_MODE = os.getenv("GRADER_MODE", "tiered").lower()
+# Max answer/context cosine similarity thresholds for the local tier
+GRADER_GOOD_SIMILARITY = float(os.getenv("GRADER_GOOD_SIMILARITY", "0.6"))
+GRADER_POOR_SIMILARITY = float(os.getenv("GRADER_POOR_SIMILARITY", "0.3"))
+
+GRADER_TIERS = METRICS.counter("rag_grader_tier_total", "Answers graded by tier and outcome")
+
+
+def _answer_text(state):
+    answer = state.get("generation", "")
+
+    # Extract just the content if it's a message object
+    if hasattr(answer, 'content'):
+        return answer.content
+    else:
+        return str(answer)
+
+
+def _resolve_grader(structured_grader):
+    if structured_grader is None:
+        from llm import get_registry
+        structured_grader = get_registry().grader
+    return structured_grader
+
+
+def _context_texts(documents):
+    if hasattr(documents, "page_content"):
+        return [documents.page_content]
+    if isinstance(documents, list):
+        return [doc.page_content for doc in documents if hasattr(doc, "page_content")]
+    return []
+
+
+def _embed_contexts(embeddings, contexts):
+    # Indexed chunks are usually in the disk cache already; web snippets and
+    # truncated chunks are one-off, so look up without storing the misses
+    if isinstance(embeddings, EmbeddingService):
+        return embeddings.embed_documents(contexts, store=False)
+    return embeddings.embed_documents(contexts)
+
+
+def local_grade(answer_text, documents):
+    """
+    Cheap grading tier: refusal phrases plus answer/context embedding similarity.
+
+    Args:
+        answer_text (str): The generated answer
+        documents: Context documents the answer was generated from
+
+    Returns:
+        tuple: ("good", "poor" or None when inconclusive, similarity)
+    """
+    refusal = any(phrase in answer_text.lower() for phrase in REFUSAL_PHRASES)
+    contexts = _context_texts(documents)
+    if not answer_text.strip() or not contexts:
+        return ("poor" if refusal or not answer_text.strip() else None), 0.0
+
+    embeddings = get_embeddings()
+    answer_vector = np.asarray(embeddings.embed_query(answer_text), dtype=np.float32)
+    context_vectors = np.asarray(_embed_contexts(embeddings, contexts), dtype=np.float32)
+    norms = np.linalg.norm(context_vectors, axis=1) * (np.linalg.norm(answer_vector) or 1.0)
+    norms[norms == 0] = 1.0
+    similarity = float(np.max(context_vectors @ answer_vector / norms))
+
+    if not refusal and similarity >= GRADER_GOOD_SIMILARITY:
+        return "good", similarity
+    if refusal and similarity < GRADER_POOR_SIMILARITY:
+        return "poor", similarity
+    return None, similarity
+
+
+def _local_tier(state, answer_text, mode):
+    """Return the grade update if the local tier decides, otherwise None."""
+    if mode == "llm":
+        return None
+    verdict, similarity = local_grade(answer_text, state.get("documents"))
+    logger.debug("Local grade: %s (similarity=%.3f)", verdict, similarity)
+    if verdict is not None:
+        GRADER_TIERS.inc(tier="local", grade=verdict)
+        logger.info("Final grade: %s (local)", verdict)
+        return {"grade": verdict, "grade_tier": "local", "grade_pending": False}
+    if mode == "deferred":
+        GRADER_TIERS.inc(tier="deferred", grade="pending")
+        logger.info("Grade deferred, answer provisionally good")
+        return {"grade": "good", "grade_tier": "deferred", "grade_pending": True}
+    return None
+
+
+def _final_grade(result):
+    logger.debug("Grade result: %s, Reason: %s", result.grade, result.reason)
+
+    # Ensure lowercase and clean up
+    grade = result.grade.lower().strip()
+    if 'good' in grade:
+        final_grade = "good"
+    else:
+        final_grade = "poor"
+
+    GRADER_TIERS.inc(tier="llm", grade=final_grade)
+    logger.info("Final grade: %s", final_grade)
+    return {"grade": final_grade, "grade_tier": "llm", "grade_pending": False}
+
+
+def _fallback_grade(answer_text, error):
+    logger.warning("Error in grading: %s", error)
+    GRADER_TIERS.inc(tier="fallback", grade="error")
+    # Fallback: use simple rule-based grading
+    if any(phrase in answer_text.lower() for phrase in REFUSAL_PHRASES):
+        return {"grade": "poor", "grade_tier": "fallback", "grade_pending": False}
+    else:
+        return {"grade": "good", "grade_tier": "fallback", "grade_pending": False}
+
+
+def confirm_grade(state, structured_grader=None):
+    """
+    Run the LLM grade for an answer (used to confirm deferred grades).
+
+    Returns:
+        dict: grade update; "poor" means the shown answer should be retracted
+    """
+    answer_text = _answer_text(state)
+    try:
+        result = _resolve_grader(structured_grader).invoke({"question": state["question"], "answer": answer_text})
+        return _final_grade(result)
+    except Exception as e:
+        return _fallback_grade(answer_text, e)
+
+
+def grade_answer(state, structured_grader=None, mode=None):
+    """
+    Evaluate the quality of the generated answer.
+
+    The cheap local tier runs first (unless GRADER_MODE is "llm"); the LLM
+    grader only runs when it is inconclusive.
+    """
+    logger.info("---GRADE ANSWER---")
+    answer_text = _answer_text(state)
+    logger.debug("Answer to grade: %s", answer_text)
+
+    decided = _local_tier(state, answer_text, mode or GRADER_MODE)
+    if decided is not None:
+        return decided
+    return confirm_grade(state, structured_grader)
+
+
+async def agrade_answer(state, structured_grader=None, mode=None):
+    """
+    Async version of grade_answer().
+    """
+    logger.info("---GRADE ANSWER---")
+    answer_text = _answer_text(state)
+    logger.debug("Answer to grade: %s", answer_text)
+
+    decided = await asyncio.to_thread(_local_tier, state, answer_text, mode or GRADER_MODE)
+    if decided is not None:
+        return decided
+
     try:
-        result = structured_grader.invoke(grading_prompt)
-        print(f"DEBUG - Grade result: {result.grade}, Reason: {result.reason}")
-        
-        # Ensure lowercase and clean up
-        grade = result.grade.lower().strip()
-        if 'good' in grade:
-            final_grade = "good"
-        else:
-            final_grade = "poor"
-            
-        print(f"Final grade: {final_grade}")
-        return {"grade": final_grade}
-        
+        result = await _resolve_grader(structured_grader).ainvoke({"question": state["question"], "answer": answer_text})
+        return _final_grade(result)
     except Exception as e:
-        print(f"Error in grading: {e}")
-        # Fallback: use simple rule-based grading
-        if any(phrase in answer_text.lower() for phrase in ["i don't know", "unfortunately", "sorry", "cannot help"]):
-            return {"grade": "poor"}
-        else:
-            return {"grade": "good"}
\ No newline at end of file
+        return _fallback_grade(answer_text, e)
+
+
+def grader_stats():
+    """
+    Share of graded answers decided by each tier.
+    """
+    counts = {}
+    for tier in ("local", "deferred", "llm", "fallback"):
+        counts[tier] = sum(value for labels, value in GRADER_TIERS.items() if labels.get("tier") == tier)
+    total = sum(counts.values())
+    return {tier: {"count": count, "rate": (count / total) if total else 0.0} for tier, count in counts.items()}
@@ -11,8 +11,28 @@ class GraphState(TypedDict):
         generation: The LLM-generated answer
         documents: Retrieved documents
         grade: Evaluation of the answer (good/poor)
+        grade_tier: Grader tier that decided (local/llm/deferred/fallback)
+        grade_pending: True when a deferred grade still needs LLM confirmation
+        route: Datasource chosen by the router (speculative mode)
+        search_query: Query used for retrieval (question plus follow-up context)
+        candidates: Retrieved documents before reranking
+        reused: True when the previous turn's documents were reused
+        conversation: Token-bounded conversation block for the generate prompt
+        history: Recent turns [{"question", "answer"}] (checkpointed)
+        summary: Compacted summary of older turns (checkpointed)
+        last_documents: Candidates of the previous good answer (checkpointed)
     """
     question: str
     generation: str
     documents: List[str]
     grade: str  # "good" or "poor"
+    grade_tier: str
+    grade_pending: bool
+    route: str
+    search_query: str
+    candidates: List[str]
+    reused: bool
+    conversation: str
+    history: List[dict]
+    summary: str
+    last_documents: List[str]
@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for server.py.
+
+    gunicorn server:app -c gunicorn.conf.py
+
+The app is preloaded in the master, which loads the embedding model and the
+mmapped local index once before forking, so workers share those pages
+instead of each loading its own copy. The master only loads; each worker
+runs the warm-up queries after the fork (server.lifespan), so no inference
+thread pool or SQLite connection is inherited.
+"""
+import os
+
+bind = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("SERVER_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Generation can stream for a while; keep this above SERVER_REQUEST_TIMEOUT
+timeout = int(os.getenv("SERVER_WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    from server import load_shared_resources
+
+    load_shared_resources()
@@ -0,0 +1,159 @@
+# ingest.py
+"""
+Incremental ingestion pipeline for the support vector store.
+
+Every chunk gets a deterministic ID derived from its source and content, and
+the IDs written to the store are recorded in a manifest file. Re-running the
+pipeline only embeds chunks that are new or changed and deletes chunks whose
+source (or content) disappeared, so unchanged documents are never re-embedded.
+The manifest also records the embedding model (see chunking.embedding_id);
+when that changes, everything is re-embedded.
+
+Usage:
+    python ingest.py            # incremental update
+    python ingest.py --rebuild  # clear the table and ingest everything
+
+To ingest straight from the Zendesk API instead of ./data/, use zendesk.py.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+from bm25 import BM25Index
+from chunking import (BM25_PATH, EMBEDDING_MODEL, MANIFEST_PATH, TABLE_NAME, embedding_id, get_vector_store,
+                      load_documents, split_documents)
+
+MANIFEST_VERSION = 1
+BATCH_SIZE = 64
+
+
+def chunk_id(doc):
+    """
+    Deterministic, content-addressed ID for a chunk.
+
+    Args:
+        doc (Document): A document chunk
+
+    Returns:
+        str: Hex digest of the chunk source and content
+    """
+    source = doc.metadata.get("source", "")
+    digest = hashlib.sha256(f"{source}\0{doc.page_content}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the ingestion manifest, or an empty one if it doesn't exist yet."""
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "table": TABLE_NAME, "embedding": embedding_id(), "chunks": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Atomically write the ingestion manifest."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def embedding_changed(manifest):
+    """True when the manifest's chunks were embedded with another model."""
+    # Manifests written before the model was recorded come from the torch model
+    return bool(manifest["chunks"]) and manifest.get("embedding", EMBEDDING_MODEL) != embedding_id()
+
+
+def diff_chunks(chunks, manifest):
+    """
+    Compare the current chunk set against the manifest.
+
+    Args:
+        chunks (dict): chunk_id -> Document for the current corpus
+        manifest (dict): Previously persisted manifest
+
+    Returns:
+        tuple: (ids to add, ids to delete)
+    """
+    known = manifest["chunks"]
+    to_add = [cid for cid in chunks if cid not in known]
+    to_delete = [cid for cid in known if cid not in chunks]
+    return to_add, to_delete
+
+
+def run_ingestion(rebuild=False, documents=None):
+    """
+    Embed and upsert new/changed chunks and delete stale ones.
+
+    Args:
+        rebuild (bool): Clear the table and manifest before ingesting (forced
+            when the embedding model or backend changed)
+        documents: Iterable of article Documents (e.g. the zendesk.py
+            generator). Defaults to the files in ./data/.
+
+    Returns:
+        dict: Counts of added, deleted and unchanged chunks
+    """
+    print("---INGESTION---")
+    store = get_vector_store()
+    manifest = load_manifest()
+
+    if embedding_changed(manifest):
+        print(f"Embedding changed ({manifest.get('embedding')} -> {embedding_id()}), re-embedding everything...")
+        rebuild = True
+    manifest["embedding"] = embedding_id()
+
+    if rebuild:
+        print(f"Clearing table {TABLE_NAME}...")
+        store.clear()
+        manifest["chunks"] = {}
+
+    chunks = {}
+    if documents is None:
+        documents = load_documents()
+    for doc in split_documents(list(documents)):
+        cid = chunk_id(doc)
+        doc.metadata["chunk_id"] = cid
+        chunks[cid] = doc
+
+    to_add, to_delete = diff_chunks(chunks, manifest)
+    print(f"{len(chunks)} chunks: {len(to_add)} new/changed, {len(to_delete)} stale")
+
+    for start in range(0, len(to_add), BATCH_SIZE):
+        batch = to_add[start:start + BATCH_SIZE]
+        store.add_documents([chunks[cid] for cid in batch], ids=batch)
+        for cid in batch:
+            manifest["chunks"][cid] = {"source": chunks[cid].metadata.get("source", "")}
+        # Persist progress so an interrupted run doesn't re-embed finished batches
+        save_manifest(manifest)
+        print(f"Upserted {min(start + BATCH_SIZE, len(to_add))}/{len(to_add)} chunks")
+
+    if to_delete:
+        store.delete(to_delete)
+        for cid in to_delete:
+            manifest["chunks"].pop(cid, None)
+        print(f"Deleted {len(to_delete)} stale chunks")
+
+    save_manifest(manifest)
+
+    # The keyword index is cheap to rebuild, so always rebuild it from the full chunk set
+    bm25 = BM25Index.build(chunks.values())
+    bm25.save(BM25_PATH)
+    print(f"Built BM25 index over {len(bm25)} chunks")
+
+    stats = {
+        "added": len(to_add),
+        "deleted": len(to_delete),
+        "unchanged": len(chunks) - len(to_add),
+    }
+    print(f"Ingestion complete: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest ./data into the vector store.")
+    parser.add_argument("--rebuild", action="store_true", help="clear the table and re-ingest everything")
+    args = parser.parse_args()
+    run_ingestion(rebuild=args.rebuild)
@@ -0,0 +1,94 @@
+# llm.py
+"""
+Shared LLM clients and chains.
+
+The Groq chat models, prompts and structured-output chains used by the graph
+nodes are built once per process (when ``compile.build_workflow()`` runs) and
+injected into the nodes. All models share one pooled httpx client so
+keep-alive connections are reused across requests instead of paying a new
+TLS handshake per call.
+"""
+import logging
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+from grader import build_answer_grader
+from router import initialize_question_router
+from state import build_rag_chain
+from tracing import TokenUsageCallback
+
+ROUTER_MODEL = "openai/gpt-oss-20b"
+GENERATION_MODEL = "llama-3.1-8b-instant"
+GRADER_MODEL = "llama-3.1-8b-instant"
+
+# Connection pool settings for the shared Groq HTTP clients
+HTTP_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+
+logger = logging.getLogger(__name__)
+
+# Global variable to store the process-wide registry
+_registry = None
+
+
+class ChainRegistry:
+    """
+    Holds the chat models and chains used by the graph nodes.
+
+    Attributes:
+        router: Question router chain (RouteQuery output)
+        generator: Answer generation chain
+        grader: Answer grading chain (GradeAnswer output)
+    """
+
+    def __init__(self):
+        load_dotenv()
+        groq_api_key = os.getenv("GROQ_API_KEY") or os.getenv("groq_api_key")
+        if not groq_api_key:
+            raise ValueError("GROQ_API_KEY not found. Please set it as an environment variable.")
+        os.environ["GROQ_API_KEY"] = groq_api_key
+
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.http_client = httpx.Client(limits=limits, timeout=HTTP_TIMEOUT)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT)
+
+        # Structured-output chains return parsed objects, so their token usage
+        # is counted by a callback on the model (generate's comes with its message)
+        self.router = initialize_question_router(
+            llm=self.chat_model(ROUTER_MODEL, callbacks=[TokenUsageCallback("route")])
+        )
+        self.generator = build_rag_chain(self.chat_model(GENERATION_MODEL))
+        self.grader = build_answer_grader(
+            self.chat_model(GRADER_MODEL, temperature=0.1, callbacks=[TokenUsageCallback("grade")])
+        )
+
+    def chat_model(self, model_name, **kwargs):
+        """Create a ChatGroq model that uses the shared connection pool."""
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(
+            model_name=model_name,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            **kwargs,
+        )
+
+
+def get_registry():
+    """
+    Return the process-wide chain registry (built on first use).
+    """
+    global _registry
+
+    if _registry is None:
+        logger.info("---BUILDING LLM CHAINS---")
+        _registry = ChainRegistry()
+    return _registry
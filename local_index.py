@@ -0,0 +1,268 @@
+# local_index.py
+"""
+In-process vector store backed by a memory-mapped float32 matrix.
+
+Embeddings are L2-normalised and stored row-wise in
+``<name>.<version>.embeddings.npy``; ``<name>.meta.json`` holds a header line
+(``{"version", "matrix", "count"}``) followed by the ids, texts and metadata
+in the same row order. Each write puts a new matrix file next to the old one
+and then atomically replaces the metadata file, so the version in the header
+always names a matching matrix; readers reload when the version changes.
+Readers open the matrix with ``mmap_mode="r"`` so several worker processes
+share one copy through the OS page cache, and top-k is a single normalised
+dot product over the whole matrix.
+"""
+import glob
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from embeddings import embed_queries
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """Row-wise top-k indices (sorted by descending score) of a 2D score matrix."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Brute-force cosine-similarity vector store on a memory-mapped matrix.
+
+    Args:
+        embedding: LangChain embeddings used for documents and queries
+        index_dir (str): Directory holding the index files
+        name (str): Base name of the index files
+    """
+
+    def __init__(self, embedding, index_dir="./index", name="local"):
+        self._embedding = embedding
+        self.index_dir = index_dir
+        self.name = name
+        self.meta_path = os.path.join(index_dir, f"{name}.meta.json")
+        # Reentrant: writers hold it across _load() and _write()
+        self._lock = threading.RLock()
+        self._version = None
+        self._matrix_file = None
+        self._matrix = None
+        self._records = []
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # ---- persistence -------------------------------------------------------
+
+    def _load(self):
+        """
+        Swap in the on-disk index if its version changed.
+
+        Returns:
+            tuple: (matrix or None, records) as of this call
+        """
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    self._load_locked()
+                    break
+                except FileNotFoundError:
+                    # Another process replaced the index and removed the matrix
+                    # named by the header we read; read the new header
+                    if attempt == 2:
+                        raise
+            return self._matrix, self._records
+
+    def _load_locked(self):
+        try:
+            f = open(self.meta_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            self._version, self._matrix_file, self._matrix, self._records = None, None, None, []
+            return
+        with f:
+            header, records = json.loads(f.readline()), None
+            if isinstance(header, list):
+                # Written before versioning: a bare record list and <name>.embeddings.npy
+                header, records = {"version": "unversioned", "matrix": f"{self.name}.embeddings.npy"}, header
+            if header["version"] == self._version:
+                return
+            if records is None:
+                records = json.loads(f.readline())
+        matrix_file = header["matrix"] if records else None
+        matrix = np.load(os.path.join(self.index_dir, matrix_file), mmap_mode="r") if matrix_file else None
+        self._version, self._matrix_file, self._matrix, self._records = header["version"], matrix_file, matrix, records
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            # Gone already, or still mapped by a reader on a platform that forbids it
+            pass
+
+    def _write(self, matrix, records):
+        """Write a new matrix file, then atomically switch the metadata (and its version) to it."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        version = uuid.uuid4().hex
+        matrix_file = f"{self.name}.{version}.embeddings.npy"
+        matrix_path = os.path.join(self.index_dir, matrix_file)
+        with open(f"{matrix_path}.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+        tmp_meta = f"{self.meta_path}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": version, "matrix": matrix_file, "count": len(records)}) + "\n")
+            f.write(json.dumps(records) + "\n")
+        os.replace(tmp_meta, self.meta_path)
+        previous = self._matrix_file
+        self._load_locked()
+        if previous and previous != matrix_file:
+            # Processes that already mapped it keep their mapping
+            self._remove(os.path.join(self.index_dir, previous))
+
+    def _current(self):
+        if self._matrix is None:
+            return None, []
+        return np.array(self._matrix), list(self._records)
+
+    # ---- writes ------------------------------------------------------------
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+        ids = list(ids)
+
+        vectors = _normalize(self._embedding.embed_documents(texts))
+        with self._lock:
+            self._load()
+            matrix, records = self._current()
+            positions = {rec["id"]: i for i, rec in enumerate(records)}
+            new_rows = []
+            for text, metadata, doc_id, vector in zip(texts, metadatas, ids, vectors):
+                record = {"id": doc_id, "text": text, "metadata": metadata}
+                if doc_id in positions:
+                    # Upsert in place
+                    matrix[positions[doc_id]] = vector
+                    records[positions[doc_id]] = record
+                else:
+                    positions[doc_id] = len(records) + len(new_rows)
+                    new_rows.append((record, vector))
+            if new_rows:
+                added = np.stack([vector for _, vector in new_rows])
+                matrix = added if matrix is None else np.vstack([matrix, added])
+                records.extend(record for record, _ in new_rows)
+            self._write(matrix, records)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        drop = set(ids)
+        with self._lock:
+            self._load()
+            matrix, records = self._current()
+            keep = [i for i, rec in enumerate(records) if rec["id"] not in drop]
+            if len(keep) == len(records):
+                return False
+            if keep:
+                self._write(matrix[keep], [records[i] for i in keep])
+            else:
+                self.clear()
+        return True
+
+    def clear(self):
+        """Remove every vector from the index."""
+        with self._lock:
+            self._remove(self.meta_path)
+            pattern = os.path.join(glob.escape(self.index_dir), f"{glob.escape(self.name)}.*embeddings.npy")
+            for path in glob.glob(pattern):
+                self._remove(path)
+            self._load_locked()
+
+    # ---- reads -------------------------------------------------------------
+
+    def similarity_search_by_vector_batch_with_score(self, vectors, k=4):
+        """
+        Batched top-k search for several query vectors at once.
+
+        Args:
+            vectors: Query embeddings, shape (n_queries, dim)
+            k (int): Results per query
+
+        Returns:
+            list: One list of (Document, score) pairs per query
+        """
+        matrix, records = self._load()
+        queries = _normalize(vectors)
+        if matrix is None:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ matrix.T
+        results = []
+        for row, indices in zip(scores, _top_k(scores, k)):
+            results.append([
+                (
+                    Document(
+                        id=records[i]["id"],
+                        page_content=records[i]["text"],
+                        metadata=records[i]["metadata"],
+                    ),
+                    float(row[i]),
+                )
+                for i in indices
+            ])
+        return results
+
+    def similarity_search_by_vector_batch(self, vectors, k=4):
+        return [
+            [doc for doc, _ in hits]
+            for hits in self.similarity_search_by_vector_batch_with_score(vectors, k)
+        ]
+
+    def batch_similarity_search(self, queries, k=4):
+        """Embed all queries in one call and search them in one matrix product."""
+        return self.similarity_search_by_vector_batch(embed_queries(self._embedding, list(queries)), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return self.similarity_search_by_vector_batch([embedding], k)[0]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_batch_with_score([vector], k)[0]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, index_dir="./index", name="local", **kwargs):
+        store = cls(embedding, index_dir=index_dir, name=name)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def __len__(self):
+        return len(self._load()[1])
@@ -0,0 +1,342 @@
+# memory.py
+"""
+Multi-turn conversation memory.
+
+With memory enabled the graph is compiled with a LangGraph checkpointer
+(SQLite locally), so state persists between turns of the same ``thread_id``.
+Two extra nodes use it:
+
+- ``contextualize`` runs first. It builds a token-bounded view of the
+  conversation for the generate prompt and compares the question with the
+  previous one by embedding similarity. A near-paraphrase
+  (``MEMORY_REUSE_THRESHOLD``) reuses the previous turn's retrieval
+  candidates (re-ranked against the combined question) instead of routing
+  and retrieving again; a related follow-up (``MEMORY_TOPIC_THRESHOLD``, or
+  the lower ``MEMORY_ELLIPTICAL_THRESHOLD`` for short elliptical questions
+  like "what about on Xbox?") retrieves with the previous question folded
+  into the search query; anything else is a fresh question.
+- ``remember`` runs last. It appends the turn, compacts turns older than
+  ``MEMORY_RECENT_TURNS`` into an extractive summary capped at
+  ``MEMORY_SUMMARY_TOKENS`` and keeps the retrieval candidates of good
+  answers for the next turn (not of turns that reused them, so reuse never
+  chains past one turn).
+"""
+import asyncio
+import inspect
+import logging
+import os
+import re
+import sqlite3
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunking import get_embeddings
+from rerank import get_encoding
+from tracing import METRICS
+
+load_dotenv()
+
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() in ("1", "true", "yes")
+MEMORY_CHECKPOINT_PATH = os.getenv("MEMORY_CHECKPOINT_PATH", "./index/checkpoints.sqlite3")
+# Turns kept verbatim; older ones are folded into the summary
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# Token cap for the whole conversation block handed to generate
+MEMORY_HISTORY_TOKENS = int(os.getenv("MEMORY_HISTORY_TOKENS", "600"))
+# Cosine similarity to the previous question above which the previous
+# question is folded into the search query ...
+MEMORY_TOPIC_THRESHOLD = float(os.getenv("MEMORY_TOPIC_THRESHOLD", "0.5"))
+# ... or, for short elliptical questions, this lower bound
+MEMORY_ELLIPTICAL_THRESHOLD = float(os.getenv("MEMORY_ELLIPTICAL_THRESHOLD", "0.3"))
+# Above this the previous turn's documents are reused without retrieving
+MEMORY_REUSE_THRESHOLD = float(os.getenv("MEMORY_REUSE_THRESHOLD", "0.8"))
+
+MEMORY_TURNS = METRICS.counter("rag_memory_turns_total", "Conversation turns by kind (first/fresh/follow_up/reused)")
+
+# Short questions that may lean on the previous turn (only lowers the similarity bar)
+FOLLOW_UP_RE = re.compile(
+    r"^(what about|how about|and|also|what if|same|does that|do they|is it|is that|can i|"
+    r"and if|then|ok|okay|thanks)\b|\b(it|that|this|those|them|there)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_MAX_WORDS = 8
+
+logger = logging.getLogger(__name__)
+
+# Global checkpointer shared by every sync workflow in this process
+_checkpointer = None
+
+
+def get_checkpointer(use_async=False):
+    """
+    Return the SQLite checkpointer (created once per process).
+
+    SqliteSaver has no async methods, so async graphs get an in-memory saver
+    unless the caller provides an AsyncSqliteSaver opened in its event loop.
+    """
+    global _checkpointer
+
+    if use_async:
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        logger.warning("No async checkpointer given, conversation memory will not survive restarts")
+        return InMemorySaver()
+    if _checkpointer is None:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        os.makedirs(os.path.dirname(MEMORY_CHECKPOINT_PATH) or ".", exist_ok=True)
+        _checkpointer = SqliteSaver(sqlite3.connect(MEMORY_CHECKPOINT_PATH, check_same_thread=False))
+    return _checkpointer
+
+
+def thread_config(thread_id):
+    """LangGraph run config for one conversation thread."""
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def count_tokens(text):
+    return len(get_encoding().encode(text))
+
+
+def _truncate(text, max_tokens):
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + "..."
+
+
+def _answer_text(generation):
+    if hasattr(generation, "content"):
+        return generation.content
+    return str(generation or "")
+
+
+def _trim_front(lines, max_tokens):
+    """Drop the oldest lines until the block fits max_tokens."""
+    while lines and count_tokens("\n".join(lines)) > max_tokens:
+        lines = lines[1:]
+    return lines
+
+
+def compact_history(summary, turns, recent_turns=MEMORY_RECENT_TURNS, max_tokens=MEMORY_SUMMARY_TOKENS):
+    """
+    Fold all but the most recent turns into the summary.
+
+    The summary is extractive: one line per old turn with the question and
+    the start of the answer, oldest lines dropped beyond max_tokens.
+
+    Args:
+        summary (str): Summary of turns compacted so far
+        turns (list): [{"question", "answer"}] turns, oldest first
+        recent_turns (int): Turns kept verbatim
+        max_tokens (int): Token cap of the summary
+
+    Returns:
+        tuple: (summary, recent turns)
+    """
+    if recent_turns:
+        old, recent = turns[:-recent_turns], turns[-recent_turns:]
+    else:
+        old, recent = turns, []
+    lines = summary.splitlines() if summary else []
+    for turn in old:
+        lines.append(_summary_line(turn))
+    return "\n".join(_trim_front(lines, max_tokens)), recent
+
+
+def _summary_line(turn):
+    return f"- Customer asked: {_truncate(turn['question'], 40)} / Agent: {_truncate(turn['answer'], 40)}"
+
+
+def format_conversation(summary, turns, max_tokens=MEMORY_HISTORY_TOKENS):
+    """
+    Render the summary and recent turns as a token-bounded text block.
+    """
+    lines = [f"Earlier: {line}" for line in summary.splitlines()] if summary else []
+    for turn in turns:
+        lines.append(f"Customer: {turn['question']}")
+        lines.append(f"Agent: {turn['answer']}")
+    return "\n".join(_trim_front(lines, max_tokens))
+
+
+def topic_similarity(question, previous_question, embeddings=None):
+    """Cosine similarity of two questions' embeddings."""
+    embeddings = embeddings or get_embeddings()
+    a, b = (np.asarray(embeddings.embed_query(text), dtype=np.float32) for text in (question, previous_question))
+    return float(a @ b / ((np.linalg.norm(a) * np.linalg.norm(b)) or 1.0))
+
+
+def classify_turn(question, previous_question, embeddings=None):
+    """
+    How a question relates to the previous turn.
+
+    The embedding similarity is always checked: a short elliptical question
+    ("what about on Xbox?") only gets a lower bar for folding, never a pass,
+    so "Can I get a refund?" after an unrelated question stays fresh.
+
+    Returns:
+        str: "reuse" (same question again, reuse its documents),
+            "follow_up" (retrieve with the previous question folded in)
+            or "fresh"
+    """
+    similarity = topic_similarity(question, previous_question, embeddings)
+    if similarity >= MEMORY_REUSE_THRESHOLD:
+        return "reuse"
+    elliptical = len(question.split()) <= FOLLOW_UP_MAX_WORDS and FOLLOW_UP_RE.search(question)
+    if similarity >= (MEMORY_ELLIPTICAL_THRESHOLD if elliptical else MEMORY_TOPIC_THRESHOLD):
+        return "follow_up"
+    return "fresh"
+
+
+def contextualize(state):
+    """
+    LangGraph node: prepare the turn using the conversation so far.
+
+    Args:
+        state (dict): Current graph state (restored from the checkpoint)
+
+    Returns:
+        dict: 'conversation', 'search_query', 'reused' and, when the
+        previous candidates are reused, 'documents'
+    """
+    question = state["question"]
+    history = state.get("history") or []
+    update = {
+        "search_query": question,
+        "reused": False,
+        "candidates": [],
+        "conversation": format_conversation(state.get("summary", ""), history),
+    }
+    if not history:
+        MEMORY_TURNS.inc(kind="first")
+        return update
+
+    previous = history[-1]["question"]
+    kind = classify_turn(question, previous)
+    if kind == "fresh":
+        MEMORY_TURNS.inc(kind="fresh")
+        return update
+
+    update["search_query"] = f"{previous} {question}"
+    candidates = state.get("last_documents") or []
+    if kind == "reuse" and candidates:
+        logger.info("---MEMORY: REUSING %d DOCUMENTS FROM PREVIOUS TURN---", len(candidates))
+        update["documents"] = candidates
+        update["reused"] = True
+        MEMORY_TURNS.inc(kind="reused")
+    else:
+        MEMORY_TURNS.inc(kind="follow_up")
+    return update
+
+
+async def acontextualize(state):
+    """
+    Async version of contextualize(); embeds the questions in a worker thread.
+    """
+    return await asyncio.to_thread(contextualize, state)
+
+
+def remember_turn(state, answer):
+    """
+    State update recording a finished turn.
+
+    Args:
+        state (dict): Graph state after the turn
+        answer (str): Final answer shown to the customer
+
+    Returns:
+        dict: 'history', 'summary' and 'last_documents'
+    """
+    turns = list(state.get("history") or []) + [{"question": state["question"], "answer": answer}]
+    summary, recent = compact_history(state.get("summary", ""), turns)
+
+    # Only carry over documents that produced a good answer, and only from a
+    # turn that retrieved them (reuse doesn't chain)
+    documents = []
+    if state.get("grade") == "good" and not state.get("reused"):
+        documents = state.get("candidates") or state.get("documents") or []
+        if not isinstance(documents, list):
+            documents = [documents]
+    return {"history": recent, "summary": summary, "last_documents": documents}
+
+
+def remember(state):
+    """
+    LangGraph node: append the turn to the conversation memory.
+    """
+    logger.info("---REMEMBER TURN---")
+    return remember_turn(state, _answer_text(state.get("generation")))
+
+
+def retract_turn(values, answer):
+    """
+    State update replacing the last remembered answer.
+
+    Used when a deferred grade fails after ``remember`` already checkpointed
+    the provisional answer, so the retracted text never reaches the next
+    turn's prompt and its documents aren't reused.
+
+    Args:
+        values (dict): Checkpointed thread state
+        answer (str): Answer that replaced the retracted one
+
+    Returns:
+        dict: 'history' or 'summary' update, and empty 'last_documents'
+    """
+    update = {"last_documents": []}
+    history = list(values.get("history") or [])
+    if history:
+        history[-1] = {**history[-1], "answer": answer}
+        update["history"] = history
+    elif values.get("summary"):
+        # No verbatim turns kept (MEMORY_RECENT_TURNS=0): the turn is the last summary line
+        lines = values["summary"].splitlines()
+        lines[-1] = _summary_line({"question": values.get("question", ""), "answer": answer})
+        update["summary"] = "\n".join(lines)
+    return update
+
+
+def _has_thread(graph, config):
+    return getattr(graph, "checkpointer", None) is not None and bool(
+        (config or {}).get("configurable", {}).get("thread_id")
+    )
+
+
+def retract_last_turn(graph, config, answer):
+    """
+    Replace the remembered answer of the thread's last turn (no-op without memory).
+
+    Args:
+        graph: Compiled graph (or CachedWorkflow) the turn ran on
+        config (dict): Thread config from thread_config()
+        answer (str): Answer that replaced the retracted one
+    """
+    if _has_thread(graph, config):
+        values = graph.get_state(config).values
+        if values:
+            graph.update_state(config, retract_turn(values, answer), as_node="remember")
+
+
+async def aretract_last_turn(graph, config, answer):
+    """
+    Async version of retract_last_turn().
+    """
+    if _has_thread(graph, config):
+        values = (await graph.aget_state(config)).values
+        if values:
+            await graph.aupdate_state(config, retract_turn(values, answer), as_node="remember")
+
+
+def skip_route_if_reused(route_fn):
+    """
+    Wrap a routing edge so turns reusing previous documents return "reuse".
+    """
+    if inspect.iscoroutinefunction(route_fn):
+        async def route(state):
+            return "reuse" if state.get("reused") else await route_fn(state)
+    else:
+        def route(state):
+            return "reuse" if state.get("reused") else route_fn(state)
+    return route
@@ -0,0 +1,217 @@
+# microbatch.py
+"""
+Micro-batching of concurrent query embeddings and vector searches.
+
+Under concurrent load every ``retrieve`` call would embed its question and
+search the store on its own. ``MicroBatcher`` coalesces calls instead: the
+first request opens a batch, requests arriving within
+``MICROBATCH_MAX_WAIT_MS`` (or until ``MICROBATCH_MAX_SIZE`` items) join it,
+and one worker thread runs a single batched call and fans the results back
+to the waiting callers. Sync callers block on a Future; async callers await
+it without tying up a thread. The worker thread is per process: after a
+fork (gunicorn preload) the child gets a fresh queue and starts its own.
+
+``MicroBatchSearch`` applies this to retrieval: one batched query encode
+plus one batched top-k (a single matrix product on LocalVectorStore).
+It quacks like a vector store for ``similarity_search``, so it can sit
+under ``HybridRetriever``, and ``BatchingRetriever`` wraps it for the
+plain vector path.
+
+Batch sizes and queue waits are exported as histograms.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+from langchain_core.retrievers import BaseRetriever
+
+from embeddings import embed_queries
+from tracing import METRICS
+
+load_dotenv()
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+BATCH_SIZE = METRICS.histogram("rag_microbatch_size", "Items per micro-batch", BATCH_SIZE_BUCKETS)
+BATCH_WAIT = METRICS.histogram("rag_microbatch_wait_seconds", "Time items waited before their batch ran")
+
+_STOP = object()
+
+# Every batcher, so a forked child can drop the parent's (dead) worker threads
+_batchers = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for batcher in list(_batchers):
+        batcher._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls into batched calls of fn.
+
+    Args:
+        fn: Callable taking a list of items and returning a list of results
+            in the same order
+        max_batch_size (int): Max items per batch
+        max_wait_ms (float): Max time the first item of a batch waits for others
+        name (str): Label for the metrics
+    """
+
+    def __init__(self, fn, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS, name="batch"):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._reset()
+        _batchers.add(self)
+
+    def _reset(self):
+        # Fresh queue, lock and no worker (also run in a forked child, where
+        # the parent's thread doesn't exist and its lock may be held)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def submit(self, item):
+        """Queue an item; returns a Future for its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def call(self, item):
+        """Submit an item and block until its batch has run."""
+        return self.submit(item).result()
+
+    async def acall(self, item):
+        """Submit an item and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            self._process(self._collect(first))
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        # Callers that gave up (cancelled awaits) are dropped from the batch
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+        for _, _, submitted in batch:
+            BATCH_WAIT.observe(started - submitted, batcher=self.name)
+        try:
+            results = list(self.fn([item for item, _, _ in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self):
+        """Stop the worker after the queued items have run."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+class MicroBatchSearch:
+    """
+    Vector search that batches concurrent queries.
+
+    Args:
+        vector_store: LangChain vector store (LocalVectorStore searches a
+            whole batch in one matrix product; others search per vector)
+        embeddings: Embeddings for the queries
+        max_batch_size (int): Max queries per batch
+        max_wait_ms (float): Max coalescing wait
+    """
+
+    def __init__(self, vector_store, embeddings, max_batch_size=MICROBATCH_MAX_SIZE,
+                 max_wait_ms=MICROBATCH_MAX_WAIT_MS):
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.batcher = MicroBatcher(self._search_batch, max_batch_size, max_wait_ms, name="vector_search")
+
+    def _search_batch(self, items):
+        """items: [(query, k)] -> [documents]"""
+        queries = [query for query, _ in items]
+        k = max(k for _, k in items)
+        vectors = embed_queries(self.embeddings, queries)
+        if hasattr(self.vector_store, "similarity_search_by_vector_batch"):
+            hits = self.vector_store.similarity_search_by_vector_batch(vectors, k=k)
+        else:
+            hits = [self.vector_store.similarity_search_by_vector(vector, k=k) for vector in vectors]
+        return [docs[:item_k] for docs, (_, item_k) in zip(hits, items)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.batcher.call((query, k))
+
+    async def asimilarity_search(self, query, k=4, **kwargs):
+        return await self.batcher.acall((query, k))
+
+    def close(self):
+        self.batcher.close()
+
+
+class BatchingRetriever(BaseRetriever):
+    """
+    Retriever over a MicroBatchSearch.
+
+    Attributes:
+        search: MicroBatchSearch to send queries through
+        k (int): Number of documents to return
+    """
+
+    search: object
+    k: int = 5
+
+    def _get_relevant_documents(self, query, *, run_manager=None, **kwargs):
+        return self.search.similarity_search(query, k=kwargs.get("k", self.k))
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None, **kwargs):
+        return await self.search.asimilarity_search(query, k=kwargs.get("k", self.k))
@@ -0,0 +1,345 @@
+# onnx_embeddings.py
+"""
+ONNX Runtime backend for the all-MiniLM-L6-v2 embedder.
+
+Runs an exported ONNX copy of the sentence-transformers model (optionally
+int8 dynamically quantized) with the standalone ``tokenizers`` package, so a
+serving worker doesn't need torch in memory. The pipeline mirrors the
+sentence-transformers one: tokenize (lowercased WordPiece, truncated to the
+model's max_seq_length), transformer, attention-masked mean pooling, then L2
+normalisation (all-MiniLM-L6-v2 ends with a Normalize module).
+
+Compatibility with an index built by the torch path (checked by ``verify``
+on the benchmark questions and a sample of article chunks):
+
+- fp32 export: cosine similarity to the torch vector >= 0.9999
+  (ONNX_FP32_MIN_COSINE), so search results are unchanged;
+- int8 export: cosine >= 0.99 (ONNX_INT8_MIN_COSINE); the ranking of close
+  neighbours can change, so the ingestion manifest records the int8 model
+  and switching to (or from) it re-embeds the index.
+
+Select it with ``EMBEDDING_BACKEND=onnx`` (see chunking.py).
+
+Usage:
+    python onnx_embeddings.py export --output ./onnx/all-MiniLM-L6-v2
+    python onnx_embeddings.py verify [--quantized] [--model-dir DIR]
+    python onnx_embeddings.py bench
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embeddings import EmbeddingService
+
+load_dotenv()
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx/all-MiniLM-L6-v2")
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "false").lower() in ("1", "true", "yes")
+# onnxruntime intra-op threads (0 = onnxruntime default)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+ONNX_FP32_MIN_COSINE = 0.9999
+ONNX_INT8_MIN_COSINE = 0.99
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+CONFIG_FILE = "onnx_config.json"
+
+
+def cache_suffix(quantized):
+    """Disk cache namespace of the fp32 or int8 model (the int8 one also tags the manifest)."""
+    return "@onnx-int8" if quantized else "@onnx"
+
+
+class OnnxSentenceEncoder:
+    """
+    Tokenizer + ONNX session producing sentence embeddings.
+
+    The session (and its intra-op thread pool) is created on first use in
+    each process, so an encoder loaded before a fork works in the children.
+
+    Args:
+        model_dir (str): Directory written by export_onnx()
+        quantized (bool): Use the int8 model
+        threads (int): onnxruntime intra-op threads (0 = default)
+    """
+
+    def __init__(self, model_dir, quantized=False, threads=0):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        self.threads = threads
+        self._session = None
+        self._pid = None
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config.get("pad_token_id", 0),
+                                      pad_token=self.config.get("pad_token", "[PAD]"))
+
+    @property
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            self._session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+            self.input_names = {node.name for node in self._session.get_inputs()}
+            self._pid = os.getpid()
+        return self._session
+
+    def encode(self, texts, batch_size=64):
+        """
+        Embed texts.
+
+        Returns:
+            np.ndarray: float32 (len(texts), dim) matrix
+        """
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+            session = self.session
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+            hidden = session.run(None, feeds)[0]
+
+            # Mean pooling over real (unpadded) tokens
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.config.get("normalize", True):
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+        if not outputs:
+            return np.empty((0, self.config.get("dimension", 0)), dtype=np.float32)
+        return np.concatenate(outputs)
+
+
+class OnnxEmbeddingService(EmbeddingService):
+    """
+    EmbeddingService running the exported ONNX model.
+
+    Batching, the disk cache and the query LRU work as in EmbeddingService;
+    disk cache entries are kept apart from the torch backend's.
+
+    Args:
+        model_name (str): Name of the exported model (for cache keys)
+        model_dir (str): Directory written by export_onnx()
+        quantized (bool): Use the int8 model
+        threads (int): onnxruntime intra-op threads
+    """
+
+    def __init__(self, model_name, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, threads=ONNX_THREADS,
+                 **kwargs):
+        self.quantized = quantized
+        self.threads = threads
+        self.cache_suffix = cache_suffix(quantized)
+        super().__init__(model_name, processes=0, model_path=model_dir, **kwargs)
+
+    def _load_model(self, path):
+        return OnnxSentenceEncoder(path, quantized=self.quantized, threads=self.threads)
+
+    def _encode(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.model.encode(texts, batch_size=self.batch_size)
+
+
+def export_onnx(model_name, output=ONNX_MODEL_DIR, quantize=True, opset=17):
+    """
+    Export a sentence-transformers model to ONNX (plus int8 copy) with its tokenizer.
+
+    Args:
+        model_name (str): sentence-transformers model name or path
+        output (str): Output directory
+        quantize (bool): Also write a dynamically int8-quantized model
+        opset (int): ONNX opset version
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    os.makedirs(output, exist_ok=True)
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer), tuple(sample[name] for name in names),
+            os.path.join(output, MODEL_FILE), input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes=axes, opset_version=opset,
+        )
+    tokenizer.save_pretrained(output)
+
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(output, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(os.path.join(output, MODEL_FILE), os.path.join(output, QUANTIZED_MODEL_FILE),
+                         weight_type=QuantType.QInt8)
+    print(f"Exported {model_name} to {output}")
+
+
+def _sample_texts(limit=200):
+    """Benchmark questions plus a sample of article chunks."""
+    from chunking import load_documents, split_documents
+
+    with open("./fixtures/benchmark_questions.jsonl", "r", encoding="utf-8") as f:
+        texts = [json.loads(line)["question"] for line in f if line.strip()]
+    chunks = split_documents(load_documents())
+    return texts + [chunk.page_content for chunk in chunks[:limit]]
+
+
+def compare_backends(texts, model_name, model_dir=ONNX_MODEL_DIR, quantized=False):
+    """
+    Compare ONNX vectors against the torch model on the same texts.
+
+    Returns:
+        dict: min/mean cosine similarity and max absolute difference
+    """
+    from sentence_transformers import SentenceTransformer
+
+    texts = [text.replace("\n", " ") for text in texts]
+    reference = np.asarray(SentenceTransformer(model_name, device="cpu").encode(texts), dtype=np.float32)
+    candidate = OnnxSentenceEncoder(model_dir, quantized=quantized).encode(texts)
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+    }
+
+
+def _bench_one(backend, model_name, model_dir, repeats=20):
+    """Measure load time, RSS and query latency of one backend in this process."""
+    from benchmark import rss_mb, summarize
+
+    with open("./fixtures/benchmark_questions.jsonl", "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name, device="cpu")
+        encode = model.encode
+    else:
+        encode = OnnxSentenceEncoder(model_dir, quantized=(backend == "onnx-int8")).encode
+    load_s = time.perf_counter() - start
+    encode(questions[:2])
+
+    latencies = []
+    for _ in range(repeats):
+        for question in questions:
+            start = time.perf_counter()
+            encode([question])
+            latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    encode(questions * 4)
+    batch_qps = len(questions) * 4 / (time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 3),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "query_latency": summarize(latencies),
+        "batch_texts_per_s": round(batch_qps, 1),
+    }
+
+
+def bench(model_name, model_dir=ONNX_MODEL_DIR):
+    """
+    Compare torch, ONNX fp32 and ONNX int8, each in a fresh process so RSS is comparable.
+    """
+    results = []
+    backends = ["torch", "onnx"]
+    if os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE)):
+        backends.append("onnx-int8")
+    for backend in backends:
+        output = subprocess.run(
+            [sys.executable, __file__, "bench-one", "--backend", backend, "--model-dir", model_dir],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'backend':<12}{'load s':>8}{'RSS MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch/s':>10}")
+    for r in results:
+        latency = r["query_latency"]
+        print(f"{r['backend']:<12}{r['load_s']:>8}{r['rss_mb']:>9}{latency['p50'] * 1000:>9.2f}"
+              f"{latency['p95'] * 1000:>9.2f}{r['batch_texts_per_s']:>10}")
+    return results
+
+
+def main():
+    from chunking import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Export, verify and benchmark the ONNX embedder.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Export the embedding model to ONNX")
+    export.add_argument("--output", default=ONNX_MODEL_DIR)
+    export.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    verify = subparsers.add_parser("verify", help="Check ONNX vectors against the torch model")
+    verify.add_argument("--quantized", action="store_true")
+    verify.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    subparsers.add_parser("bench", help="Compare latency and RSS of torch and ONNX")
+    bench_one = subparsers.add_parser("bench-one")
+    bench_one.add_argument("--backend", choices=("torch", "onnx", "onnx-int8"), required=True)
+    bench_one.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(EMBEDDING_MODEL, args.output, quantize=not args.no_quantize)
+    elif args.command == "verify":
+        stats = compare_backends(_sample_texts(), EMBEDDING_MODEL, model_dir=args.model_dir,
+                                 quantized=args.quantized)
+        tolerance = ONNX_INT8_MIN_COSINE if args.quantized else ONNX_FP32_MIN_COSINE
+        stats["tolerance"] = tolerance
+        print(json.dumps(stats, indent=2))
+        if stats["min_cosine"] < tolerance:
+            sys.exit(f"ONNX vectors outside tolerance (min cosine {stats['min_cosine']:.5f} < {tolerance})")
+    elif args.command == "bench":
+        bench(EMBEDDING_MODEL)
+    else:
+        print(json.dumps(_bench_one(args.backend, EMBEDDING_MODEL, args.model_dir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# prerouter.py
+"""
+Fast local first-stage router.
+
+Keyword/regex rules derived from the categories in the LLM router prompt
+(router.py) score a question for "vectorstore" and "web_search". When the
+winning side is confident enough the LLM routing call is skipped; otherwise
+route_question falls back to the LLM router.
+"""
+import os
+import re
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from tracing import METRICS
+
+load_dotenv()
+
+PREROUTER_ENABLED = os.getenv("PREROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Minimum confidence (0-1) needed to skip the LLM router
+PREROUTER_THRESHOLD = float(os.getenv("PREROUTER_THRESHOLD", "0.75"))
+# Independent rule matches the winning side needs for full confidence
+PREROUTER_MIN_MATCHES = int(os.getenv("PREROUTER_MIN_MATCHES", "2"))
+
+# (pattern, weight) rules per datasource, mirroring the router prompt categories
+RULES = {
+    "vectorstore": [
+        # Loaded-specific support (formerly CDKeys)
+        (r"\b(loaded|cd ?keys?)\b", 2),
+        # Game key activation/redemption
+        (r"\b(redeem\w*|redemption|activat\w*|product key|game key|game code|keys?|codes?|pre-?orders?)\b", 2),
+        # Purchase, payment, refund questions
+        (r"\b(refund\w*|purchas\w*|payments?|pay|paid|currenc\w*|invoice|orders?|charged?|billing|voucher|gift ?card)\b", 2),
+        # Account login issues
+        (r"\b(account|log ?in|login|sign ?in|password|email|verification|verify)\b", 2),
+        # Gaming platform support
+        (r"\b(xbox|playstation|ps[45]|psn|steam|epic( games)?|nintendo|switch|battle\.?net|ea app|origin|ubisoft|rockstar)\b", 1),
+        (r"\b(deliver\w*|received?|didn'?t get|not working|invalid|error)\b", 1),
+    ],
+    "web_search": [
+        # General gaming news/reviews, very recent events
+        (r"\b(news|reviews?|rating|metacritic|trailer|announce\w*|rumou?rs?|latest|today|yesterday|this week)\b", 2),
+        # Game content/story questions
+        (r"\b(story|lore|plot|ending|characters?|walkthrough|boss|quest|build guide|how to beat)\b", 2),
+        # Hardware recommendations
+        (r"\b(gpu|cpu|graphics card|monitor|headset|controller recommendation|best (pc|laptop|hardware)|specs?|fps)\b", 2),
+        # Non-gaming topics (weather, sports, etc.)
+        (r"\b(weather|sports?|football|soccer|nba|tournament|e-?sports|who won|stock|election)\b", 2),
+    ],
+}
+
+_COMPILED = {
+    datasource: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for datasource, rules in RULES.items()
+}
+
+# How often each routing path fires ("prerouter:<datasource>" or "llm")
+ROUTE_STATS = Counter()
+ROUTE_DECISIONS = METRICS.counter("rag_route_decisions_total", "Routing decisions by path")
+
+
+def match_rules(question):
+    """
+    Match a question against the keyword rules.
+
+    Args:
+        question (str): The user question
+
+    Returns:
+        dict: datasource -> weights of the rules that matched
+    """
+    return {
+        datasource: [weight for pattern, weight in rules if pattern.search(question)]
+        for datasource, rules in _COMPILED.items()
+    }
+
+
+def score_question(question):
+    """
+    Score a question against the keyword rules.
+
+    Args:
+        question (str): The user question
+
+    Returns:
+        dict: datasource -> summed rule weight
+    """
+    return {datasource: sum(weights) for datasource, weights in match_rules(question).items()}
+
+
+def preroute(question, threshold=None):
+    """
+    Try to route a question without calling the LLM.
+
+    Confidence is the winning side's share of the total score, damped until
+    at least PREROUTER_MIN_MATCHES independent rules agree, so one keyword
+    alone never skips the LLM.
+
+    Args:
+        question (str): The user question
+        threshold (float): Minimum confidence; defaults to PREROUTER_THRESHOLD
+
+    Returns:
+        tuple: (datasource or None, confidence)
+    """
+    threshold = PREROUTER_THRESHOLD if threshold is None else threshold
+    matches = match_rules(question)
+    scores = {datasource: sum(weights) for datasource, weights in matches.items()}
+    total = sum(scores.values())
+    if total == 0:
+        return None, 0.0
+
+    datasource = max(scores, key=scores.get)
+    agreeing = len(matches[datasource])
+    confidence = (scores[datasource] / total) * min(1.0, agreeing / PREROUTER_MIN_MATCHES)
+    if confidence < threshold:
+        return None, confidence
+    return datasource, confidence
+
+
+def record_route(path):
+    """Count one routing decision by path."""
+    ROUTE_STATS[path] += 1
+    ROUTE_DECISIONS.inc(path=path)
+
+
+def route_stats():
+    """
+    Return routing counters and the share of requests that skipped the LLM.
+    """
+    total = sum(ROUTE_STATS.values())
+    local = sum(count for path, count in ROUTE_STATS.items() if path.startswith("prerouter:"))
+    return {
+        "counts": dict(ROUTE_STATS),
+        "total": total,
+        "prerouter_hit_rate": (local / total) if total else 0.0,
+    }
@@ -0,0 +1,129 @@
+# rerank.py
+"""
+Cross-encoder reranking between retrieve and generate.
+
+The retriever over-fetches ``RERANK_CANDIDATES`` chunks; this stage scores
+them against the question with a small CPU cross-encoder (batched) and packs
+the best ones into ``CONTEXT_TOKEN_BUDGET`` tokens, counted with the same
+tiktoken encoding chunking.py uses for splitting. That keeps the generate
+prompt small and relevant.
+"""
+import asyncio
+import logging
+import os
+
+from langchain_core.documents import Document
+
+from chunking import TOKEN_ENCODING, snapshot_path
+
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+# Max passages and prompt tokens handed to generate
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "5"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+logger = logging.getLogger(__name__)
+
+# Global variables to store the lazily loaded model and tokenizer
+_cross_encoder = None
+_encoding = None
+
+
+def get_cross_encoder():
+    """Return the cross-encoder (loaded once per process)."""
+    global _cross_encoder
+
+    if _cross_encoder is None:
+        from sentence_transformers import CrossEncoder
+
+        logger.info("Loading cross-encoder %s...", RERANK_MODEL)
+        _cross_encoder = CrossEncoder(snapshot_path("cross_encoder") or RERANK_MODEL, device="cpu")
+    return _cross_encoder
+
+
+def get_encoding():
+    global _encoding
+
+    if _encoding is None:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    return _encoding
+
+
+def count_tokens(doc):
+    """Token count of a chunk, using the precomputed value when present."""
+    tokens = doc.metadata.get("tokens")
+    if tokens is None:
+        tokens = len(get_encoding().encode(doc.page_content))
+    return tokens
+
+
+def pack_documents(docs, budget=CONTEXT_TOKEN_BUDGET, top_n=RERANK_TOP_N):
+    """
+    Greedily pack ranked documents into a token budget.
+
+    Documents that don't fit are skipped (a smaller one further down may
+    still fit). If even the best document exceeds the budget it is truncated.
+
+    Args:
+        docs (list): Documents, best first
+        budget (int): Max total tokens
+        top_n (int): Max number of documents
+
+    Returns:
+        list: Packed documents
+    """
+    packed, used = [], 0
+    for doc in docs:
+        if len(packed) >= top_n:
+            break
+        tokens = count_tokens(doc)
+        if used + tokens <= budget:
+            packed.append(doc)
+            used += tokens
+        elif not packed:
+            encoding = get_encoding()
+            text = encoding.decode(encoding.encode(doc.page_content)[:budget])
+            packed.append(Document(page_content=text, metadata={**doc.metadata, "truncated": True}))
+            used = budget
+    logger.info("Packed %d/%d passages into %d/%d tokens", len(packed), len(docs), used, budget)
+    return packed
+
+
+def rerank_documents(question, docs):
+    """
+    Order documents by cross-encoder relevance to the question.
+    """
+    if len(docs) <= 1:
+        return list(docs)
+    scores = get_cross_encoder().predict(
+        [(question, doc.page_content) for doc in docs], batch_size=RERANK_BATCH_SIZE
+    )
+    ranked = sorted(zip(docs, scores), key=lambda pair: float(pair[1]), reverse=True)
+    return [doc for doc, _ in ranked]
+
+
+def rerank(state):
+    """
+    LangGraph node: rerank retrieved documents and pack them into the token budget.
+
+    Args:
+        state (dict): Current graph state with 'question' and 'documents'
+
+    Returns:
+        dict: Updated 'documents', and the unranked 'candidates'
+    """
+    logger.info("---RERANK---")
+    documents = state.get("documents", [])
+    if not isinstance(documents, list):
+        return {"documents": documents}
+    ranked = rerank_documents(state.get("search_query") or state["question"], documents)
+    return {"documents": pack_documents(ranked), "candidates": documents}
+
+
+async def arerank(state):
+    """
+    Async version of rerank(); runs the CPU-bound scoring in a worker thread.
+    """
+    return await asyncio.to_thread(rerank, state)
@@ -1,7 +1,6 @@
 from typing import Literal
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_groq import ChatGroq
 import os
 from dotenv import load_dotenv
 # Data model
@@ -13,27 +12,31 @@ class RouteQuery(BaseModel):
         description="Given a user question choose to route it to web search or a vectorstore.",
     )
 
-def initialize_question_router(groq_api_key: str = None, model_name: str = "openai/gpt-oss-20b"):
+def initialize_question_router(groq_api_key: str = None, model_name: str = "openai/gpt-oss-20b", llm=None):
     """
     Initialize a question router that determines whether to use vectorstore or wikipedia search.
     
     Args:
         groq_api_key (str): GROQ API key. If None, will try to get from environment variable.
-        model_name (str): The Groq model to use. Default is "Gemma2-9b-It".
+        model_name (str): The Groq model to use. Default is "openai/gpt-oss-20b".
+        llm: Pre-built chat model to use instead of creating a new ChatGroq.
     
     Returns:
         A configured question router chain.
     """
-    load_dotenv()
-    groq_api_key = os.getenv("groq_api_key")
-    # Set up API key
-    if groq_api_key:
-        os.environ["GROQ_API_KEY"] = groq_api_key
-    elif "GROQ_API_KEY" not in os.environ:
-        raise ValueError("GROQ_API_KEY not found. Please provide it as an argument or set it as an environment variable.")
-    
-    # Initialize LLM
-    llm = ChatGroq(model_name=model_name)
+    if llm is None:
+        load_dotenv()
+        groq_api_key = groq_api_key or os.getenv("groq_api_key")
+        # Set up API key
+        if groq_api_key:
+            os.environ["GROQ_API_KEY"] = groq_api_key
+        elif "GROQ_API_KEY" not in os.environ:
+            raise ValueError("GROQ_API_KEY not found. Please provide it as an argument or set it as an environment variable.")
+
+        # Initialize LLM
+        from langchain_groq import ChatGroq
+
+        llm = ChatGroq(model_name=model_name)
     
     # Create structured LLM router
     structured_llm_router = llm.with_structured_output(RouteQuery)
@@ -11,7 +11,10 @@ while url:
         articles.append({
             "id": art["id"],
             "title": art["title"],
-            "url": art["html_url"]
+            "url": art["html_url"],
+            # Used by scrap_test.py to only re-fetch articles that changed
+            "updated_at": art.get("updated_at"),
+            "edited_at": art.get("edited_at")
         })
     url = data["next_page"]
 
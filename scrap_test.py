@@ -1,40 +1,134 @@
+import argparse
 import asyncio
+import csv
+import json
+import os
 from playwright.async_api import async_playwright
 
-# Read URLs from file
-with open("loaded_support_article_links.txt", "r") as f:
-    urls = [line.strip() for line in f if line.strip()]
+ARTICLES_CSV = "loaded_support_articles.csv"  # written by scrap.py (has updated_at)
+LINKS_FILE = "loaded_support_article_links.txt"
+OUTPUT_FILE = "scraped_articles.txt"
+CHECKPOINT_FILE = "scrape_checkpoint.jsonl"
+# Zendesk article body; falls back to the whole page if the theme differs
+CONTENT_SELECTOR = ".article-body"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36")
 
-print(f"Loaded {len(urls)} URLs from file")
 
-async def scrape():
-    all_docs = []
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)  # set headless=False to see browser
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                       "(KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        )
-        page = await context.new_page()
+def load_articles():
+    """
+    Read the article list, with the API's updated_at/edited_at when available.
+
+    Returns:
+        list: dicts with "url" and "version" (None when unknown)
+    """
+    if os.path.exists(ARTICLES_CSV):
+        with open(ARTICLES_CSV, "r", encoding="utf-8", newline="") as f:
+            return [
+                {"url": row["url"], "version": row.get("edited_at") or row.get("updated_at") or None}
+                for row in csv.DictReader(f)
+                if row.get("url")
+            ]
+    # Read URLs from file
+    with open(LINKS_FILE, "r") as f:
+        return [{"url": line.strip(), "version": None} for line in f if line.strip()]
+
+
+def load_checkpoint():
+    """
+    Load previously scraped articles keyed by URL (later lines win).
+    """
+    done = {}
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    done[record["url"]] = record
+    return done
+
+
+def needs_fetch(article, done):
+    """An article is fetched if it was never scraped or its API version changed."""
+    record = done.get(article["url"])
+    if record is None:
+        return True
+    return article["version"] is not None and record.get("version") != article["version"]
+
 
-        for i, url in enumerate(urls, 1):
+async def scrape_one(context, article, semaphore, checkpoint, lock, progress, total, timeout_ms):
+    async with semaphore:
+        url = article["url"]
+        page = await context.new_page()
+        try:
+            await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+            # Wait for the article body to render instead of sleeping a fixed time
             try:
-                await page.goto(url, timeout=30000)  # wait 30s
-                await page.wait_for_timeout(5000)    # wait 5s for JS
+                await page.wait_for_selector(CONTENT_SELECTOR, timeout=timeout_ms)
+                text = await page.inner_text(CONTENT_SELECTOR)
+            except Exception:
+                await page.wait_for_load_state("networkidle", timeout=timeout_ms)
                 text = await page.inner_text("body")
-                all_docs.append({"url": url, "content": text})
-                print(f"[{i}/{len(urls)}] ✅ Scraped: {url} (length={len(text)})")
-            except Exception as e:
-                print(f"[{i}/{len(urls)}] ❌ Failed: {url} | Error: {e}")
+            record = {"url": url, "version": article["version"], "content": text}
+            async with lock:
+                checkpoint.write(json.dumps(record) + "\n")
+                checkpoint.flush()
+                progress["count"] += 1
+                print(f"[{progress['count']}/{total}] ✅ Scraped: {url} (length={len(text)})")
+            return record
+        except Exception as e:
+            async with lock:
+                progress["count"] += 1
+                print(f"[{progress['count']}/{total}] ❌ Failed: {url} | Error: {e}")
+            return None
+        finally:
+            await page.close()
+
+
+async def scrape(concurrency=4, timeout_ms=30000, full=False):
+    articles = load_articles()
+    print(f"Loaded {len(articles)} URLs")
 
-        await browser.close()
+    done = {} if full else load_checkpoint()
+    pending = [article for article in articles if needs_fetch(article, done)]
+    print(f"{len(articles) - len(pending)} unchanged (from checkpoint), {len(pending)} to fetch")
 
+    if pending:
+        semaphore = asyncio.Semaphore(concurrency)
+        lock = asyncio.Lock()
+        progress = {"count": 0}
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)  # set headless=False to see browser
+            context = await browser.new_context(user_agent=USER_AGENT)
+            with open(CHECKPOINT_FILE, "a", encoding="utf-8") as checkpoint:
+                results = await asyncio.gather(*[
+                    scrape_one(context, article, semaphore, checkpoint, lock, progress, len(pending), timeout_ms)
+                    for article in pending
+                ])
+            await browser.close()
+        for record in results:
+            if record is not None:
+                done[record["url"]] = record
+
+    # Compact the checkpoint to one line per article
+    with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
+        for record in done.values():
+            f.write(json.dumps(record) + "\n")
+
+    all_docs = [done[article["url"]] for article in articles if article["url"] in done]
     print(f"\nTotal documents scraped: {len(all_docs)}")
     # Save to file
-    with open("scraped_articles.txt", "w", encoding="utf-8") as f:
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         for doc in all_docs:
             f.write(f"URL: {doc['url']}\n")
             f.write(f"CONTENT:\n{doc['content']}\n")
             f.write("="*80 + "\n")
 
-asyncio.run(scrape())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Loaded support articles with Playwright.")
+    parser.add_argument("--concurrency", type=int, default=4, help="pages fetched in parallel")
+    parser.add_argument("--timeout", type=int, default=30000, help="per-page timeout in ms")
+    parser.add_argument("--full", action="store_true", help="ignore the checkpoint and re-fetch everything")
+    args = parser.parse_args()
+    asyncio.run(scrape(concurrency=args.concurrency, timeout_ms=args.timeout, full=args.full))
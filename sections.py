@@ -0,0 +1,295 @@
+# sections.py
+"""
+Structure-aware chunking for the scraped support articles.
+
+The scraped dumps are Playwright ``body`` text, so every article carries the
+Help Center chrome: the "Submit a request" header, breadcrumbs, the
+"ARTICLES IN THIS SECTION" / "RECENTLY VIEWED ARTICLES" lists, the helpfulness
+footer. Splitting that by character count embeds the same navigation dozens
+of times and spends prompt tokens on it.
+
+This splitter instead:
+
+1. drops boilerplate lines, found by cross-document frequency (a line, with
+   digits normalised, that appears in at least ``BOILERPLATE_MIN_DOCS``
+   articles and ``BOILERPLATE_MIN_FRACTION`` of the corpus),
+2. splits each article into sections at its headings (all-caps or markdown
+   lines) and keeps numbered steps together,
+3. packs sections into chunks of at most ``CHUNK_MAX_TOKENS`` tokens, each
+   prefixed with the article title and section heading and tagged with its
+   token count (``metadata["tokens"]``, used by rerank.py's context packing).
+
+Compare it with the recursive splitter on the current corpus:
+
+    python sections.py
+"""
+import json
+import logging
+import os
+import re
+from collections import Counter
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+load_dotenv()
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "400"))
+BOILERPLATE_MIN_DOCS = int(os.getenv("BOILERPLATE_MIN_DOCS", "5"))
+BOILERPLATE_MIN_FRACTION = float(os.getenv("BOILERPLATE_MIN_FRACTION", "0.05"))
+# all-MiniLM-L6-v2 vectors, stored as float32 by local_index.py
+VECTOR_BYTES = 384 * 4
+
+HEADING_MAX_WORDS = 15
+MARKDOWN_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+STEP_RE = re.compile(r"^(?:step\s*\d+\b|\d{1,2}[.)]\s)", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def count_tokens(text):
+    """Token count with the encoding chunking.py splits by (rerank.py's shared instance)."""
+    from rerank import get_encoding
+
+    return len(get_encoding().encode(text))
+
+
+def _line_key(line):
+    """Whitespace- and digit-normalised line, so "3 days ago Updated" matches "10 days ago Updated"."""
+    return re.sub(r"\d+", "#", " ".join(line.split()))
+
+
+def find_boilerplate(documents, min_docs=BOILERPLATE_MIN_DOCS, min_fraction=BOILERPLATE_MIN_FRACTION):
+    """
+    Find lines repeated across many documents.
+
+    Args:
+        documents (list): Article documents
+        min_docs (int): Minimum number of documents a line must appear in
+        min_fraction (float): Minimum fraction of documents it must appear in
+
+    Returns:
+        set: Normalised keys (see _line_key) of the boilerplate lines
+    """
+    frequency = Counter()
+    for doc in documents:
+        frequency.update({_line_key(line) for line in doc.page_content.splitlines() if line.strip()})
+    threshold = max(min_docs, min_fraction * len(documents))
+    return {key for key, count in frequency.items() if count >= threshold}
+
+
+def is_heading(line):
+    """All-caps or markdown heading lines, e.g. "📩 KEY DELIVERY" or "## Refunds"."""
+    if MARKDOWN_HEADING_RE.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    cased = [c for c in letters if c.isupper() or c.islower()]
+    if len(cased) < 3 or len(line.split()) > HEADING_MAX_WORDS:
+        return False
+    return sum(c.isupper() for c in cased) >= 0.8 * len(cased)
+
+
+def split_sections(text, boilerplate=frozenset()):
+    """
+    Split article text into sections.
+
+    Args:
+        text (str): Article body
+        boilerplate (set): Line keys to drop
+
+    Returns:
+        list: (heading, units) pairs; a unit is a line of text or a run of
+            consecutive numbered steps joined with newlines
+    """
+    sections = [("", [])]
+    steps = []
+
+    def flush_steps():
+        if steps:
+            sections[-1][1].append("\n".join(steps))
+            steps.clear()
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or _line_key(line) in boilerplate:
+            continue
+        if STEP_RE.match(line):
+            steps.append(line)
+            continue
+        flush_steps()
+        if is_heading(line):
+            heading = line.lstrip("#").strip()
+            previous, units = sections[-1]
+            if previous and not units:
+                # Heading directly under a heading, e.g. "WHAT'S INCLUDED" / "STANDARD EDITION"
+                sections[-1] = (f"{previous} - {heading}", units)
+            else:
+                sections.append((heading, []))
+        else:
+            sections[-1][1].append(line)
+    flush_steps()
+    return [(heading, units) for heading, units in sections if units]
+
+
+def _same_words(a, b):
+    return re.sub(r"\W+", " ", a).lower().strip() == re.sub(r"\W+", " ", b).lower().strip()
+
+
+def _prefix(title, section):
+    """ "Title > Section" line; the section is left out when it just repeats the title."""
+    parts = [title] if title else []
+    if section and not (title and _same_words(title, section)):
+        parts.append(section)
+    return " > ".join(parts) + "\n" if parts else ""
+
+
+def _split_unit(unit, max_tokens):
+    """Split a unit that exceeds the budget: step runs by step, long lines (or steps) by the recursive splitter."""
+    if "\n" in unit:
+        pieces = []
+        for step in unit.split("\n"):
+            pieces.extend(_split_unit(step, max_tokens) if count_tokens(step) + 1 > max_tokens else [step])
+        return pieces
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    # One token is left for the newline joining the piece to the chunk
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max(max_tokens - 1, 1), chunk_overlap=0,
+                                              length_function=count_tokens)
+    return splitter.split_text(unit)
+
+
+def chunk_article(doc, boilerplate=frozenset(), max_tokens=CHUNK_MAX_TOKENS):
+    """
+    Chunk one article along its sections.
+
+    Consecutive small sections share a chunk; a section over the budget is
+    split between units (steps stay whole unless the list alone is too big)
+    and every piece keeps the section heading in its prefix.
+
+    Args:
+        doc (Document): Article document (title in metadata)
+        boilerplate (set): Line keys to drop, from find_boilerplate()
+        max_tokens (int): Token budget per chunk, prefix included
+
+    Returns:
+        list: Chunk documents with title/section/tokens metadata
+    """
+    title = doc.metadata.get("title", "")
+    chunks = []
+    # Chunk being filled: first section heading, lines, token estimate
+    current = {"section": None, "lines": [], "tokens": 0}
+
+    def flush():
+        if current["lines"]:
+            section = current["section"] or ""
+            text = _prefix(title, section) + "\n".join(current["lines"])
+            metadata = {**doc.metadata, "section": section, "tokens": count_tokens(text)}
+            chunks.append(Document(page_content=text, metadata=metadata))
+        current.update(section=None, lines=[], tokens=0)
+
+    def add(section, lines, tokens):
+        if current["section"] is None:
+            # The chunk's first heading goes in the prefix rather than the body
+            current.update(section=section, tokens=count_tokens(_prefix(title, section)))
+        elif section and section != current["section"]:
+            lines = [section] + lines
+            tokens += count_tokens(section) + 1
+        current["lines"].extend(lines)
+        current["tokens"] += tokens
+
+    for heading, units in split_sections(doc.page_content, boilerplate):
+        tokens = sum(count_tokens(unit) + 1 for unit in units)
+        heading_tokens = count_tokens(heading) + 1 if heading else 0
+        if current["lines"] and current["tokens"] + heading_tokens + tokens <= max_tokens:
+            add(heading, units, tokens)
+            continue
+        flush()
+        budget = max_tokens - count_tokens(_prefix(title, heading))
+        if tokens <= budget:
+            add(heading, units, tokens)
+            continue
+        # Oversized section: pack it unit by unit under its own heading
+        pieces = []
+        for unit in units:
+            unit_tokens = count_tokens(unit) + 1
+            pieces.extend(_split_unit(unit, budget) if unit_tokens > budget else [unit])
+        for piece in pieces:
+            piece_tokens = count_tokens(piece) + 1
+            if current["lines"] and current["tokens"] + piece_tokens > max_tokens:
+                flush()
+            add(heading, [piece], piece_tokens)
+        flush()
+    flush()
+    return chunks
+
+
+def split_structured(documents, max_tokens=CHUNK_MAX_TOKENS):
+    """
+    Strip cross-document boilerplate and chunk every article by section.
+
+    Args:
+        documents (list): Article documents (the whole corpus, so boilerplate
+            frequencies are meaningful)
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        list: Chunk documents
+    """
+    documents = list(documents)
+    boilerplate = find_boilerplate(documents)
+    logger.info("Stripping %d boilerplate lines found across %d documents", len(boilerplate), len(documents))
+    chunks = []
+    for doc in documents:
+        chunks.extend(chunk_article(doc, boilerplate, max_tokens))
+    return chunks
+
+
+def index_stats(chunks):
+    """
+    Size of the index a chunk set produces.
+
+    Returns:
+        dict: chunks, total/max tokens, stored text+metadata bytes and
+            estimated vector bytes
+    """
+    tokens = [doc.metadata.get("tokens") or count_tokens(doc.page_content) for doc in chunks]
+    text_bytes = sum(len(json.dumps({"text": doc.page_content, "metadata": doc.metadata})) for doc in chunks)
+    return {
+        "chunks": len(chunks),
+        "tokens": sum(tokens),
+        "max_tokens": max(tokens, default=0),
+        "text_bytes": text_bytes,
+        "vector_bytes": len(chunks) * VECTOR_BYTES,
+        "index_bytes": text_bytes + len(chunks) * VECTOR_BYTES,
+    }
+
+
+def compare_strategies(documents):
+    """
+    Index size before (recursive) and after (structured) on the same documents.
+
+    Returns:
+        dict: strategy -> index_stats()
+    """
+    from chunking import split_documents
+
+    documents = list(documents)
+    return {strategy: index_stats(split_documents(documents, strategy=strategy))
+            for strategy in ("recursive", "structured")}
+
+
+def main():
+    from chunking import load_documents
+    from tracing import configure_logging
+
+    configure_logging()
+    stats = compare_strategies(load_documents())
+    before, after = stats["recursive"], stats["structured"]
+    print(f"{'':<14}{'recursive':>12}{'structured':>12}{'change':>10}")
+    for key in before:
+        change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+        print(f"{key:<14}{before[key]:>12,}{after[key]:>12,}{change:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
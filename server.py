@@ -0,0 +1,312 @@
+# server.py
+"""
+Async HTTP API serving the support workflow.
+
+Endpoints:
+    GET  /health         liveness (the process is up)
+    GET  /ready          readiness (workflow built, models loaded)
+    GET  /metrics        Prometheus metrics from tracing.py
+    POST /answer         {"question", "thread_id"?} -> final answer JSON
+    POST /answer/stream  same request, answer tokens as server-sent events
+
+Requests are admitted through a bounded queue: at most
+``SERVER_MAX_CONCURRENCY`` run at once per worker, up to
+``SERVER_MAX_QUEUE`` more wait, and anything beyond that (or waiting longer
+than ``SERVER_QUEUE_TIMEOUT``) is rejected with 503 and a Retry-After header
+so load balancers and clients back off instead of piling up.
+
+Run a single process with uvicorn, or several workers sharing the loaded
+embedding model and mmapped index with gunicorn (see gunicorn.conf.py):
+
+    uvicorn server:app --port 8000
+    gunicorn server:app -c gunicorn.conf.py
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from answer_cache import confirm_and_store
+from compile import build_workflow
+from human import human_escalation
+from llm import get_registry
+from memory import MEMORY_CHECKPOINT_PATH, MEMORY_ENABLED, aretract_last_turn, thread_config
+from tracing import METRICS, configure_logging, render_prometheus
+from warmup import warm_up
+
+load_dotenv()
+
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "16"))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "64"))
+# Seconds a request may wait for a slot before it is rejected
+SERVER_QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "10"))
+SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "60"))
+SERVER_RETRY_AFTER = int(os.getenv("SERVER_RETRY_AFTER", "2"))
+
+REQUESTS = METRICS.counter("rag_http_requests_total", "HTTP answer requests by endpoint and outcome")
+QUEUE_WAIT = METRICS.histogram("rag_http_queue_wait_seconds", "Time requests waited for a worker slot")
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a request can't be admitted."""
+
+
+class AdmissionQueue:
+    """
+    Bounded admission control for in-flight requests.
+
+    Args:
+        max_concurrency (int): Requests processed at once
+        max_queue (int): Requests allowed to wait for a slot
+        timeout (float): Max seconds to wait for a slot
+    """
+
+    def __init__(self, max_concurrency=SERVER_MAX_CONCURRENCY, max_queue=SERVER_MAX_QUEUE,
+                 timeout=SERVER_QUEUE_TIMEOUT):
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.waiting = 0
+        self.active = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.waiting >= self.max_queue:
+            raise QueueFull(f"{self.waiting} requests already queued")
+        self.waiting += 1
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise QueueFull(f"no slot within {self.timeout}s") from None
+        finally:
+            self.waiting -= 1
+        QUEUE_WAIT.observe(loop.time() - start)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class AnswerRequest(BaseModel):
+    question: str
+    thread_id: Optional[str] = None
+
+
+# Per-worker state, set up in lifespan()
+workflow = None
+queue = None
+ready = False
+startup = None
+
+
+def load_shared_resources():
+    """
+    Load the embedding model, rerank model and vector index.
+
+    gunicorn calls this in the master before forking (preload_app), so
+    workers share the model weights and the mmapped index pages
+    copy-on-write. Nothing runs inference here: torch's thread pools and
+    the micro-batch worker must start in the workers, which run the full
+    warm_up() in lifespan(). Network clients (LLM, Astra) and SQLite
+    connections are opened per worker.
+    """
+    from chunking import MANIFEST_PATH, VECTOR_STORE_BACKEND
+
+    # A Cassandra session must not cross a fork, and a missing index is
+    # reported by the workers; only an existing local index is preloaded
+    preload_index = VECTOR_STORE_BACKEND == "local" and os.path.exists(MANIFEST_PATH)
+    return warm_up(llm=False, vector_store=preload_index, inference=False)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    global workflow, queue, ready, startup
+
+    configure_logging()
+    queue = AdmissionQueue()
+    async with contextlib.AsyncExitStack() as stack:
+        checkpointer = None
+        if MEMORY_ENABLED:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            os.makedirs(os.path.dirname(MEMORY_CHECKPOINT_PATH) or ".", exist_ok=True)
+            checkpointer = await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(MEMORY_CHECKPOINT_PATH))
+        # Everything is loaded and exercised once before the worker reports ready
+        startup = await asyncio.to_thread(warm_up)
+        workflow = build_workflow(use_async=True, memory=MEMORY_ENABLED, checkpointer=checkpointer)
+        ready = True
+        logger.info("---SERVER READY (pid %d)---", os.getpid())
+        try:
+            yield
+        finally:
+            ready = False
+
+
+app = FastAPI(title="Loaded Support Chatbot API", lifespan=lifespan)
+
+
+def _overloaded(error, endpoint):
+    REQUESTS.inc(endpoint=endpoint, outcome="rejected")
+    logger.warning("Rejecting request: %s", error)
+    return JSONResponse({"detail": "Server busy, retry later"}, status_code=503,
+                        headers={"Retry-After": str(SERVER_RETRY_AFTER)})
+
+
+def _answer_text(generation):
+    if hasattr(generation, "content"):
+        return generation.content
+    return str(generation or "")
+
+
+def _run_config(request):
+    """Run state and config for a request; memory threads get an id."""
+    thread_id = request.thread_id or (str(uuid.uuid4()) if MEMORY_ENABLED else None)
+    state = {"question": request.question, "generation": "", "documents": []}
+    return state, (thread_config(thread_id) if thread_id else None), thread_id
+
+
+def _response(result, thread_id):
+    return {
+        "answer": _answer_text(result.get("generation")),
+        "grade": result.get("grade"),
+        "grade_tier": result.get("grade_tier"),
+        "route": result.get("route"),
+        "cached": bool(result.get("cached")),
+        "thread_id": thread_id,
+    }
+
+
+async def _confirm(result, config):
+    """
+    Confirm a deferred grade; return the escalation message if it fails.
+
+    A failed grade also replaces the provisional answer in the thread's memory.
+    """
+    grade = await asyncio.to_thread(confirm_and_store, workflow, result, get_registry().grader)
+    if grade["grade"] != "good":
+        escalation = human_escalation(result)["generation"]
+        await aretract_last_turn(workflow, config, escalation)
+        return escalation
+    return None
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def readiness():
+    if not ready:
+        raise HTTPException(status_code=503, detail="Starting up")
+    return {"status": "ready", "active": queue.active, "waiting": queue.waiting, "startup": startup}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/answer")
+async def answer(request: AnswerRequest):
+    """Answer a question and return the final result."""
+    state, config, thread_id = _run_config(request)
+    try:
+        async with queue.slot():
+            result = await asyncio.wait_for(workflow.ainvoke(state, config=config), SERVER_REQUEST_TIMEOUT)
+            if result.get("grade_pending"):
+                escalation = await _confirm(result, config)
+                if escalation is not None:
+                    result = {**result, "generation": escalation, "grade": "poor"}
+    except QueueFull as e:
+        return _overloaded(e, "answer")
+    except asyncio.TimeoutError:
+        REQUESTS.inc(endpoint="answer", outcome="timeout")
+        raise HTTPException(status_code=504, detail="Timed out") from None
+    REQUESTS.inc(endpoint="answer", outcome="ok")
+    return _response(result, thread_id)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/answer/stream")
+async def answer_stream(request: AnswerRequest):
+    """
+    Stream answer tokens as server-sent events.
+
+    Events: "token" ({"text"}) while generating, then "done" with the same
+    payload as /answer. A deferred grade that fails afterwards sends a
+    "retract" event with the replacement answer. A run exceeding
+    SERVER_REQUEST_TIMEOUT ends with an "error" event.
+    """
+    state, config, thread_id = _run_config(request)
+    # Admit before starting the response so overload is a plain 503
+    slot = queue.slot()
+    try:
+        await slot.__aenter__()
+    except QueueFull as e:
+        return _overloaded(e, "stream")
+
+    released = False
+
+    async def release():
+        # Runs from the generator's finally and as the response's background
+        # task, so the slot is freed even if the body is never iterated
+        nonlocal released
+        if not released:
+            released = True
+            await slot.__aexit__(None, None, None)
+
+    async def events():
+        result = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SERVER_REQUEST_TIMEOUT
+        stream = workflow.astream(state, config=config, stream_mode=["messages", "values"])
+        try:
+            while True:
+                try:
+                    mode, payload = await asyncio.wait_for(stream.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                if mode == "messages":
+                    chunk, metadata = payload
+                    if metadata.get("langgraph_node") == "generate" and chunk.content:
+                        yield _sse("token", {"text": chunk.content})
+                else:
+                    result = payload
+            yield _sse("done", _response(result, thread_id))
+            if result.get("grade_pending"):
+                escalation = await _confirm(result, config)
+                if escalation is not None:
+                    yield _sse("retract", {"answer": escalation})
+            REQUESTS.inc(endpoint="stream", outcome="ok")
+        except asyncio.TimeoutError:
+            REQUESTS.inc(endpoint="stream", outcome="timeout")
+            yield _sse("error", {"detail": "Timed out"})
+        except Exception as e:
+            logger.exception("Streaming request failed")
+            REQUESTS.inc(endpoint="stream", outcome="error")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            await stream.aclose()
+            await release()
+
+    return StreamingResponse(events(), media_type="text/event-stream", background=BackgroundTask(release),
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,161 @@
+# speculative.py
+"""
+Speculative execution of retrieval (and optionally web search) while routing.
+
+Vector retrieval is cheap next to the router LLM round trip, so in
+speculative mode the graph starts it at the same time as routing. Once the
+router decides, the selected branch's result is kept and the other branch is
+cancelled (or its result discarded if it already started). Used and wasted
+work is counted so the extra backend load can be traded off against latency.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from tracing import METRICS, LATENCY_BUCKETS
+
+load_dotenv()
+
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Also start the web search speculatively (costs a DuckDuckGo call per question)
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", "8"))
+
+# Which node each router decision maps to
+BRANCH_FOR_ROUTE = {"vectorstore": "retrieve", "web_search": "web_search"}
+
+SPECULATIVE_BRANCHES = METRICS.counter(
+    "rag_speculative_branches_total", "Speculative branches by outcome (used/wasted/cancelled)"
+)
+SPECULATIVE_WASTED_SECONDS = METRICS.histogram(
+    "rag_speculative_wasted_seconds", "Wall time spent on discarded speculative branches", LATENCY_BUCKETS
+)
+
+logger = logging.getLogger(__name__)
+
+# Global thread pool shared by all speculative dispatches in this process
+_executor = None
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+    return _executor
+
+
+def _record_wasted(branch, started_at, finished=None):
+    SPECULATIVE_BRANCHES.inc(branch=branch, outcome="wasted")
+    SPECULATIVE_WASTED_SECONDS.observe((finished or time.perf_counter()) - started_at, branch=branch)
+
+
+def make_speculative_router(route_fn, branch_fns):
+    """
+    Build a node that routes while speculatively running the branches.
+
+    Args:
+        route_fn: Sync routing function returning "vectorstore"/"web_search"
+        branch_fns (dict): node name -> sync node function to start early
+
+    Returns:
+        A LangGraph node returning {"route", "documents"?}
+    """
+    def speculative_route(state):
+        executor = _get_executor()
+        started_at = time.perf_counter()
+        futures = {name: executor.submit(fn, state) for name, fn in branch_fns.items()}
+
+        route = route_fn(state)
+        selected = BRANCH_FOR_ROUTE.get(route)
+        update = {"route": route}
+
+        for name, future in futures.items():
+            if name == selected:
+                continue
+            if future.cancel():
+                SPECULATIVE_BRANCHES.inc(branch=name, outcome="cancelled")
+            else:
+                # Already running; let it finish in the background and count it as waste
+                future.add_done_callback(lambda _, name=name: _record_wasted(name, started_at))
+
+        if selected in futures:
+            update.update(futures[selected].result())
+            SPECULATIVE_BRANCHES.inc(branch=selected, outcome="used")
+        logger.info("---SPECULATIVE ROUTE: %s (prefetched=%s)---", route, selected in futures)
+        return update
+
+    return speculative_route
+
+
+def make_async_speculative_router(route_fn, branch_fns):
+    """
+    Async version of make_speculative_router(); losing branches are cancelled.
+    """
+    async def aspeculative_route(state):
+        started_at = time.perf_counter()
+        tasks = {name: asyncio.create_task(fn(state)) for name, fn in branch_fns.items()}
+
+        try:
+            route = await route_fn(state)
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        selected = BRANCH_FOR_ROUTE.get(route)
+        update = {"route": route}
+
+        losers = []
+        for name, task in tasks.items():
+            if name == selected:
+                continue
+            losers.append(task)
+            if task.done():
+                _record_wasted(name, started_at)
+            else:
+                task.cancel()
+                SPECULATIVE_BRANCHES.inc(branch=name, outcome="cancelled")
+                SPECULATIVE_WASTED_SECONDS.observe(time.perf_counter() - started_at, branch=name)
+        # Let the cancellations land and retrieve any errors of finished losers,
+        # so no task is left pending or with an unretrieved exception
+        await asyncio.gather(*losers, return_exceptions=True)
+
+        if selected in tasks:
+            update.update(await tasks[selected])
+            SPECULATIVE_BRANCHES.inc(branch=selected, outcome="used")
+        logger.info("---SPECULATIVE ROUTE: %s (prefetched=%s)---", route, selected in tasks)
+        return update
+
+    return aspeculative_route
+
+
+def next_after_dispatch(state, after_retrieve):
+    """
+    Conditional edge after the speculative dispatch node.
+
+    Args:
+        state (dict): Graph state with "route" (and prefetched "documents")
+        after_retrieve (str): Node that normally follows retrieve
+
+    Returns:
+        str: Next node name
+    """
+    if state.get("route") == "web_search":
+        # Web search may not have been prefetched
+        return "generate" if state.get("documents") else "web_search"
+    return after_retrieve
+
+
+def speculative_stats():
+    """
+    Used/wasted/cancelled counts per branch.
+    """
+    stats = {}
+    for labels, value in SPECULATIVE_BRANCHES.items():
+        stats.setdefault(labels["branch"], {})[labels["outcome"]] = value
+    return stats
@@ -1,12 +1,13 @@
-from langchain.schema import Document
-from chunking import initialize_and_populate_vectorstore
-from langchain_community.tools import DuckDuckGoSearchResults
-import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+import asyncio
+import logging
+
+from langchain_core.documents import Document
+from chunking import RERANK_ENABLED, initialize_and_populate_vectorstore
 from langchain_core.prompts import ChatPromptTemplate
+from rerank import rerank, arerank
+from websearch import WEB_SEARCH_SNIPPETS, get_web_search
 
-web_search_tool = DuckDuckGoSearchResults()
+logger = logging.getLogger(__name__)
 
 
 
@@ -25,6 +26,15 @@ def format_docs(docs):
         return str(docs)
 
 
+def _context(state, documents):
+    """Documents as prompt context, preceded by the conversation so far (if any)."""
+    docs_txt = format_docs(documents)
+    conversation = state.get("conversation")
+    if conversation:
+        return f"CONVERSATION SO FAR:\n{conversation}\n\nDOCUMENTS:\n{docs_txt}"
+    return docs_txt
+
+
 def retrieve(state):
     """
     Retrieve documents
@@ -35,89 +45,166 @@ def retrieve(state):
     Returns:
         state (dict): New key added to state, documents, that contains retrieved documents
     """
-    print("---RETRIEVE---")
+    logger.info("---RETRIEVE---")
     question = state["question"]
     retriever = initialize_and_populate_vectorstore()
-    # Retrieval
-    documents = retriever.invoke(question,search_kwargs={"k": 5})
-    print(f"Retrieved {len(documents)} documents for: {question}")
-    for i, doc in enumerate(documents):
-        print(f"Doc {i+1}: {doc.page_content[:200]}...")
+    # Retrieval (follow-ups search with the previous question folded in)
+    query = state.get("search_query") or question
+    documents = retriever.invoke(query,search_kwargs={"k": 5})
+    _log_retrieved(query, documents)
+    return {"documents": documents, "question": question}
+
+
+async def aretrieve(state):
+    """
+    Async version of retrieve(); awaits the retriever instead of blocking.
+    """
+    logger.info("---RETRIEVE---")
+    question = state["question"]
+    # First call may attach to the store, keep that off the event loop
+    retriever = await asyncio.to_thread(initialize_and_populate_vectorstore)
+    query = state.get("search_query") or question
+    documents = await retriever.ainvoke(query)
+    _log_retrieved(query, documents)
     return {"documents": documents, "question": question}
 
 
+def _log_retrieved(question, documents):
+    logger.info("Retrieved %d documents for: %s", len(documents), question)
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, doc in enumerate(documents):
+            logger.debug("Doc %d: %s...", i + 1, doc.page_content[:200])
+
+
 def web_search(state):
     """
     Web search based on the re-phrased question.
+
+    Results are cached; if the search times out, fails or finds nothing the
+    question is answered from the vectorstore instead.
     """
-    print("---WEB SEARCH---")
+    logger.info("---WEB SEARCH---")
     question = state["question"]
     
     # Web search with concise results
-    docs = web_search_tool.invoke({"query": question, "max_results": 3})
-    
+    docs = get_web_search().search(state.get("search_query") or question)
+    if docs is None:
+        logger.info("---WEB SEARCH FALLBACK: VECTORSTORE---")
+        update = retrieve(state)
+        if RERANK_ENABLED:
+            update.update(rerank(update))
+        return update
+
+    return {"documents": _web_results_document(docs), "question": question}
+
+
+async def aweb_search(state):
+    """
+    Async version of web_search().
+    """
+    logger.info("---WEB SEARCH---")
+    question = state["question"]
+
+    docs = await get_web_search().asearch(state.get("search_query") or question)
+    if docs is None:
+        logger.info("---WEB SEARCH FALLBACK: VECTORSTORE---")
+        update = await aretrieve(state)
+        if RERANK_ENABLED:
+            update.update(await arerank(update))
+        return update
+
+    return {"documents": _web_results_document(docs), "question": question}
+
+
+def _web_results_document(docs):
+    """Turn search results into a single context Document."""
     # Format web results properly
     if docs and isinstance(docs, list):
         # Extract just the snippets
-        web_content = "\n".join([doc.get('snippet', '') for doc in docs[:2]])
+        web_content = "\n".join([doc.get('snippet', '') for doc in docs[:WEB_SEARCH_SNIPPETS]])
     else:
         web_content = str(docs)
-    
-    web_results = Document(page_content=web_content)
 
-    return {"documents": web_results, "question": question}
+    return Document(page_content=web_content)
+
+
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+        ("system", """You are a Loaded (formerly CDKeys) customer support agent. Provide clear, helpful answers.
 
-def generate(state):
+        GUIDELINES:
+        - Be concise but complete (2-4 sentences)
+        - Use professional but friendly tone  
+        - Focus on solving the customer's issue
+        - If you don't know, say so politely"""),
+        ("human", """CONTEXT: {context}
+
+        CUSTOMER QUESTION: {question}
+
+        Please provide a helpful response:""")
+    ])
+
+
+def build_rag_chain(llm):
+    """
+    Build the answer generation chain.
+
+    Args:
+        llm: Chat model used for generation
+
+    Returns:
+        The prompt | llm chain
+    """
+    return RAG_PROMPT | llm
+
+
+def generate(state, rag_chain=None):
     """
     LangGraph node: generate a professional, concise answer based on question and retrieved documents.
 
     Args:
         state (dict): Current graph state, must contain 'question' and 'documents'
+        rag_chain: Generation chain built once by the chain registry
 
     Returns:
         dict: Updated state with a new key 'generation' containing the generated answer
     """
-    print("---GENERATE ANSWER NODE---")
+    logger.info("---GENERATE ANSWER NODE---")
     
     question = state.get("question", "")
     documents = state.get("documents", [])
 
-    # Format documents into plain text for RAG/LLM
-    docs_txt = format_docs(documents)
-
-    # Create a proper ChatPromptTemplate (not a string)
-    prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """You are a Loaded (formerly CDKeys) customer support agent. Provide clear, helpful answers.
-
-        GUIDELINES:
-        - Be concise but complete (2-4 sentences)
-        - Use professional but friendly tone  
-        - Focus on solving the customer's issue
-        - If you don't know, say so politely"""),
-            ("human", """CONTEXT: {context}
+    # Format documents (and conversation memory) into plain text for RAG/LLM
+    docs_txt = _context(state, documents)
 
-        CUSTOMER QUESTION: {question}
-
-        Please provide a helpful response:""")
-        ])
-    
-    load_dotenv()
-    groq_api_key = os.getenv("GROQ_API_KEY")  # Note: should be GROQ_API_KEY, not groq_api_key
-    
-    # Set up API key
-    if groq_api_key:
-        os.environ["GROQ_API_KEY"] = groq_api_key
-    elif "GROQ_API_KEY" not in os.environ:
-        raise ValueError("GROQ_API_KEY not found. Please provide it as an argument or set it as an environment variable.")
+    if rag_chain is None:
+        from llm import get_registry
+        rag_chain = get_registry().generator
     
-    # Initialize LLM
-    llm = ChatGroq(model_name="llama-3.1-8b-instant")
-    
-    # Create the chain properly
-    rag_chain = prompt_template | llm
-    
-    # Invoke the chain with the correct input format
-    generation = rag_chain.invoke({"context": docs_txt, "question": question})
+    # Stream the answer so LangGraph's "messages" stream mode can forward
+    # tokens to the UI as they arrive; the chunks add up to the full message
+    generation = None
+    for chunk in rag_chain.stream({"context": docs_txt, "question": question}):
+        generation = chunk if generation is None else generation + chunk
     
     return {"documents": documents, "question": question, "generation": generation}
 
+
+async def agenerate(state, rag_chain=None):
+    """
+    Async version of generate(); streams the chain with astream.
+    """
+    logger.info("---GENERATE ANSWER NODE---")
+
+    question = state.get("question", "")
+    documents = state.get("documents", [])
+    docs_txt = _context(state, documents)
+
+    if rag_chain is None:
+        from llm import get_registry
+        rag_chain = get_registry().generator
+
+    generation = None
+    async for chunk in rag_chain.astream({"context": docs_txt, "question": question}):
+        generation = chunk if generation is None else generation + chunk
+
+    return {"documents": documents, "question": question, "generation": generation}
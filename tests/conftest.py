@@ -0,0 +1,31 @@
+# tests/conftest.py
+"""
+Shared fixtures. The modules live at the repo root, so it goes on sys.path.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import WordEncoding  # noqa: E402
+
+
+class KeyedEmbeddings:
+    """Embeddings returning fixed vectors for known texts (zero vector otherwise)."""
+
+    def __init__(self, vectors, dim=3):
+        self.vectors = vectors
+        self.dim = dim
+
+    def embed_query(self, text):
+        return list(self.vectors.get(text, [0.0] * self.dim))
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def word_encoding():
+    return WordEncoding()
@@ -0,0 +1,117 @@
+# tests/test_answer_cache.py
+import pytest
+
+import answer_cache
+from answer_cache import CachedWorkflow, SemanticAnswerCache, confirm_and_store
+from conftest import KeyedEmbeddings
+
+QUESTION = "Where is my key?"
+
+
+class FakeGraph:
+    checkpointer = None
+
+    def __init__(self, grade_pending=True):
+        self.grade_pending = grade_pending
+        self.calls = 0
+
+    def invoke(self, state, config=None):
+        self.calls += 1
+        return {**state, "generation": "Keys are emailed.", "grade": "good", "grade_pending": self.grade_pending}
+
+
+class FakeGrade:
+    def __init__(self, grade):
+        self.grade = grade
+        self.reason = "test"
+
+
+class FakeGrader:
+    def __init__(self, grade):
+        self.grade = grade
+
+    def invoke(self, inputs):
+        return FakeGrade(self.grade)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticAnswerCache(path=str(tmp_path / "answers.sqlite3"),
+                               embeddings=KeyedEmbeddings({QUESTION: [1.0, 0.0, 0.0]}))
+
+
+def test_deferred_answer_is_cached_once_confirmed(cache):
+    graph = FakeGraph()
+    workflow = CachedWorkflow(graph, cache)
+
+    result = workflow.invoke({"question": QUESTION})
+    assert cache.lookup(QUESTION) is None
+
+    assert confirm_and_store(workflow, result, FakeGrader("good"))["grade"] == "good"
+    assert cache.lookup(QUESTION) == "Keys are emailed."
+    assert workflow.invoke({"question": QUESTION})["cached"] is True
+    assert graph.calls == 1
+
+
+def test_retracted_answer_is_not_cached(cache):
+    workflow = CachedWorkflow(FakeGraph(), cache)
+    result = workflow.invoke({"question": QUESTION})
+
+    assert confirm_and_store(workflow, result, FakeGrader("poor"))["grade"] == "poor"
+    assert cache.lookup(QUESTION) is None
+
+
+def test_confirm_without_cache():
+    result = FakeGraph().invoke({"question": QUESTION})
+    assert confirm_and_store(object(), result, FakeGrader("good"))["grade"] == "good"
+
+
+def test_corpus_version_tracks_embedding_backend(tmp_path, monkeypatch):
+    manifest = tmp_path / "manifest.json"
+    assert answer_cache.corpus_version(str(manifest)) == "none"
+    manifest.write_text('{"chunks": {}}')
+    torch_version = answer_cache.corpus_version(str(manifest))
+
+    monkeypatch.setattr(answer_cache, "embedding_id", lambda: "all-MiniLM-L6-v2@onnx-int8")
+    assert answer_cache.corpus_version(str(manifest)) != torch_version
+
+
+def test_corpus_version_rehashes_only_when_manifest_changes(tmp_path, monkeypatch):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text('{"chunks": {}}')
+    reads = []
+    real_open = open
+
+    def counting_open(path, *args, **kwargs):
+        reads.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    first = answer_cache.corpus_version(str(manifest))
+    assert answer_cache.corpus_version(str(manifest)) == first
+    assert len(reads) == 1
+
+    manifest.write_text('{"chunks": {"abc": {}}}')
+    assert answer_cache.corpus_version(str(manifest)) != first
+    assert len(reads) == 2
+
+
+def _vectors(n):
+    return {f"question {i}": [float(i == j) for j in range(n)] for i in range(n)}
+
+
+def test_store_appends_and_evicts_in_memory(tmp_path, monkeypatch):
+    vectors = _vectors(40)
+    cache = SemanticAnswerCache(path=str(tmp_path / "answers.sqlite3"), embeddings=KeyedEmbeddings(vectors, dim=40),
+                                max_entries=20)
+    monkeypatch.setattr(cache, "_refresh", lambda: pytest.fail("store() reloaded the matrix"))
+
+    for i in range(40):
+        cache.store(f"question {i}", f"answer {i}")
+
+    rows = dict(cache._conn.execute("SELECT id, answer FROM answers").fetchall())
+    assert len(rows) == 20
+    assert sorted(cache._ids) == sorted(rows)
+    assert cache._matrix.shape == (20, 40)
+    for i in range(40):
+        assert cache.lookup(f"question {i}") == (f"answer {i}" if i >= 20 else None)
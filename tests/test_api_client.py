@@ -0,0 +1,29 @@
+# tests/test_api_client.py
+import httpx
+import pytest
+
+import api_client
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Shared client on a mock transport that records each request's timeout."""
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        if request.url.path == "/answer":
+            return httpx.Response(200, json={"answer": "Keys are emailed."})
+        return httpx.Response(200, text='event: done\ndata: {"answer": "Keys are emailed."}\n\n')
+
+    monkeypatch.setattr(api_client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    return timeouts
+
+
+def test_timeout_is_per_request(transport):
+    api_client.answer("http://api", "Where is my key?", timeout=5.0)
+    api_client.answer("http://api", "Where is my key?", timeout=30.0)
+    events = list(api_client.stream_answer("http://api", "Where is my key?", timeout=7.0))
+
+    assert transport == [5.0, 30.0, 7.0]
+    assert events == [("done", {"answer": "Keys are emailed."})]
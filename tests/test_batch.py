@@ -0,0 +1,104 @@
+# tests/test_batch.py
+from langchain_core.documents import Document
+
+import batch
+from bm25 import BM25Index, HybridRetriever
+
+REFUND = Document(page_content="Refund policy: keys that were not revealed can be refunded.", metadata={"source": "refund"})
+CURRENCY = Document(page_content="Which currencies do you accept? GBP, EUR and USD.", metadata={"source": "currency"})
+
+
+class DenseOnlyStore:
+    """Vector store ranking the refund article first for every query."""
+
+    def __init__(self):
+        self.ks = []
+
+    def similarity_search_by_vector_batch(self, vectors, k=4):
+        self.ks.append(k)
+        return [[REFUND, CURRENCY][:k] for _ in vectors]
+
+
+class Embeddings:
+    def embed_queries(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_documents(self, texts):
+        raise AssertionError("questions must not go through the document cache")
+
+
+def _patch(monkeypatch, retriever, store):
+    monkeypatch.setattr(batch, "initialize_and_populate_vectorstore", lambda: retriever)
+    monkeypatch.setattr(batch, "get_vector_store", lambda: store)
+    monkeypatch.setattr(batch, "get_embeddings", lambda: Embeddings())
+    monkeypatch.setattr(batch, "RERANK_ENABLED", False)
+    monkeypatch.setattr(batch, "RETRIEVAL_K", 2)
+
+
+def test_batch_retrieve_fuses_bm25_like_serving(monkeypatch):
+    store = DenseOnlyStore()
+    retriever = HybridRetriever(vector_store=store, bm25=BM25Index.build([REFUND, CURRENCY]), k=2, vector_k=10)
+    _patch(monkeypatch, retriever, store)
+
+    documents, _, _ = batch.batch_retrieve(["Do you accept EUR currencies?"])
+
+    # BM25 lifts the keyword match above the dense-only ranking
+    assert [doc.metadata["source"] for doc in documents[0]] == ["currency", "refund"]
+    assert store.ks == [10]
+
+
+def test_batch_retrieve_dense_only_without_hybrid(monkeypatch):
+    store = DenseOnlyStore()
+    _patch(monkeypatch, object(), store)
+
+    documents, _, _ = batch.batch_retrieve(["Do you accept EUR currencies?"])
+
+    assert [doc.metadata["source"] for doc in documents[0]] == ["refund", "currency"]
+    assert store.ks == [2]
+
+
+class PoorGrader:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        from grader import GradeAnswer
+
+        self.calls += 1
+        return GradeAnswer(grade="poor", reason="off topic")
+
+
+def test_deferred_grades_are_confirmed_in_batch(monkeypatch):
+    import asyncio
+    import importlib
+    from types import SimpleNamespace
+
+    import grader
+
+    monkeypatch.setattr(grader, "GRADER_MODE", "deferred")
+    deferred_batch = importlib.reload(batch)
+    try:
+        async def route(state, question_router):
+            return "vectorstore"
+
+        async def generate(state, rag_chain):
+            return {"generation": "Keys arrive by email."}
+
+        monkeypatch.setattr(deferred_batch, "aroute_question", route)
+        monkeypatch.setattr(deferred_batch, "agenerate", generate)
+        monkeypatch.setattr(deferred_batch, "RERANK_ENABLED", False)
+        monkeypatch.setattr(grader, "local_grade", lambda answer, documents: (None, 0.5))
+        structured_grader = PoorGrader()
+
+        output = asyncio.run(deferred_batch.answer_one(
+            {"id": 1, "question": "Where is my key?"}, [REFUND], SimpleNamespace(router=None, generator=None),
+            structured_grader,
+            asyncio.Semaphore(1), 0.0,
+        ))
+    finally:
+        monkeypatch.undo()
+        importlib.reload(batch)
+
+    assert structured_grader.calls == 1
+    assert output["grade"] == "poor"
+    assert "escalated" in output
@@ -0,0 +1,44 @@
+# tests/test_chunking.py
+import json
+
+import pytest
+
+import chunking
+import ingest
+
+
+@pytest.fixture
+def attach(tmp_path, monkeypatch):
+    """Attach with a fake store and the manifest at a temp path; ingestion must not run."""
+    manifest = tmp_path / "manifest.json"
+    monkeypatch.setattr(chunking, "MANIFEST_PATH", str(manifest))
+    monkeypatch.setattr(chunking, "retriever", None)
+    monkeypatch.setattr(chunking, "get_vector_store", lambda: pytest.fail("attached without a valid manifest"))
+    monkeypatch.setattr(ingest, "load_manifest", lambda: json.loads(manifest.read_text()))
+    monkeypatch.setattr(ingest, "run_ingestion", lambda **kwargs: pytest.fail("ingestion ran on the serving path"))
+    return manifest
+
+
+def test_missing_manifest_raises(attach):
+    with pytest.raises(RuntimeError, match="python ingest.py"):
+        chunking.initialize_and_populate_vectorstore()
+
+
+def test_other_embedding_model_raises(attach, monkeypatch):
+    monkeypatch.setattr(ingest, "embedding_id", lambda: "all-MiniLM-L6-v2@onnx-int8")
+    attach.write_text(json.dumps({"embedding": "all-MiniLM-L6-v2", "chunks": {"abc": {}}}))
+    with pytest.raises(RuntimeError, match="re-embed"):
+        chunking.initialize_and_populate_vectorstore()
+
+
+@pytest.mark.parametrize("backend, quantized, expected", [
+    ("torch", False, "all-MiniLM-L6-v2"),
+    ("onnx", False, "all-MiniLM-L6-v2"),
+    ("onnx", True, "all-MiniLM-L6-v2@onnx-int8"),
+])
+def test_only_int8_changes_embedding_id(monkeypatch, backend, quantized, expected):
+    import onnx_embeddings
+
+    monkeypatch.setattr(chunking, "EMBEDDING_BACKEND", backend)
+    monkeypatch.setattr(onnx_embeddings, "ONNX_QUANTIZED", quantized)
+    assert chunking.embedding_id() == expected
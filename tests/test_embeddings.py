@@ -0,0 +1,44 @@
+# tests/test_embeddings.py
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from embeddings import EmbeddingDiskCache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = EmbeddingDiskCache(str(tmp_path / "cache.sqlite3"), "model")
+    cache.put_many({"a": np.ones(3, dtype=np.float32)})
+    found = cache.get_many(["a", "b"])
+    assert list(found) == ["a"]
+    np.testing.assert_array_equal(found["a"], np.ones(3, dtype=np.float32))
+
+
+def test_disk_cache_opens_lazily(tmp_path):
+    cache = EmbeddingDiskCache(str(tmp_path / "cache.sqlite3"), "model")
+    assert cache._conn is None
+
+
+def _use_in_child(cache, conn):
+    cache.put_many({"child": np.full(3, 2.0, dtype=np.float32)})
+    conn.send((cache._pid == os.getpid(), sorted(cache.get_many(["parent", "child"]))))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_uses_its_own_connection(tmp_path):
+    cache = EmbeddingDiskCache(str(tmp_path / "cache.sqlite3"), "model")
+    cache.put_many({"parent": np.ones(3, dtype=np.float32)})
+    parent_conn = cache._conn
+
+    pipe, child_pipe = multiprocessing.Pipe()
+    child = multiprocessing.get_context("fork").Process(target=_use_in_child, args=(cache, child_pipe))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    assert pipe.recv() == (True, ["child", "parent"])
+
+    # The parent's connection is untouched and sees the child's write
+    assert cache._conn is parent_conn
+    assert sorted(cache.get_many(["parent", "child"])) == ["child", "parent"]
@@ -0,0 +1,42 @@
+# tests/test_fakes.py
+import pytest
+
+import chunking
+import fakes
+import rerank
+import websearch
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fail any tiktoken download and restore the singletons install_fakes() replaces."""
+    import tiktoken
+
+    def no_network(name):
+        raise AssertionError(f"tiktoken.get_encoding({name!r}) would download BPE files")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", no_network)
+    for module, name in [(rerank, "_encoding"), (rerank, "_cross_encoder"), (chunking, "embeddings"),
+                         (chunking, "vector_store"), (chunking, "retriever"), (websearch, "_client")]:
+        monkeypatch.setattr(module, name, None)
+
+
+def test_install_fakes_needs_no_tiktoken(offline, tmp_path):
+    registry = fakes.install_fakes(llm_latency=0.0, token_latency=0.0, search_latency=0.0,
+                                   index_dir=str(tmp_path))
+    assert isinstance(rerank.get_encoding(), fakes.WordEncoding)
+    assert registry.generator is not None
+
+    docs = chunking.retriever.invoke("How do I redeem my Steam key?")
+    assert docs
+    assert rerank.pack_documents(docs, budget=50)
+
+
+def test_recursive_split_counts_with_shared_encoding(offline, monkeypatch):
+    from langchain_core.documents import Document
+
+    monkeypatch.setattr(rerank, "_encoding", fakes.WordEncoding())
+    text = " ".join(f"word{i}" for i in range(2500))
+    chunks = chunking.split_documents([Document(page_content=text)], strategy="recursive")
+    assert len(chunks) == 3
+    assert all(len(chunk.page_content.split()) <= 1000 for chunk in chunks)
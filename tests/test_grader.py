@@ -0,0 +1,55 @@
+# tests/test_grader.py
+import numpy as np
+
+import grader
+from embeddings import EmbeddingService
+
+
+class FakeModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=None, pool=None):
+        self.encoded.extend(texts)
+        return np.array([[1.0, float(len(text)), 0.0] for text in texts], dtype=np.float32)
+
+
+class FakeService(EmbeddingService):
+    def _load_model(self, path):
+        return FakeModel()
+
+
+class FakeDocument:
+    def __init__(self, page_content):
+        self.page_content = page_content
+
+
+def test_local_grade_keeps_contexts_out_of_disk_cache(tmp_path, monkeypatch):
+    service = FakeService("model", processes=1, cache_path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(grader, "get_embeddings", lambda: service)
+
+    verdict, similarity = grader.local_grade("Keys are emailed.", [FakeDocument("Keys are emailed on release.")])
+
+    assert verdict == "good"
+    assert similarity > 0.9
+    assert service.disk_cache.get_many(["Keys are emailed on release."]) == {}
+
+
+def test_embed_documents_still_caches_by_default(tmp_path):
+    service = FakeService("model", processes=1, cache_path=str(tmp_path / "cache.sqlite3"))
+    service.embed_documents(["chunk"])
+    assert list(service.disk_cache.get_many(["chunk"])) == ["chunk"]
+
+
+def test_local_grade_reuses_cached_chunk_vectors(tmp_path, monkeypatch):
+    service = FakeService("model", processes=1, cache_path=str(tmp_path / "cache.sqlite3"))
+    service.embed_documents(["Indexed chunk about keys."])
+    monkeypatch.setattr(grader, "get_embeddings", lambda: service)
+    service.model.encoded.clear()
+
+    grader.local_grade("Keys are emailed.", [FakeDocument("Indexed chunk about keys."), FakeDocument("Web snippet.")])
+
+    assert service.model.encoded == ["Keys are emailed.", "Web snippet."]
+    assert list(service.disk_cache.get_many(["Indexed chunk about keys.", "Web snippet."])) == [
+        "Indexed chunk about keys."
+    ]
@@ -0,0 +1,76 @@
+# tests/test_ingest.py
+import copy
+
+import pytest
+from langchain_core.documents import Document
+
+import ingest
+
+
+class FakeStore:
+    def __init__(self):
+        self.ids = set()
+        self.added = 0
+        self.cleared = 0
+
+    def add_documents(self, documents, ids):
+        self.ids.update(ids)
+        self.added += len(ids)
+
+    def delete(self, ids):
+        self.ids.difference_update(ids)
+
+    def clear(self):
+        self.ids.clear()
+        self.cleared += 1
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    store = FakeStore()
+    saved = {"manifest": {"version": ingest.MANIFEST_VERSION, "table": ingest.TABLE_NAME, "chunks": {}}}
+    backend = {"id": "all-MiniLM-L6-v2"}
+    monkeypatch.setattr(ingest, "get_vector_store", lambda: store)
+    monkeypatch.setattr(ingest, "split_documents",
+                        lambda docs: [Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+                                      for doc in docs])
+    monkeypatch.setattr(ingest, "load_manifest", lambda: copy.deepcopy(saved["manifest"]))
+    monkeypatch.setattr(ingest, "save_manifest", lambda manifest: saved.update(manifest=copy.deepcopy(manifest)))
+    monkeypatch.setattr(ingest, "embedding_id", lambda: backend["id"])
+    monkeypatch.setattr(ingest, "BM25_PATH", str(tmp_path / "bm25.json"))
+    documents = [Document(page_content=f"Article {i}", metadata={"source": f"{i}.txt"}) for i in range(3)]
+    return store, saved, backend, documents
+
+
+def test_manifest_records_embedding_backend(pipeline):
+    store, saved, _, documents = pipeline
+    assert ingest.run_ingestion(documents=documents)["added"] == 3
+    assert saved["manifest"]["embedding"] == "all-MiniLM-L6-v2"
+
+    # Same backend: nothing is re-embedded
+    assert ingest.run_ingestion(documents=documents)["added"] == 0
+    assert store.cleared == 0
+
+
+def test_backend_change_forces_reembed(pipeline):
+    store, saved, backend, documents = pipeline
+    ingest.run_ingestion(documents=documents)
+
+    backend["id"] = "all-MiniLM-L6-v2@onnx-int8"
+    assert ingest.embedding_changed(saved["manifest"])
+    stats = ingest.run_ingestion(documents=documents)
+    assert stats["added"] == 3
+    assert store.cleared == 1
+    assert store.added == 6
+    assert saved["manifest"]["embedding"] == "all-MiniLM-L6-v2@onnx-int8"
+    assert not ingest.embedding_changed(saved["manifest"])
+
+
+def test_unrecorded_embedding_is_the_torch_model(pipeline):
+    _, saved, backend, _ = pipeline
+    saved["manifest"]["chunks"] = {"abc": {"source": "0.txt"}}
+    assert "embedding" not in saved["manifest"]
+    assert not ingest.embedding_changed(saved["manifest"])
+
+    backend["id"] = "all-MiniLM-L6-v2@onnx-int8"
+    assert ingest.embedding_changed(saved["manifest"])
@@ -0,0 +1,112 @@
+# tests/test_local_index.py
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import KeyedEmbeddings
+from local_index import LocalVectorStore
+
+VECTORS = {"keys": [1.0, 0.0, 0.0], "refund": [0.0, 1.0, 0.0], "crypto": [0.0, 0.0, 1.0]}
+
+
+@pytest.fixture
+def embeddings():
+    return KeyedEmbeddings(VECTORS)
+
+
+def _store(embeddings, tmp_path):
+    return LocalVectorStore(embeddings, index_dir=str(tmp_path), name="test")
+
+
+def test_add_search_delete(embeddings, tmp_path):
+    store = _store(embeddings, tmp_path)
+    store.add_texts(["keys", "refund"], ids=["a", "b"])
+    assert [doc.id for doc in store.similarity_search("refund", k=1)] == ["b"]
+
+    store.add_texts(["crypto"], ids=["b"])
+    assert [doc.page_content for doc in store.similarity_search("crypto", k=1)] == ["crypto"]
+    assert len(store) == 2
+
+    assert store.delete(["a"])
+    assert len(store) == 1
+    store.delete(["b"])
+    assert len(store) == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_switches_version_and_removes_old_matrix(embeddings, tmp_path):
+    store = _store(embeddings, tmp_path)
+    store.add_texts(["keys"], ids=["a"])
+    first = store._version
+    store.add_texts(["refund"], ids=["b"])
+
+    with open(store.meta_path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    assert header["version"] == store._version != first
+    assert header["count"] == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(["test.meta.json", header["matrix"]])
+
+
+def test_reader_reloads_on_version_even_with_same_mtime(embeddings, tmp_path):
+    writer, reader = _store(embeddings, tmp_path), _store(embeddings, tmp_path)
+    writer.add_texts(["keys"], ids=["a"])
+    assert len(reader) == 1
+    stat = os.stat(writer.meta_path)
+
+    writer.add_texts(["refund"], ids=["b"])
+    os.utime(writer.meta_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert len(reader) == 2
+    assert [doc.id for doc in reader.similarity_search("refund", k=1)] == ["b"]
+
+
+def test_loads_unversioned_index(embeddings, tmp_path):
+    np.save(tmp_path / "test.embeddings.npy", np.asarray([VECTORS["keys"]], dtype=np.float32))
+    with open(tmp_path / "test.meta.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": "a", "text": "keys", "metadata": {}}], f)
+
+    store = _store(embeddings, tmp_path)
+    assert [doc.id for doc in store.similarity_search("keys", k=1)] == ["a"]
+
+    store.add_texts(["refund"], ids=["b"])
+    assert not (tmp_path / "test.embeddings.npy").exists()
+    assert len(_store(embeddings, tmp_path)) == 2
+
+
+def test_concurrent_reads_see_consistent_index(embeddings, tmp_path):
+    writer, reader = _store(embeddings, tmp_path), _store(embeddings, tmp_path)
+    writer.add_texts(["keys"], ids=["id0"])
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                matrix, records = reader._load()
+                assert matrix.shape[0] == len(records)
+                reader.similarity_search_by_vector([1.0, 0.0, 0.0], k=3)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(1, 30):
+        writer.add_texts(["refund"], ids=[f"id{i}"])
+    done.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(reader) == 30
+
+
+def test_batch_search_embeds_questions_as_queries(embeddings, tmp_path, monkeypatch):
+    store = _store(embeddings, tmp_path)
+    store.add_texts(["keys", "refund"], ids=["a", "b"])
+    monkeypatch.setattr(embeddings, "embed_documents", lambda texts: pytest.fail("queries embedded as documents"))
+
+    hits = store.batch_similarity_search(["refund", "keys"], k=1)
+    assert [[doc.id for doc in docs] for docs in hits] == [["b"], ["a"]]
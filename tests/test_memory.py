@@ -0,0 +1,130 @@
+# tests/test_memory.py
+import pytest
+
+import memory
+from conftest import KeyedEmbeddings
+
+PREVIOUS = "When will I receive my Borderlands 4 code?"
+
+
+@pytest.fixture
+def embeddings(monkeypatch, word_encoding):
+    vectors = {
+        PREVIOUS: [1.0, 0.0, 0.0],
+        # Near-paraphrase of the previous question
+        "When do I get my Borderlands 4 key?": [0.95, 0.1, 0.0],
+        # Related elliptical follow-up
+        "What about on Xbox?": [0.4, 0.9, 0.0],
+        # Unrelated short questions matching FOLLOW_UP_RE
+        "Can I get a refund?": [0.05, 0.0, 1.0],
+        "Is there a crypto option?": [0.0, 0.1, 1.0],
+    }
+    fake = KeyedEmbeddings(vectors)
+    monkeypatch.setattr(memory, "get_embeddings", lambda: fake)
+    monkeypatch.setattr(memory, "get_encoding", lambda: word_encoding)
+    return fake
+
+
+def _state(question):
+    return {
+        "question": question,
+        "history": [{"question": PREVIOUS, "answer": "Keys are sent on release day."}],
+        "summary": "",
+        "last_documents": ["Borderlands 4 release information"],
+    }
+
+
+@pytest.mark.parametrize("question", ["Can I get a refund?", "Is there a crypto option?"])
+def test_unrelated_short_question_is_fresh(embeddings, question):
+    assert memory.FOLLOW_UP_RE.search(question)
+    assert memory.classify_turn(question, PREVIOUS) == "fresh"
+
+    update = memory.contextualize(_state(question))
+    assert update["reused"] is False
+    assert update["search_query"] == question
+    assert "documents" not in update
+
+
+def test_elliptical_follow_up_folds_query_without_reuse(embeddings):
+    question = "What about on Xbox?"
+    assert memory.classify_turn(question, PREVIOUS) == "follow_up"
+
+    update = memory.contextualize(_state(question))
+    assert update["reused"] is False
+    assert update["search_query"] == f"{PREVIOUS} {question}"
+    assert "documents" not in update
+
+
+def test_near_paraphrase_reuses_documents(embeddings):
+    question = "When do I get my Borderlands 4 key?"
+    assert memory.classify_turn(question, PREVIOUS) == "reuse"
+
+    update = memory.contextualize(_state(question))
+    assert update["reused"] is True
+    assert update["documents"] == ["Borderlands 4 release information"]
+
+
+def test_reused_documents_are_not_carried_forward(embeddings):
+    state = {**_state("When do I get my Borderlands 4 key?"), "grade": "good", "reused": True,
+             "documents": ["Borderlands 4 release information"]}
+    assert memory.remember_turn(state, "Keys are sent on release day.")["last_documents"] == []
+
+    state["reused"] = False
+    assert memory.remember_turn(state, "Keys are sent on release day.")["last_documents"] == [
+        "Borderlands 4 release information"
+    ]
+
+
+def _remembering_graph():
+    """Graph whose only node remembers a provisionally good answer."""
+    from typing import List, TypedDict
+
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.graph import END, START, StateGraph
+
+    class State(TypedDict, total=False):
+        question: str
+        generation: str
+        grade: str
+        documents: List[str]
+        history: List[dict]
+        summary: str
+        last_documents: List[str]
+
+    def answer(state):
+        update = {"generation": "Provisional answer.", "grade": "good", "documents": ["doc"]}
+        return {**update, **memory.remember_turn({**state, **update}, "Provisional answer.")}
+
+    workflow = StateGraph(State)
+    workflow.add_node("remember", answer)
+    workflow.add_edge(START, "remember")
+    workflow.add_edge("remember", END)
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def test_retract_last_turn_replaces_remembered_answer(embeddings):
+    graph = _remembering_graph()
+    config = memory.thread_config("t1")
+    graph.invoke({"question": PREVIOUS}, config=config)
+    assert graph.get_state(config).values["last_documents"] == ["doc"]
+
+    memory.retract_last_turn(graph, config, "Escalated to human support")
+
+    values = graph.get_state(config).values
+    assert values["history"] == [{"question": PREVIOUS, "answer": "Escalated to human support"}]
+    assert values["last_documents"] == []
+
+
+def test_aretract_last_turn_without_thread_is_noop(embeddings):
+    import asyncio
+
+    graph = _remembering_graph()
+    asyncio.run(memory.aretract_last_turn(graph, None, "Escalated to human support"))
+
+
+def test_retract_turn_in_summary_when_no_recent_turns(embeddings):
+    values = {"question": "Can I pay with crypto?", "history": [],
+              "summary": "- Customer asked: Hi / Agent: Hello\n- Customer asked: Can I pay with crypto? / Agent: Yes"}
+    update = memory.retract_turn(values, "Escalated")
+    assert update["summary"].splitlines()[-1].endswith("Agent: Escalated")
+    assert update["summary"].splitlines()[0] == "- Customer asked: Hi / Agent: Hello"
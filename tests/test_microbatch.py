@@ -0,0 +1,79 @@
+# tests/test_microbatch.py
+import asyncio
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from microbatch import MicroBatcher
+
+
+def test_concurrent_calls_share_a_batch():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=200, name="test")
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.call(i))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    batcher.close()
+
+    assert results == {0: 0, 1: 2, 2: 4, 3: 6}
+    assert sum(sizes) == 4 and max(sizes) > 1
+
+
+def test_async_callers():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_wait_ms=50, name="test")
+
+    async def run():
+        return await asyncio.gather(*(batcher.acall(i) for i in range(3)))
+
+    assert asyncio.run(run()) == [1, 2, 3]
+    batcher.close()
+
+
+def test_short_result_list_fails_the_whole_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_wait_ms=50, name="test")
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="2 results for 3 items"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_exception_is_set_on_every_caller():
+    def fail(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fail, max_wait_ms=10, name="test")
+    with pytest.raises(ValueError):
+        batcher.call(1)
+    batcher.close()
+
+
+def _call_in_child(batcher, conn):
+    conn.send(batcher.call(20))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_worker_restarts_in_forked_child():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_wait_ms=1, name="test")
+    # Start the worker in the parent, as gunicorn's preload warm-up does
+    assert batcher.call(1) == 2
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    child = multiprocessing.get_context("fork").Process(target=_call_in_child, args=(batcher, child_conn))
+    child.start()
+    child.join(10)
+    if child.is_alive():
+        child.kill()
+        pytest.fail("forked child blocked on the parent's batch worker")
+    assert parent_conn.recv() == 21
+    batcher.close()
@@ -0,0 +1,78 @@
+# tests/test_onnx_embeddings.py
+import json
+import os
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from onnx import TensorProto, helper  # noqa: E402
+
+from onnx_embeddings import CONFIG_FILE, MODEL_FILE, OnnxSentenceEncoder  # noqa: E402
+
+# Token vectors of the tiny model; padding gets a large vector so any leak
+# into the mean pooling shows up
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "keys": 2, "refund": 3}
+TABLE = np.array([[100.0, 100.0], [0.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Embedding-lookup "transformer" plus a whitespace word-level tokenizer."""
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "tiny",
+        [helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "sequence"]),
+         helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "sequence"])],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", 2])],
+        initializer=[helper.make_tensor("table", TensorProto.FLOAT, TABLE.shape, TABLE.flatten().tolist())],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, str(tmp_path / MODEL_FILE))
+
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+
+    config = {"model_name": "tiny", "max_seq_length": 8, "dimension": 2, "normalize": False,
+              "pad_token": "[PAD]", "pad_token_id": 0}
+    with open(tmp_path / CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return str(tmp_path)
+
+
+def test_mean_pooling_ignores_padding(model_dir):
+    encoder = OnnxSentenceEncoder(model_dir)
+    # "keys" is padded to the length of the second text in the batch
+    vectors = encoder.encode(["keys", "keys refund", "keys keys refund refund"])
+    np.testing.assert_allclose(vectors, [[1.0, 0.0], [0.5, 0.5], [0.5, 0.5]])
+    np.testing.assert_allclose(encoder.encode(["keys"]), vectors[:1])
+
+
+def test_batches_and_normalisation(model_dir):
+    encoder = OnnxSentenceEncoder(model_dir)
+    encoder.config["normalize"] = True
+    vectors = encoder.encode(["keys refund", "refund", "keys"], batch_size=2)
+    np.testing.assert_allclose(vectors, [[2 ** -0.5, 2 ** -0.5], [0.0, 1.0], [1.0, 0.0]], rtol=1e-6)
+    assert vectors.dtype == np.float32
+
+
+def test_empty_input(model_dir):
+    assert OnnxSentenceEncoder(model_dir).encode([]).shape == (0, 2)
+
+
+def test_session_is_per_process(model_dir):
+    encoder = OnnxSentenceEncoder(model_dir)
+    session = encoder.session
+    assert encoder.session is session
+    assert encoder.input_names == {"input_ids", "attention_mask"}
+    encoder._pid = os.getpid() + 1
+    assert encoder.session is not session
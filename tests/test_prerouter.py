@@ -0,0 +1,60 @@
+# tests/test_prerouter.py
+import pytest
+
+import prerouter
+
+
+@pytest.mark.parametrize("question", [
+    "What is the price of Elden Ring on Steam right now?",
+    "Is Steam down?",
+    "How do I change my password?",
+])
+def test_single_match_falls_back_to_llm(question):
+    datasource, confidence = prerouter.preroute(question)
+    assert datasource is None
+    assert confidence < prerouter.PREROUTER_THRESHOLD
+
+
+@pytest.mark.parametrize("question", [
+    "How do I redeem my Loaded key on Steam?",
+    "I was charged but never received my game code",
+    "Can I get a refund for my CDKeys order?",
+])
+def test_agreeing_support_rules_route_to_vectorstore(question):
+    assert prerouter.preroute(question) == ("vectorstore", 1.0)
+
+
+@pytest.mark.parametrize("question", [
+    "Latest news on the Elden Ring story DLC",
+    "Which GPU is best for the latest reviews benchmark?",
+])
+def test_agreeing_web_rules_route_to_web_search(question):
+    assert prerouter.preroute(question) == ("web_search", 1.0)
+
+
+def test_mixed_evidence_falls_back_to_llm():
+    datasource, confidence = prerouter.preroute("Latest news about Loaded key redemption")
+    assert datasource is None
+    assert 0.0 < confidence < prerouter.PREROUTER_THRESHOLD
+
+
+def test_no_match_has_zero_confidence():
+    assert prerouter.preroute("Hello there") == (None, 0.0)
+
+
+def test_score_question_sums_matching_weights():
+    assert prerouter.score_question("Redeem my Loaded key on Xbox") == {
+        "vectorstore": 5,
+        "web_search": 0,
+    }
+
+
+def test_route_stats_counts_prerouter_hits(monkeypatch):
+    monkeypatch.setattr(prerouter, "ROUTE_STATS", prerouter.Counter())
+    prerouter.record_route("prerouter:vectorstore")
+    prerouter.record_route("prerouter:web_search")
+    prerouter.record_route("llm")
+    stats = prerouter.route_stats()
+    assert stats["total"] == 3
+    assert stats["counts"]["llm"] == 1
+    assert stats["prerouter_hit_rate"] == pytest.approx(2 / 3)
@@ -0,0 +1,89 @@
+# tests/test_sections.py
+import pytest
+from langchain_core.documents import Document
+
+import rerank
+import sections
+
+GAMES = ["Elden Ring", "Borderlands", "Cyberpunk", "Hades", "Celeste", "Stardew Valley"]
+CHROME = ["Submit a request", "Loaded Help Center > Orders", "3 days ago Updated", "Was this article helpful?"]
+
+
+@pytest.fixture(autouse=True)
+def words(monkeypatch, word_encoding):
+    monkeypatch.setattr(rerank, "_encoding", word_encoding)
+
+
+def _article(title, body, updated="3 days ago Updated"):
+    lines = CHROME[:2] + [title, updated.replace("3", str(len(title) % 9 + 1))] + body + CHROME[3:]
+    return Document(page_content="\n".join(lines), metadata={"title": title, "source": title})
+
+
+def test_boilerplate_found_across_articles():
+    documents = [_article(game, [f"How to redeem {game}."]) for game in GAMES]
+    boilerplate = sections.find_boilerplate(documents, min_docs=5, min_fraction=0.5)
+
+    # Digits are normalised, so "4 days ago Updated" matches "7 days ago Updated"
+    assert boilerplate == {sections._line_key(line) for line in CHROME}
+    assert sections._line_key("How to redeem Hades.") not in boilerplate
+
+
+def test_headings_merge_and_steps_stay_together():
+    text = "\n".join([
+        "Submit a request",
+        "WHAT'S INCLUDED",
+        "STANDARD EDITION",
+        "The base game.",
+        "## Redeeming",
+        "Open your library.",
+        "1. Open Steam",
+        "2. Click Activate a Product",
+        "3. Paste the key",
+        "Done.",
+    ])
+    result = sections.split_sections(text, boilerplate={sections._line_key("Submit a request")})
+
+    assert result == [
+        ("WHAT'S INCLUDED - STANDARD EDITION", ["The base game."]),
+        ("Redeeming", ["Open your library.", "1. Open Steam\n2. Click Activate a Product\n3. Paste the key", "Done."]),
+    ]
+
+
+def test_small_sections_share_a_chunk_with_prefix():
+    doc = Document(page_content="KEY DELIVERY\nKeys are emailed.\nREFUNDS\nUnrevealed keys can be refunded.",
+                   metadata={"title": "Orders"})
+    chunks = sections.chunk_article(doc, max_tokens=50)
+
+    assert len(chunks) == 1
+    assert chunks[0].page_content == (
+        "Orders > KEY DELIVERY\nKeys are emailed.\nREFUNDS\nUnrevealed keys can be refunded."
+    )
+    assert chunks[0].metadata["section"] == "KEY DELIVERY"
+    assert chunks[0].metadata["tokens"] == sections.count_tokens(chunks[0].page_content)
+
+
+def test_budget_respected_for_long_steps_and_lines():
+    long_step = "1. " + " ".join(f"word{i}" for i in range(60))
+    long_line = " ".join(f"text{i}" for i in range(80))
+    body = ["INSTALLING", long_step, "2. Restart the launcher", long_line]
+    doc = Document(page_content="\n".join(body), metadata={"title": "Install guide"})
+
+    chunks = sections.chunk_article(doc, max_tokens=25)
+
+    assert len(chunks) > 4
+    assert all(chunk.metadata["tokens"] <= 25 for chunk in chunks)
+    assert all(chunk.page_content.startswith("Install guide > INSTALLING\n") for chunk in chunks)
+    # Nothing is lost: every word of the section is in some chunk
+    text = " ".join(chunk.page_content for chunk in chunks)
+    assert all(f"word{i}" in text for i in range(60)) and all(f"text{i}" in text for i in range(80))
+
+
+def test_split_structured_strips_boilerplate():
+    documents = [_article(game, ["ACTIVATION", f"Activate {game} on Steam."]) for game in GAMES[:3]]
+    documents += [_article(game, ["SYSTEM REQUIREMENTS", f"{game} needs 8 GB of RAM."]) for game in GAMES[3:]]
+    chunks = sections.split_structured(documents, max_tokens=100)
+
+    assert len(chunks) == 6
+    for chunk in chunks:
+        assert "Submit a request" not in chunk.page_content
+        assert "helpful" not in chunk.page_content
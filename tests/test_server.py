@@ -0,0 +1,94 @@
+# tests/test_server.py
+import asyncio
+
+import pytest
+
+import server
+
+
+class FakeWorkflow:
+    """astream() yielding one final state, optionally after a delay."""
+
+    def __init__(self, delay=0.0, grade_pending=False):
+        self.delay = delay
+        self.grade_pending = grade_pending
+
+    async def astream(self, state, config=None, stream_mode=None):
+        await asyncio.sleep(self.delay)
+        yield "values", {**state, "generation": "Keys are emailed.", "grade": "good",
+                         "grade_pending": self.grade_pending}
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    def install(workflow, timeout=5.0):
+        monkeypatch.setattr(server, "workflow", workflow)
+        monkeypatch.setattr(server, "queue", server.AdmissionQueue(max_concurrency=1, max_queue=1, timeout=0.1))
+        monkeypatch.setattr(server, "SERVER_REQUEST_TIMEOUT", timeout)
+
+    return install
+
+
+async def _body(response):
+    return [chunk async for chunk in response.body_iterator]
+
+
+def test_stream_releases_slot(serve):
+    serve(FakeWorkflow())
+
+    async def run():
+        response = await server.answer_stream(server.AnswerRequest(question="Where is my key?"))
+        events = await _body(response)
+        await response.background()
+        return events
+
+    events = asyncio.run(run())
+    assert events[-1].startswith("event: done")
+    assert server.queue.active == 0
+
+
+def test_slot_released_when_body_never_iterated(serve):
+    serve(FakeWorkflow())
+
+    async def run():
+        response = await server.answer_stream(server.AnswerRequest(question="Where is my key?"))
+        assert server.queue.active == 1
+        # Client went away before the body was sent; only the background task runs
+        await response.background()
+
+    asyncio.run(run())
+    assert server.queue.active == 0
+
+
+def test_stream_times_out(serve):
+    serve(FakeWorkflow(delay=5.0), timeout=0.05)
+
+    async def run():
+        response = await server.answer_stream(server.AnswerRequest(question="Where is my key?"))
+        return await _body(response)
+
+    events = asyncio.run(run())
+    assert events[-1].startswith("event: error")
+    assert "Timed out" in events[-1]
+    assert server.queue.active == 0
+
+
+def test_failed_confirmation_retracts_remembered_answer(serve, monkeypatch):
+    serve(FakeWorkflow(grade_pending=True))
+    retracted = []
+
+    async def retract(graph, config, answer):
+        retracted.append((config, answer))
+
+    monkeypatch.setattr(server, "confirm_and_store", lambda workflow, result, grader: {"grade": "poor"})
+    monkeypatch.setattr(server, "get_registry", lambda: type("Registry", (), {"grader": None})())
+    monkeypatch.setattr(server, "aretract_last_turn", retract)
+
+    async def run():
+        request = server.AnswerRequest(question="Where is my key?", thread_id="t1")
+        response = await server.answer_stream(request)
+        return await _body(response)
+
+    events = asyncio.run(run())
+    assert events[-1].startswith("event: retract")
+    assert retracted == [({"configurable": {"thread_id": "t1"}}, "Escalated to human support")]
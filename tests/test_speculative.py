@@ -0,0 +1,67 @@
+# tests/test_speculative.py
+import asyncio
+
+import pytest
+
+from speculative import make_async_speculative_router
+
+
+def _run(route, branch_fns):
+    """Run one async speculative dispatch and report the tasks still pending afterwards."""
+    async def route_fn(state):
+        await asyncio.sleep(0.01)
+        if isinstance(route, Exception):
+            raise route
+        return route
+
+    node = make_async_speculative_router(route_fn, branch_fns)
+
+    async def run():
+        current = asyncio.current_task()
+        try:
+            update = await node({"question": "q"})
+        finally:
+            pending = [task for task in asyncio.all_tasks() if task is not current]
+        return update, pending
+
+    return asyncio.run(run())
+
+
+def test_losing_branch_is_cancelled_and_awaited():
+    finished = []
+
+    # Done before the router, so awaiting it doesn't yield to the loop
+    async def retrieve(state):
+        return {"documents": ["doc"]}
+
+    async def web_search(state):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            finished.append("web_search")
+            raise
+
+    update, pending = _run("vectorstore", {"retrieve": retrieve, "web_search": web_search})
+    assert update == {"route": "vectorstore", "documents": ["doc"]}
+    assert finished == ["web_search"]
+    assert pending == []
+
+
+def test_finished_losing_branch_error_is_retrieved():
+    async def retrieve(state):
+        raise RuntimeError("store down")
+
+    async def web_search(state):
+        return {"documents": ["web"]}
+
+    update, pending = _run("web_search", {"retrieve": retrieve, "web_search": web_search})
+    assert update == {"route": "web_search", "documents": ["web"]}
+    assert pending == []
+
+
+def test_router_error_awaits_every_branch():
+    async def retrieve(state):
+        await asyncio.sleep(10)
+
+    with pytest.raises(ValueError):
+        _run(ValueError("router down"), {"retrieve": retrieve})
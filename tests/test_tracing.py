@@ -0,0 +1,35 @@
+# tests/test_tracing.py
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from fakes import FakeChatModel
+from tracing import COMPLETION_TOKENS, PROMPT_TOKENS, TokenUsageCallback
+
+
+def _tokens(node):
+    return PROMPT_TOKENS.value(node=node), COMPLETION_TOKENS.value(node=node)
+
+
+def test_callback_counts_sync_and_async_calls():
+    model = FakeChatModel(latency=0.0, token_latency=0.0, output_tokens=3,
+                          callbacks=[TokenUsageCallback("test_route")])
+    before = _tokens("test_route")
+
+    model.invoke("where is my key")
+    asyncio.run(model.ainvoke("where is my key"))
+
+    prompt, completion = _tokens("test_route")
+    assert (prompt - before[0], completion - before[1]) == (8, 6)
+
+
+def test_callback_falls_back_to_provider_token_usage():
+    before = _tokens("test_grade")
+    response = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="{}"))]],
+                         llm_output={"token_usage": {"prompt_tokens": 12, "completion_tokens": 5}})
+
+    TokenUsageCallback("test_grade").on_llm_end(response)
+
+    prompt, completion = _tokens("test_grade")
+    assert (prompt - before[0], completion - before[1]) == (12, 5)
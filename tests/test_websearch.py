@@ -0,0 +1,131 @@
+# tests/test_websearch.py
+import asyncio
+import os
+import threading
+import time
+import types
+
+import pytest
+
+import websearch
+from websearch import (
+    WEB_SEARCH_FALLBACKS,
+    SearchProvider,
+    StubSearchProvider,
+    WebSearchCache,
+    WebSearchClient,
+)
+
+STUB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "web_search.json")
+QUESTION = "When is the next Call of Duty release?"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(websearch, "time", types.SimpleNamespace(time=clock.time, sleep=time.sleep))
+    return clock
+
+
+def _client(**kwargs):
+    return WebSearchClient(StubSearchProvider.from_file(STUB_PATH, **kwargs), cache=WebSearchCache(), timeout=0.2)
+
+
+def test_search_provider_is_abstract():
+    with pytest.raises(TypeError):
+        SearchProvider()
+
+
+def test_cache_expires_after_ttl(clock):
+    cache = WebSearchCache(ttl=60)
+    cache.put("q", [{"title": "t"}])
+    clock.now += 59
+    assert cache.get("q") == [{"title": "t"}]
+    clock.now += 2
+    assert cache.get("q") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = WebSearchCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]
+    cache.put("c", [3])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1] and cache.get("c") == [3]
+
+
+def test_cache_persists_to_sqlite(tmp_path):
+    path = str(tmp_path / "web.sqlite3")
+    WebSearchCache(path=path).put("q", [{"title": "t"}])
+    assert WebSearchCache(path=path).get("q") == [{"title": "t"}]
+
+
+def test_client_serves_repeats_from_cache():
+    client = _client()
+    first = client.search(QUESTION)
+    assert first[0]["title"] == "Call of Duty release date"
+    # Normalised query: case, whitespace and trailing punctuation don't matter
+    assert client.search("  when is the next call of duty RELEASE ") == first
+    assert client.provider.calls == 1
+
+
+def test_timeout_falls_back():
+    client = _client(latency=1.0)
+    before = WEB_SEARCH_FALLBACKS.value(reason="timeout")
+    assert client.search(QUESTION) is None
+    assert asyncio.run(client.asearch(QUESTION)) is None
+    assert WEB_SEARCH_FALLBACKS.value(reason="timeout") == before + 2
+
+
+def test_provider_error_falls_back():
+    client = _client(fail=True)
+    before = WEB_SEARCH_FALLBACKS.value(reason="error")
+    assert client.search(QUESTION) is None
+    assert WEB_SEARCH_FALLBACKS.value(reason="error") == before + 1
+
+
+def test_empty_results_fall_back_and_are_not_cached():
+    client = WebSearchClient(StubSearchProvider({}), cache=WebSearchCache(), timeout=0.2)
+    before = WEB_SEARCH_FALLBACKS.value(reason="empty")
+    assert client.search(QUESTION) is None
+    assert client.search(QUESTION) is None
+    assert client.provider.calls == 2
+    assert WEB_SEARCH_FALLBACKS.value(reason="empty") == before + 2
+
+
+def test_web_search_node_falls_back_to_vectorstore(monkeypatch):
+    import state
+
+    monkeypatch.setattr(state, "get_web_search", lambda: _client(fail=True))
+    monkeypatch.setattr(state, "RERANK_ENABLED", False)
+    monkeypatch.setattr(state, "retrieve", lambda s: {"documents": ["from vectorstore"], "question": s["question"]})
+
+    update = state.web_search({"question": QUESTION})
+    assert update["documents"] == ["from vectorstore"]
+
+
+class BlockingProvider(SearchProvider):
+    name = "blocking"
+
+    def __init__(self):
+        self.threads = []
+
+    def search(self, query, max_results):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(0.5)
+        return [{"title": "late"}]
+
+
+def test_async_timeout_runs_provider_on_client_executor():
+    client = WebSearchClient(BlockingProvider(), timeout=0.05)
+    assert asyncio.run(client.asearch(QUESTION)) is None
+    assert client.provider.threads[0].startswith("web-search")
@@ -0,0 +1,90 @@
+# tests/test_zendesk.py
+import copy
+import os
+from urllib.parse import parse_qs, urlparse
+
+import zendesk
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "zendesk")
+
+
+def _fixture_pages():
+    return list(zendesk.fetch_fixture_pages(FIXTURE_DIR))
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return copy.deepcopy(self.data)
+
+
+class FakeSession:
+    """Serves recorded pages by their ?page= number and records the requested URLs."""
+
+    def __init__(self, pages):
+        self.pages = {page["page"]: page for page in pages}
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        page = int(parse_qs(urlparse(url).query)["page"][0])
+        return FakeResponse(self.pages[page])
+
+
+def test_html_to_text():
+    html = (
+        "<p>We can only refund unrevealed keys.</p><h2>How to request a refund</h2>"
+        "<ol><li>Go to <strong>My Orders</strong>.</li><li>Click <em>Request a refund</em>.</li></ol>"
+        "<p>Pay in GBP&nbsp;or EUR.<br>Converted at checkout.</p><script>track()</script>"
+    )
+    assert zendesk.html_to_text(html) == (
+        "We can only refund unrevealed keys.\n"
+        "How to request a refund\n"
+        "- Go to My Orders.\n"
+        "- Click Request a refund.\n"
+        "Pay in GBP or EUR.\n"
+        "Converted at checkout."
+    )
+    assert zendesk.html_to_text(None) == ""
+
+
+def test_fetch_pages_follows_page_count():
+    session = FakeSession(_fixture_pages())
+    pages = list(zendesk.fetch_pages(session=session, workers=2))
+
+    assert [page["page"] for page in pages] == [1, 2]
+    assert [parse_qs(urlparse(url).query)["page"] for url in session.urls] == [["1"], ["2"]]
+
+
+def test_fetch_pages_follows_next_page_without_page_count():
+    recorded = _fixture_pages()
+    for page in recorded:
+        page.pop("page_count")
+    session = FakeSession(recorded)
+
+    pages = list(zendesk.fetch_pages(session=session))
+
+    assert [page["page"] for page in pages] == [1, 2]
+    assert session.urls[1] == recorded[0]["next_page"]
+
+
+def test_iter_article_documents_metadata():
+    docs = list(zendesk.iter_article_documents(_fixture_pages()))
+
+    # The draft article on page 2 is skipped
+    assert [doc.metadata["id"] for doc in docs] == ["22047798916764", "22036011234567", "22177793658268"]
+    refund = docs[0]
+    assert refund.metadata == {
+        "source": "https://support.loaded.com/hc/en-gb/articles/22047798916764-What-is-the-refund-policy-for-purchases-on-Loaded",
+        "url": "https://support.loaded.com/hc/en-gb/articles/22047798916764-What-is-the-refund-policy-for-purchases-on-Loaded",
+        "title": "What is the refund policy for purchases on Loaded?",
+        "id": "22047798916764",
+        "updated_at": "2025-09-01T09:30:00Z",
+    }
+    assert refund.page_content.startswith("What is the refund policy for purchases on Loaded?\n\nWe can only refund")
+
@@ -0,0 +1,301 @@
+# tracing.py
+"""
+Structured tracing and metrics for the workflow nodes.
+
+Each node registered in ``compile.build_workflow()`` is wrapped with
+``traced()``, which records wall time, LLM prompt/completion tokens (when the
+node returns a message with ``usage_metadata``) and retrieved chunk counts.
+Nodes whose LLM output is parsed (the router and grader chains) don't return a
+message, so their models report tokens through ``TokenUsageCallback``.
+Metrics are kept in-process as Prometheus-style counters and histograms
+(``render_prometheus()``), and every node run can also be appended to a
+JSONL trace file (``TRACE_FILE``).
+"""
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Append one JSON line per node run to this file (disabled when empty)
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level=None):
+    """Configure root logging once, at LOG_LEVEL unless overridden."""
+    logging.basicConfig(
+        level=getattr(logging, (level or LOG_LEVEL).upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] += amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0.0)
+
+    def items(self):
+        """Return [(labels dict, value)] for every label set."""
+        return [(dict(key), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._counts = {}
+        self._sums = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] += value
+
+    def count(self, **labels):
+        counts = self._counts.get(_label_key(labels))
+        return counts[-1] if counts else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of counters and histograms."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, description=""):
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, description))
+
+    def histogram(self, name, description="", buckets=LATENCY_BUCKETS):
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, description, buckets))
+
+    def render_prometheus(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+NODE_LATENCY = METRICS.histogram("rag_node_latency_seconds", "Wall time per graph node run")
+NODE_ERRORS = METRICS.counter("rag_node_errors_total", "Graph node runs that raised")
+PROMPT_TOKENS = METRICS.counter("rag_llm_prompt_tokens_total", "LLM prompt tokens by node")
+COMPLETION_TOKENS = METRICS.counter("rag_llm_completion_tokens_total", "LLM completion tokens by node")
+RETRIEVED_CHUNKS = METRICS.histogram("rag_retrieved_chunks", "Chunks returned per node run", COUNT_BUCKETS)
+CACHE_REQUESTS = METRICS.counter("rag_cache_requests_total", "Cache lookups by cache and result")
+
+# Callbacks receiving every trace event dict (e.g. the benchmark harness)
+_listeners = []
+_trace_lock = threading.Lock()
+
+
+def add_listener(callback):
+    """Register callback(event) to be called for every node trace event."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def render_prometheus():
+    """Return all metrics in the Prometheus text exposition format."""
+    return METRICS.render_prometheus()
+
+
+def record_cache(cache, hit):
+    """Count one cache lookup."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_tokens(node, usage):
+    """Count the prompt/completion tokens of one LLM call made by node."""
+    PROMPT_TOKENS.inc(usage.get("input_tokens", 0), node=node)
+    COMPLETION_TOKENS.inc(usage.get("output_tokens", 0), node=node)
+
+
+def _response_usage(response):
+    """usage_metadata of an LLMResult, falling back to the provider's token_usage."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {"input_tokens": token_usage.get("prompt_tokens", 0),
+                "output_tokens": token_usage.get("completion_tokens", 0)}
+    return None
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Chat model callback counting the tokens of every call under a node label.
+
+    Args:
+        node (str): Node name to record the tokens under
+    """
+
+    # Only increments counters, so run it inline for async calls too
+    run_inline = True
+
+    def __init__(self, node):
+        self.node = node
+
+    def on_llm_end(self, response, **kwargs):
+        usage = _response_usage(response)
+        if usage:
+            record_tokens(self.node, usage)
+
+
+def _chunk_count(documents):
+    if documents is None:
+        return None
+    if hasattr(documents, "page_content"):
+        return 1
+    if isinstance(documents, list):
+        return len(documents)
+    return None
+
+
+def _emit(event):
+    for callback in list(_listeners):
+        callback(event)
+    if TRACE_FILE:
+        with _trace_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+def record_node(name, duration, result=None, error=None):
+    """
+    Record metrics and a trace event for one node run.
+
+    Args:
+        name (str): Node name
+        duration (float): Wall time in seconds
+        result: The node's return value (state update dict or route string)
+        error (Exception): Exception raised by the node, if any
+    """
+    NODE_LATENCY.observe(duration, node=name)
+    event = {"ts": time.time(), "node": name, "duration_s": round(duration, 6)}
+
+    if error is not None:
+        NODE_ERRORS.inc(node=name)
+        event["error"] = f"{type(error).__name__}: {error}"
+
+    if isinstance(result, dict):
+        usage = getattr(result.get("generation"), "usage_metadata", None)
+        if usage:
+            record_tokens(name, usage)
+            event["prompt_tokens"] = usage.get("input_tokens", 0)
+            event["completion_tokens"] = usage.get("output_tokens", 0)
+        chunks = _chunk_count(result.get("documents"))
+        if chunks is not None and name in ("retrieve", "web_search", "rerank"):
+            RETRIEVED_CHUNKS.observe(chunks, node=name)
+            event["chunks"] = chunks
+        if "grade" in result:
+            event["grade"] = result["grade"]
+    elif isinstance(result, str):
+        event["result"] = result
+
+    _emit(event)
+
+
+def traced(name, fn):
+    """
+    Wrap a (sync or async) graph node or edge function with tracing.
+
+    Args:
+        name (str): Name to record the node under
+        fn: The node callable (plain function or functools.partial)
+
+    Returns:
+        A callable with the same sync/async behaviour as fn
+    """
+    if inspect.iscoroutinefunction(fn):
+        async def wrapper(state):
+            start = time.perf_counter()
+            try:
+                result = await fn(state)
+            except Exception as e:
+                record_node(name, time.perf_counter() - start, error=e)
+                raise
+            record_node(name, time.perf_counter() - start, result)
+            return result
+    else:
+        def wrapper(state):
+            start = time.perf_counter()
+            try:
+                result = fn(state)
+            except Exception as e:
+                record_node(name, time.perf_counter() - start, error=e)
+                raise
+            record_node(name, time.perf_counter() - start, result)
+            return result
+
+    wrapper.__name__ = name
+    return wrapper
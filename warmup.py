@@ -0,0 +1,202 @@
+# warmup.py
+"""
+Warm start: prebuilt snapshot and an explicit warm-up hook.
+
+A snapshot is a directory with everything the serving path would otherwise
+download or compute on its first request:
+
+    snapshot/
+        model/           saved sentence-transformers embedding model
+        onnx/            exported ONNX embedder (EMBEDDING_BACKEND=onnx)
+        cross_encoder/   saved rerank cross-encoder
+        index/           local vector index, BM25 index and ingestion manifest
+        snapshot.json    what was built, when, from which corpus
+
+Point ``SNAPSHOT_DIR`` at it and the models load from local files (no Hugging
+Face lookups) and the index is attached without ingestion.
+
+``warm_up()`` loads the models and index, runs one dummy query through each
+so lazy initialisation happens before traffic arrives, and returns a
+per-step startup-time breakdown. server.py calls it before reporting ready.
+
+Usage:
+    VECTOR_STORE_BACKEND=local python warmup.py snapshot --output ./snapshot
+    SNAPSHOT_DIR=./snapshot python warmup.py
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+
+from tracing import METRICS
+
+STARTUP_SECONDS = METRICS.histogram("rag_startup_step_seconds", "Warm-up time per startup step")
+WARMUP_QUERY = "How do I redeem a game key?"
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Collects (step, seconds) timings."""
+
+    def __init__(self):
+        self.steps = []
+        self._started = time.perf_counter()
+
+    def step(self, name, fn):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        self.steps.append((name, seconds))
+        STARTUP_SECONDS.observe(seconds, step=name)
+        logger.info("Startup step %-18s %7.3fs", name, seconds)
+        return result
+
+    def as_dict(self):
+        return {
+            "steps": {name: round(seconds, 3) for name, seconds in self.steps},
+            "total_s": round(time.perf_counter() - self._started, 3),
+        }
+
+    def render(self):
+        lines = [f"{name:<20}{seconds:>8.3f}s" for name, seconds in self.steps]
+        lines.append(f"{'total':<20}{time.perf_counter() - self._started:>8.3f}s")
+        return "\n".join(lines)
+
+
+def _import_graph():
+    import compile  # noqa: F401
+
+
+def warm_up(llm=True, vector_store=True, rerank_model=True, inference=True):
+    """
+    Load models and indexes and exercise them once.
+
+    Args:
+        llm (bool): Build the LLM chain registry (opens HTTP client pools,
+            so skip it in a process that will fork)
+        vector_store (bool): Attach to the vector store and run a search
+        rerank_model (bool): Load the cross-encoder (when reranking is on)
+        inference (bool): Run the dummy queries; skip them in a process that
+            will fork, since torch and batch worker threads don't survive it
+
+    Returns:
+        dict: {"steps": {step: seconds}, "total_s": seconds}
+    """
+    import chunking
+
+    report = StartupReport()
+    report.step("import_graph", _import_graph)
+    embeddings = report.step("embedding_model", chunking.get_embeddings)
+    if inference:
+        report.step("embedding_query", lambda: embeddings.embed_query(WARMUP_QUERY))
+
+    if vector_store:
+        retriever = report.step("vector_store", chunking.initialize_and_populate_vectorstore)
+        if inference:
+            report.step("retrieval_query", lambda: retriever.invoke(WARMUP_QUERY))
+
+    if chunking.RERANK_ENABLED and rerank_model:
+        import rerank
+
+        encoder = report.step("rerank_model", rerank.get_cross_encoder)
+        if inference:
+            report.step("rerank_query", lambda: encoder.predict([(WARMUP_QUERY, WARMUP_QUERY)]))
+        report.step("tokenizer", rerank.get_encoding)
+
+    if llm:
+        from llm import get_registry
+
+        report.step("llm_registry", get_registry)
+
+    logger.info("Startup breakdown:\n%s", report.render())
+    return report.as_dict()
+
+
+def build_snapshot(output):
+    """
+    Write a warm-start snapshot to output.
+
+    The index files are copied from the current INDEX_DIR; with the local
+    backend, ingestion runs first if it never has.
+
+    Returns:
+        dict: The snapshot metadata
+    """
+    import chunking
+    from answer_cache import corpus_version
+
+    if chunking.SNAPSHOT_DIR:
+        raise ValueError("Unset SNAPSHOT_DIR when building a snapshot")
+    os.makedirs(output, exist_ok=True)
+
+    if chunking.EMBEDDING_BACKEND == "onnx":
+        from onnx_embeddings import ONNX_MODEL_DIR
+
+        logger.info("Copying ONNX embedding model...")
+        shutil.copytree(ONNX_MODEL_DIR, os.path.join(output, "onnx"), dirs_exist_ok=True)
+    else:
+        logger.info("Saving embedding model...")
+        chunking.get_embeddings().model.save(os.path.join(output, "model"))
+
+    rerank_model = None
+    if chunking.RERANK_ENABLED:
+        import rerank
+
+        logger.info("Saving cross-encoder...")
+        rerank.get_cross_encoder().save(os.path.join(output, "cross_encoder"))
+        rerank_model = rerank.RERANK_MODEL
+
+    if not os.path.exists(chunking.MANIFEST_PATH):
+        from ingest import run_ingestion
+
+        run_ingestion()
+    index_dir = os.path.join(output, "index")
+    os.makedirs(index_dir, exist_ok=True)
+    copied = []
+    for name in sorted(os.listdir(chunking.INDEX_DIR)):
+        # Index, BM25 and manifest files of this table (caches are not part of the snapshot)
+        if name.startswith(f"{chunking.TABLE_NAME}."):
+            shutil.copy2(os.path.join(chunking.INDEX_DIR, name), os.path.join(index_dir, name))
+            copied.append(name)
+
+    metadata = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "embedding_model": chunking.EMBEDDING_MODEL,
+        "embedding_backend": chunking.EMBEDDING_BACKEND,
+        "rerank_model": rerank_model,
+        "backend": chunking.VECTOR_STORE_BACKEND,
+        "corpus_version": corpus_version(),
+        "index_files": copied,
+    }
+    with open(os.path.join(output, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    logger.info("Snapshot written to %s (%d index files)", output, len(copied))
+    return metadata
+
+
+def main():
+    from tracing import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Build a warm-start snapshot or time a warm start.")
+    subparsers = parser.add_subparsers(dest="command")
+    snapshot = subparsers.add_parser("snapshot", help="Build a snapshot directory")
+    snapshot.add_argument("--output", default="./snapshot")
+    warm = subparsers.add_parser("warm", help="Warm up and print the startup breakdown (default)")
+    warm.add_argument("--no-llm", action="store_true", help="Skip building the LLM clients")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        build_snapshot(args.output)
+        return
+    result = warm_up(llm=not getattr(args, "no_llm", False))
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# websearch.py
+"""
+Web search providers with caching and a hard deadline.
+
+``state.web_search`` goes through ``WebSearchClient``, which:
+
+- normalises the query and serves repeats from a TTL + LRU cache
+  (optionally persisted to SQLite so restarts keep the day's results),
+- gives the provider at most ``WEB_SEARCH_TIMEOUT`` seconds per call,
+- returns None when the search is slow, fails or comes back empty, so the
+  caller can fall back to vectorstore retrieval.
+
+Providers are pluggable (``WEB_SEARCH_PROVIDER``): ``duckduckgo`` for the
+live search and ``stub`` for an offline provider that serves canned results
+from a JSON fixture, for machines without network access.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from dotenv import load_dotenv
+
+from tracing import METRICS, record_cache
+
+load_dotenv()
+
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "duckduckgo").lower()
+WEB_SEARCH_STUB_PATH = os.getenv("WEB_SEARCH_STUB_PATH", "./fixtures/web_search.json")
+# Hard per-call deadline in seconds
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "3.0"))
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
+# Snippets kept in the context document
+WEB_SEARCH_SNIPPETS = int(os.getenv("WEB_SEARCH_SNIPPETS", "2"))
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", str(6 * 3600)))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512"))
+# SQLite file for persisting cached results (disabled when empty)
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", "")
+
+WEB_SEARCH_FALLBACKS = METRICS.counter(
+    "rag_web_search_fallbacks_total", "Web searches answered from the vectorstore instead, by reason"
+)
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _WHITESPACE_RE.sub(" ", query.lower()).strip().rstrip("?!. ")
+
+
+class SearchProvider(ABC):
+    """
+    Base class for web search providers.
+
+    Subclasses implement search(); asearch() runs it on the given executor
+    unless the provider has a native async client.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query, max_results):
+        """
+        Args:
+            query (str): Search query
+            max_results (int): Max number of results
+
+        Returns:
+            list: [{"title", "snippet", "link"}] results
+        """
+
+    async def asearch(self, query, max_results, executor=None):
+        """
+        Args:
+            query (str): Search query
+            max_results (int): Max number of results
+            executor (Executor): Pool to run search() on; None uses the loop's default
+
+        Returns:
+            list: [{"title", "snippet", "link"}] results
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.search, query, max_results)
+
+
+class DuckDuckGoProvider(SearchProvider):
+    """Live DuckDuckGo text search."""
+
+    name = "duckduckgo"
+
+    def __init__(self):
+        from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+        self.wrapper = DuckDuckGoSearchAPIWrapper()
+
+    def search(self, query, max_results):
+        return self.wrapper.results(query, max_results)
+
+
+class StubSearchProvider(SearchProvider):
+    """
+    Offline provider serving canned results.
+
+    Args:
+        results (dict): normalized query -> results; "*" is the default entry
+        latency (float): Seconds to sleep per call (for timeout testing)
+        fail (bool): Raise on every call (for fallback testing)
+    """
+
+    name = "stub"
+
+    def __init__(self, results=None, latency=0.0, fail=False):
+        self.results = {normalize_query(key) if key != "*" else key: value
+                        for key, value in (results or {}).items()}
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        results = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                results = json.load(f)
+        return cls(results, **kwargs)
+
+    def _lookup(self, query, max_results):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("stub search provider failure")
+        results = self.results.get(normalize_query(query), self.results.get("*", []))
+        return [dict(result) for result in results[:max_results]]
+
+    def search(self, query, max_results):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._lookup(query, max_results)
+
+    async def asearch(self, query, max_results, executor=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._lookup(query, max_results)
+
+
+def make_provider(name=WEB_SEARCH_PROVIDER):
+    """Create the configured search provider."""
+    if name == "duckduckgo":
+        return DuckDuckGoProvider()
+    if name == "stub":
+        return StubSearchProvider.from_file(WEB_SEARCH_STUB_PATH)
+    raise ValueError(f"Unknown WEB_SEARCH_PROVIDER: {name}")
+
+
+class WebSearchCache:
+    """
+    TTL + LRU cache of search results, optionally persisted to SQLite.
+
+    Args:
+        ttl (float): Seconds an entry stays valid
+        max_entries (int): In-memory LRU size cap
+        path (str): SQLite database file (None keeps the cache in memory only)
+    """
+
+    def __init__(self, ttl=WEB_SEARCH_CACHE_TTL, max_entries=WEB_SEARCH_CACHE_SIZE, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS web_results (key TEXT PRIMARY KEY, results TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM web_results WHERE created_at < ?", (time.time() - ttl,))
+            self._conn.commit()
+
+    def get(self, key):
+        """Return cached results for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT results, created_at FROM web_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            results, created_at = entry
+            if now - created_at > self.ttl:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def put(self, key, results):
+        entry = (results, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO web_results (key, results, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(results), entry[1]),
+                )
+                self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM web_results")
+                self._conn.commit()
+
+
+class WebSearchClient:
+    """
+    Cached web search with a hard deadline.
+
+    Args:
+        provider (SearchProvider): Backend doing the actual search
+        cache (WebSearchCache): Result cache (None disables caching)
+        timeout (float): Max seconds per provider call
+        max_results (int): Results requested from the provider
+    """
+
+    def __init__(self, provider, cache=None, timeout=WEB_SEARCH_TIMEOUT, max_results=WEB_SEARCH_MAX_RESULTS):
+        self.provider = provider
+        self.cache = cache
+        self.timeout = timeout
+        self.max_results = max_results
+        # Calls that miss the deadline keep running here; the caller has moved on
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+
+    def _key(self, query):
+        return f"{self.provider.name}\0{self.max_results}\0{normalize_query(query)}"
+
+    def _cached(self, query):
+        if self.cache is None:
+            return None
+        results = self.cache.get(self._key(query))
+        record_cache("web_search", results is not None)
+        return results
+
+    def _finish(self, query, results, error=None):
+        if error is not None:
+            reason = "timeout" if isinstance(error, (FutureTimeoutError, asyncio.TimeoutError)) else "error"
+            logger.warning("Web search %s for %r: %s", reason, query, str(error) or f"no results within {self.timeout}s")
+            WEB_SEARCH_FALLBACKS.inc(reason=reason)
+            return None
+        if not results:
+            logger.warning("Web search returned no results for %r", query)
+            WEB_SEARCH_FALLBACKS.inc(reason="empty")
+            return None
+        if self.cache is not None:
+            self.cache.put(self._key(query), results)
+        return results
+
+    def search(self, query):
+        """
+        Search the web, returning None if the search timed out, failed or was empty.
+        """
+        results = self._cached(query)
+        if results is not None:
+            return results
+        future = self._executor.submit(self.provider.search, query, self.max_results)
+        try:
+            results = future.result(timeout=self.timeout)
+        except Exception as e:
+            return self._finish(query, None, error=e)
+        return self._finish(query, results)
+
+    async def asearch(self, query):
+        """
+        Async version of search().
+        """
+        results = self._cached(query)
+        if results is not None:
+            return results
+        try:
+            # Own pool, as in search(): a hung provider can't starve the loop's default executor
+            results = await asyncio.wait_for(
+                self.provider.asearch(query, self.max_results, executor=self._executor), self.timeout
+            )
+        except Exception as e:
+            return self._finish(query, None, error=e)
+        return self._finish(query, results)
+
+
+# Global client, created on first use
+_client = None
+
+
+def get_web_search():
+    """Return the process-wide WebSearchClient for the configured provider."""
+    global _client
+
+    if _client is None:
+        cache = WebSearchCache(path=WEB_SEARCH_CACHE_PATH or None)
+        _client = WebSearchClient(make_provider(), cache=cache)
+    return _client
+
+
+def set_web_search(client):
+    """Replace the process-wide client (e.g. with a stub provider for benchmarks)."""
+    global _client
+
+    _client = client
@@ -0,0 +1,176 @@
+# zendesk.py
+"""
+Direct Zendesk Help Center ingestion.
+
+Streams the paginated articles API with a pooled HTTP session, prefetching
+the remaining pages concurrently, converts each article's ``body`` HTML to
+clean text and yields one Document per article. The generator feeds the
+ingestion pipeline directly, so no browser, CSV or intermediate text files
+are needed.
+
+Usage:
+    python zendesk.py                          # ingest from the live API
+    python zendesk.py --fixture fixtures/zendesk   # ingest recorded pages
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from articles import make_article_document
+
+ARTICLES_URL = "https://support.loaded.com/api/v2/help_center/en-gb/articles.json"
+PER_PAGE = 100
+PREFETCH_WORKERS = int(os.getenv("ZENDESK_PREFETCH_WORKERS", "4"))
+REQUEST_TIMEOUT = 30
+
+BLOCK_TAGS = ("p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "li", "tr", "pre", "blockquote", "table")
+
+logger = logging.getLogger(__name__)
+
+
+def make_session(pool_size=PREFETCH_WORKERS):
+    """HTTP session with a keep-alive connection pool and retry on 429/5xx."""
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504),
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _page_url(url, page, per_page=PER_PAGE):
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query.update({"page": [str(page)], "per_page": [str(per_page)]})
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def html_to_text(html):
+    """
+    Convert an article body to plain text, one block element per line.
+
+    Args:
+        html (str): Article body HTML
+
+    Returns:
+        str: Clean text
+    """
+    soup = BeautifulSoup(html or "", "html.parser")
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    for li in soup.find_all("li"):
+        li.insert(0, "- ")
+    for block in soup.find_all(BLOCK_TAGS):
+        block.insert_after("\n")
+    text = soup.get_text()
+    lines = [re.sub(r"[ \t\xa0]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def fetch_pages(url=ARTICLES_URL, session=None, workers=PREFETCH_WORKERS):
+    """
+    Yield article API pages in order, prefetching later pages concurrently.
+
+    Args:
+        url (str): Articles API endpoint
+        session (requests.Session): Pooled session (created if None)
+        workers (int): Pages fetched in parallel
+
+    Yields:
+        dict: Decoded JSON page
+    """
+    session = session or make_session(workers)
+
+    def get(page_url):
+        response = session.get(page_url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    first = get(_page_url(url, 1))
+    yield first
+    page_count = first.get("page_count")
+    if page_count:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(get, _page_url(url, page)) for page in range(2, page_count + 1)]
+            for future in futures:
+                yield future.result()
+    else:
+        # Cursor-style pagination: follow next_page sequentially
+        next_page = first.get("next_page")
+        while next_page:
+            data = get(next_page)
+            yield data
+            next_page = data.get("next_page")
+
+
+def fetch_fixture_pages(fixture_dir):
+    """
+    Yield recorded API pages from ``page_*.json`` files (sorted by page number).
+    """
+    names = sorted(
+        (name for name in os.listdir(fixture_dir) if re.match(r"page_\d+\.json$", name)),
+        key=lambda name: int(re.findall(r"\d+", name)[0]),
+    )
+    for name in names:
+        with open(os.path.join(fixture_dir, name), "r", encoding="utf-8") as f:
+            yield json.load(f)
+
+
+def iter_article_documents(pages):
+    """
+    Turn API pages into one Document per (non-draft) article.
+
+    Args:
+        pages: Iterable of decoded API pages
+
+    Yields:
+        Document: Article text with url/title/id/updated_at metadata
+    """
+    for page in pages:
+        for article in page.get("articles", []):
+            if article.get("draft"):
+                continue
+            text = html_to_text(article.get("body"))
+            if not text:
+                continue
+            title = article.get("title", "")
+            yield make_article_document(
+                article["html_url"],
+                f"{title}\n\n{text}" if title else text,
+                title=title,
+                article_id=article.get("id"),
+                updated_at=article.get("edited_at") or article.get("updated_at"),
+            )
+
+
+def stream_articles(fixture_dir=None):
+    """
+    Stream support articles from the live API or a recorded fixture directory.
+    """
+    pages = fetch_fixture_pages(fixture_dir) if fixture_dir else fetch_pages()
+    return iter_article_documents(pages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest Help Center articles straight from the Zendesk API.")
+    parser.add_argument("--fixture", help="directory of recorded page_N.json responses to use instead of the API")
+    parser.add_argument("--rebuild", action="store_true", help="clear the table and re-ingest everything")
+    args = parser.parse_args()
+
+    from ingest import run_ingestion
+    from tracing import configure_logging
+
+    configure_logging()
+    run_ingestion(documents=stream_articles(args.fixture), rebuild=args.rebuild)